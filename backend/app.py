@@ -1,52 +1,141 @@
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory, redirect
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import text, update
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
+import click
+import csv
+import hmac
 import os
+import threading
+import time
 
 from config import config
 from models import db, bcrypt, User, FoodItem, PickupRequest, Notification, VerificationRequest
-from utils import role_required, create_notification, notify_nearby_beneficiaries, validate_coordinates, paginate_query
+from utils import calculate_distance, role_required, create_notification, validate_coordinates, paginate_query, find_nearby_food_items, backfill_geocells, upgrade_schema, init_query_counter, InvalidCursor, encode_cursor, decode_cursor, parse_per_page, parse_max_distance, InvalidDistance, page_metadata, init_user_cache, get_current_user, invalidate_user, identity_claims, make_etag, not_modified, set_validators, food_item_values, insert_food_items, read_listings, InvalidListing
+from database import configure_engine, pool_stats, init_replica_routing
+from passwords import init_password_pool, PasswordHashingBusy
+from stats import reconcile_stats, stats_snapshot, feed_version, adjust_stats, FEED_VERSION_COUNTER
+from notifications import init_notification_broker, notification_stream, unread_count, mark_notifications_read, issue_stream_ticket, read_stream_ticket, STREAM_TICKET_COOKIE
+from serialization import init_json_provider, projection_for
+from sweeper import run_sweeper, start_sweeper_thread
+from static_assets import init_static_assets
+from uploads import init_upload_storage, save_upload, upload_folder, find_original, InvalidUpload, THUMBNAIL_DIR
+from metrics import init_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from search import search_terms, rank_food_items, filter_by_search, create_search_index
+from map_tiles import init_map_tiles, parse_viewport, clustered_tiles, items_in_viewport, InvalidViewport
+from exports import export_stream, InvalidExport, FORMATS as EXPORT_FORMATS
+from dispatch import enqueue_new_listing, enqueue_new_listings, enqueue_notification, queue_metrics, run_worker, start_worker_thread
 
 def create_app(config_name=None):
     # Set static folder for Railway deployment
     static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
-    app = Flask(__name__, static_folder=static_folder, static_url_path='')
+    # The catch-all route below serves the static folder from memory instead of Flask's static view
+    app = Flask(__name__, static_folder=None)
+    app.static_folder = static_folder
     
     # Configuration
     config_name = config_name or os.environ.get('FLASK_ENV', 'default')
     app.config.from_object(config[config_name])
+    configure_engine(app)
     
     # Initialize extensions
     db.init_app(app)
     bcrypt.init_app(app)
     jwt = JWTManager(app)
     CORS(app)
+    init_json_provider(app)
+    init_user_cache(app)
+    init_password_pool(app)
+    init_notification_broker(app)
+    init_replica_routing(app, db)
+    init_static_assets(app, app.static_folder)
+    init_upload_storage(app)
+    init_map_tiles(app)
+    init_metrics(app)
+    
+    # Count SQL queries per request while debugging
+    if app.debug:
+        init_query_counter(app)
     
     # Serve frontend routes
     @app.route('/')
     def serve_frontend():
-        return send_from_directory(app.static_folder, 'index.html')
+        return serve_static_asset('index.html')
     
     @app.route('/<path:path>')
     def serve_frontend_routes(path):
         # If it's an API route, let it pass through
         if path.startswith('api/') or path.startswith('auth/') or path.startswith('uploads/'):
             return None
-        # If the file exists, serve it
-        if os.path.exists(os.path.join(app.static_folder, path)):
-            return send_from_directory(app.static_folder, path)
-        # Otherwise, serve index.html for client-side routing
-        return send_from_directory(app.static_folder, 'index.html')
-    
-    # Create tables (with error handling for Railway deployment)
-    with app.app_context():
-        try:
-            db.create_all()
-            print("Database tables created successfully")
-        except Exception as e:
-            print(f"Database initialization error: {e}")
-            # Don't fail the app startup - let it retry later
+        # If the file exists, serve it; otherwise serve index.html for client-side routing
+        return serve_static_asset(path)
+    
+    def serve_static_asset(path):
+        manifest = app.extensions['static_assets']
+        asset = manifest.get(path) or manifest.get('index.html')
+        if asset is None:
+            return jsonify({'error': 'Frontend build not found'}), 404
+        return manifest.response(app, asset)
+    
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create missing tables, index unlocated food items and seed the counters"""
+        db.create_all()
+        print("Database tables created successfully")
+        for change in upgrade_schema():
+            print(f"Added {change}")
+        if create_search_index(db.session.connection()):
+            db.session.commit()
+            print("Full-text search index created")
+        backfilled = backfill_geocells()
+        if backfilled:
+            print(f"Indexed {backfilled} food items by location")
+        # Seeds every counter, the feed version included, and corrects any drift
+        drift = reconcile_stats()
+        print(f"Statistics counters initialized (corrected {drift})" if drift else "Statistics counters initialized")
+    
+    @app.cli.command('backfill-geocells')
+    def backfill_geocells_command():
+        """Index food items that were stored without a spatial grid cell"""
+        print(f"Indexed {backfill_geocells()} food items by location")
+    
+    @app.cli.command('reconcile-stats')
+    def reconcile_stats_command():
+        """Recompute the admin statistics counters from the tables"""
+        drift = reconcile_stats()
+        print(f"Corrected counters: {drift}" if drift else "Counters already consistent")
+    
+    @app.cli.command('dispatch-worker')
+    @click.option('--once', is_flag=True, help='Exit once the queue is drained')
+    def dispatch_worker_command(once):
+        """Deliver queued notifications in batches"""
+        run_worker(once=once)
+    
+    @app.cli.command('sweep-expired')
+    @click.option('--once', is_flag=True, help='Run a single sweep and exit')
+    def sweep_expired_command(once):
+        """Expire stale listings and cancel their pending pickup requests"""
+        run_sweeper(once=once)
+    
+    # In-process workers start with the first request, so imports and CLI commands stay side-effect free
+    background_lock = threading.Lock()
+    
+    @app.before_request
+    def start_background_workers():
+        if 'background_workers' in app.extensions:
+            return
+        with background_lock:
+            if 'background_workers' in app.extensions:
+                return
+            workers = []
+            if app.config['DISPATCH_IN_PROCESS']:
+                workers.append(start_worker_thread(app))
+            if app.config['EXPIRY_SWEEP_IN_PROCESS']:
+                workers.append(start_sweeper_thread(app))
+            app.extensions['background_workers'] = workers
     
     # Auth Routes
     @app.route('/auth/register', methods=['POST'])
@@ -91,14 +180,17 @@ def create_app(config_name=None):
             db.session.commit()
             
             # Create access token
-            access_token = create_access_token(identity=str(user.id))
+            access_token = create_access_token(identity=str(user.id), additional_claims=identity_claims(user))
             
             return jsonify({
                 'message': 'User registered successfully',
                 'access_token': access_token,
                 'user': user.to_dict()
             }), 201
-            
+        
+        except PasswordHashingBusy as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
@@ -116,15 +208,24 @@ def create_app(config_name=None):
             if not user or not user.check_password(data['password']):
                 return jsonify({'error': 'Invalid credentials'}), 401
             
-            access_token = create_access_token(identity=str(user.id))
+            # Upgrade the stored hash when the configured cost factor changed
+            if user.password_needs_rehash():
+                user.set_password(data['password'])
+                db.session.commit()
+            
+            access_token = create_access_token(identity=str(user.id), additional_claims=identity_claims(user))
             
             return jsonify({
                 'message': 'Login successful',
                 'access_token': access_token,
                 'user': user.to_dict()
             }), 200
-            
+        
+        except PasswordHashingBusy as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
         except Exception as e:
+            db.session.rollback()
             return jsonify({'error': str(e)}), 500
     
     # User Routes
@@ -132,14 +233,18 @@ def create_app(config_name=None):
     @jwt_required()
     def get_profile():
         try:
-            current_user_id = int(get_jwt_identity())
-            user = User.query.get(current_user_id)
+            user = get_current_user()
             
             if not user:
                 return jsonify({'error': 'User not found'}), 404
             
-            return jsonify({'user': user.to_dict()}), 200
+            etag = make_etag('user', user.id, user.updated_at)
+            cached = not_modified(etag, user.updated_at)
+            if cached:
+                return cached
             
+            return set_validators(jsonify({'user': user.to_dict()}), etag, user.updated_at), 200
+        
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -147,8 +252,7 @@ def create_app(config_name=None):
     @jwt_required()
     def update_profile():
         try:
-            current_user_id = int(get_jwt_identity())
-            user = User.query.get(current_user_id)
+            user = get_current_user()
             
             if not user:
                 return jsonify({'error': 'User not found'}), 404
@@ -170,12 +274,13 @@ def create_app(config_name=None):
                     return jsonify({'error': 'Invalid coordinates'}), 400
             
             db.session.commit()
+            invalidate_user(user.id)
             
             return jsonify({
                 'message': 'Profile updated successfully',
                 'user': user.to_dict()
             }), 200
-            
+        
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
@@ -187,57 +292,69 @@ def create_app(config_name=None):
         try:
             data = request.get_json()
             
-            # Validate required fields
-            required_fields = ['title', 'quantity', 'pickup_start', 'pickup_end']
-            for field in required_fields:
-                if not data.get(field):
-                    return jsonify({'error': f'{field} is required'}), 400
-            
-            # Parse datetime fields
             try:
-                pickup_start = datetime.fromisoformat(data['pickup_start'].replace('Z', '+00:00'))
-                pickup_end = datetime.fromisoformat(data['pickup_end'].replace('Z', '+00:00'))
-                expiry_date = None
-                if data.get('expiry_date'):
-                    expiry_date = datetime.fromisoformat(data['expiry_date'].replace('Z', '+00:00'))
-            except ValueError:
-                return jsonify({'error': 'Invalid datetime format'}), 400
+                food_item = FoodItem(**food_item_values(data, current_user))
+            except InvalidListing as e:
+                return jsonify({'error': str(e)}), 400
             
-            # Validate coordinates if provided
-            latitude = data.get('latitude') or current_user.latitude
-            longitude = data.get('longitude') or current_user.longitude
-            
-            if latitude and longitude:
-                if not validate_coordinates(latitude, longitude):
-                    return jsonify({'error': 'Invalid coordinates'}), 400
+            db.session.add(food_item)
+            db.session.flush()
             
-            # Create food item
-            food_item = FoodItem(
-                donor_id=current_user.id,
-                title=data['title'],
-                description=data.get('description'),
-                quantity=int(data['quantity']),
-                unit=data.get('unit', 'servings'),
-                expiry_date=expiry_date,
-                pickup_start=pickup_start,
-                pickup_end=pickup_end,
-                location=data.get('location'),
-                latitude=latitude,
-                longitude=longitude,
-                image_url=data.get('image_url')
-            )
+            # Queue notifications for nearby beneficiaries
+            enqueue_new_listing(food_item)
             
-            db.session.add(food_item)
             db.session.commit()
             
-            # Notify nearby beneficiaries
-            notify_nearby_beneficiaries(food_item)
-            
             return jsonify({
                 'message': 'Food item created successfully',
                 'food_item': food_item.to_dict()
             }), 201
+        
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/food/bulk', methods=['POST'])
+    @role_required(['donor'])
+    def create_food_items_bulk(current_user):
+        try:
+            max_items = app.config['BULK_MAX_ITEMS']
+            values, errors = [], []
+            
+            # Validate every listing before writing any of them
+            try:
+                for index, data in enumerate(read_listings(request)):
+                    if index == max_items:
+                        return jsonify({'error': f'At most {max_items} listings per upload'}), 400
+                    try:
+                        if not isinstance(data, dict):
+                            raise InvalidListing('Listing must be an object')
+                        values.append(food_item_values(data, current_user))
+                    except InvalidListing as e:
+                        errors.append({'index': index, 'error': str(e)})
+            except (InvalidListing, UnicodeDecodeError, csv.Error) as e:
+                return jsonify({'error': str(e)}), 400
+            
+            if errors:
+                return jsonify({'error': 'Invalid listings', 'errors': errors[:100]}), 400
+            if not values:
+                return jsonify({'error': 'No listings provided'}), 400
+            
+            food_items = insert_food_items(values)
+            
+            # A single fan-out job coalesces the batch into one notification per beneficiary
+            enqueue_new_listings(food_items)
+            
+            db.session.commit()
             
+            return jsonify({
+                'message': f'{len(food_items)} food items created',
+                'food_items': [food_item.to_dict() for food_item in food_items]
+            }), 201
+        
+        except RequestEntityTooLarge:
+            db.session.rollback()
+            return jsonify({'error': 'Upload is too large'}), 413
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
@@ -246,62 +363,145 @@ def create_app(config_name=None):
     @jwt_required()
     def get_food_items():
         try:
-            current_user_id = int(get_jwt_identity())
-            user = User.query.get(current_user_id)
+            user = get_current_user()
             
             if not user:
                 return jsonify({'error': 'User not found'}), 404
             
             # Get query parameters
             status = request.args.get('status', 'available')
-            max_distance = float(request.args.get('max_distance', 10))
+            max_distance = parse_max_distance(request.args.get('max_distance'))
             page = request.args.get('page', 1)
             per_page = request.args.get('per_page', 20)
+            cursor = request.args.get('cursor')
+            terms = search_terms(request.args.get('q', ''))
+            
+            # Answer unchanged polls before any distance computation or serialization
+            version, changed_at = feed_version()
+            etag = make_etag('food', version, user.id, user.updated_at, sorted(request.args.items(multi=True)))
+            last_modified = max(filter(None, [changed_at, user.updated_at]), default=None)
+            cached = not_modified(etag, last_modified)
+            if cached:
+                return cached
             
             # Base query
             query = FoodItem.query.filter_by(status=status)
             
             # For beneficiaries, filter by distance
             if user.role == 'beneficiary' and user.latitude and user.longitude:
-                # Get all food items and filter by distance
-                all_items = query.all()
-                nearby_items = []
+                user_lat, user_lon = float(user.latitude), float(user.longitude)
                 
-                for item in all_items:
-                    if item.latitude and item.longitude:
-                        distance = item.calculate_distance(float(user.latitude), float(user.longitude))
-                        if distance <= max_distance:
-                            nearby_items.append(item)
+                if terms:
+                    # Text matches from the full-text index, ranked by relevance and distance
+                    nearby_items = rank_food_items(terms, status, user_lat, user_lon, max_distance)
+                else:
+                    # Nearby candidates come from the spatial index, nearest first
+                    nearby_items = find_nearby_food_items(status, user_lat, user_lon, max_distance)
+                
+                if cursor is not None:
+                    # Keyset pagination over (distance or -score, id) skips the total
+                    per_page = parse_per_page(per_page)
+                    if cursor:
+                        last_key = tuple(decode_cursor(cursor, float, int))
+                        nearby_items = [pair for pair in nearby_items if pair > last_key]
+                    page_pairs = nearby_items[:per_page]
+                    next_cursor = encode_cursor(*page_pairs[-1]) if page_pairs and len(nearby_items) > per_page else None
+                else:
+                    # Manual pagination, loading only the rows on this page
+                    per_page = parse_per_page(per_page)
+                    start = (int(page) - 1) * per_page
+                    end = start + per_page
+                    page_pairs = nearby_items[start:end]
                 
-                # Sort by distance
-                nearby_items.sort(key=lambda x: x.calculate_distance(float(user.latitude), float(user.longitude)))
+                page_ids = [item_id for _, item_id in page_pairs]
+                page_query = FoodItem.query.filter(FoodItem.id.in_(page_ids))
+                items_by_id = {item['id']: item for item in projection_for(FoodItem).rows(page_query)} if page_ids else {}
+                food_items = []
+                for item_id in page_ids:
+                    item = items_by_id.get(item_id)
+                    if item:
+                        item['distance'] = round(calculate_distance(item['latitude'], item['longitude'], user_lat, user_lon), 2)
+                        food_items.append(item)
                 
-                # Manual pagination
-                start = (int(page) - 1) * int(per_page)
-                end = start + int(per_page)
-                paginated_items = nearby_items[start:end]
+                if cursor is not None:
+                    return set_validators(jsonify({
+                        'food_items': food_items,
+                        'next_cursor': next_cursor,
+                        'per_page': per_page
+                    }), etag, last_modified), 200
                 
-                return jsonify({
-                    'food_items': [item.to_dict(float(user.latitude), float(user.longitude)) for item in paginated_items],
+                return set_validators(jsonify({
+                    'food_items': food_items,
                     'total': len(nearby_items),
                     'page': int(page),
                     'per_page': int(per_page)
-                }), 200
+                }), etag, last_modified), 200
             
             # For donors, show their own items
             elif user.role == 'donor':
                 query = query.filter_by(donor_id=user.id)
             
+            if terms:
+                query = filter_by_search(query, terms)
+            
             # Paginate and return
-            paginated = paginate_query(query, page, per_page)
+            paginated = paginate_query(query, page, per_page, cursor=cursor)
             
-            return jsonify({
+            return set_validators(jsonify({
                 'food_items': paginated['items'],
-                'total': paginated['total'],
-                'page': paginated['current_page'],
-                'per_page': paginated['per_page']
-            }), 200
+                **page_metadata(paginated)
+            }), etag, last_modified), 200
+        
+        except (InvalidCursor, InvalidDistance) as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/food/map', methods=['GET'])
+    @jwt_required()
+    def get_food_map():
+        try:
+            user = get_current_user()
+            
+            if not user:
+                return jsonify({'error': 'User not found'}), 404
             
+            bounds, zoom = parse_viewport(request.args.get('bbox'), request.args.get('zoom'))
+            
+            version, changed_at = feed_version()
+            etag = make_etag('food-map', version, user.id, user.updated_at, bounds, zoom)
+            last_modified = max(filter(None, [changed_at, user.updated_at]), default=None)
+            cached = not_modified(etag, last_modified)
+            if cached:
+                return cached
+            
+            # Zoomed out: grid clusters per tile, shared by every user and cached until a listing changes
+            if zoom <= app.config['MAP_CLUSTER_MAX_ZOOM']:
+                clusters = clustered_tiles(version, bounds, zoom)
+                return set_validators(jsonify({
+                    'clustered': True,
+                    'zoom': zoom,
+                    'clusters': clusters,
+                    'total': sum(cluster['count'] for cluster in clusters)
+                }), etag, last_modified), 200
+            
+            # Zoomed in: the listings themselves, from a range scan over the location index
+            food_items, truncated = items_in_viewport(bounds, app.config['MAP_MAX_ITEMS'])
+            if user.latitude and user.longitude:
+                user_lat, user_lon = float(user.latitude), float(user.longitude)
+                for item in food_items:
+                    item['distance'] = round(calculate_distance(item['latitude'], item['longitude'], user_lat, user_lon), 2)
+            
+            return set_validators(jsonify({
+                'clustered': False,
+                'zoom': zoom,
+                'food_items': food_items,
+                'total': len(food_items),
+                'truncated': truncated
+            }), etag, last_modified), 200
+        
+        except InvalidViewport as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -335,7 +535,7 @@ def create_app(config_name=None):
                 'message': 'Food item updated successfully',
                 'food_item': food_item.to_dict()
             }), 200
-            
+        
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
@@ -350,22 +550,23 @@ def create_app(config_name=None):
             if not data.get('food_item_id'):
                 return jsonify({'error': 'food_item_id is required'}), 400
             
-            food_item = FoodItem.query.get(data['food_item_id'])
-            
-            if not food_item:
-                return jsonify({'error': 'Food item not found'}), 404
-            
-            if food_item.status != 'available':
+            # Claim the listing with one conditional UPDATE; only the request whose update matches a row wins,
+            # so racing beneficiaries never both succeed and nobody waits on a lock held across the request
+            claimed = db.session.execute(
+                update(FoodItem)
+                .where(FoodItem.id == data['food_item_id'], FoodItem.status == 'available')
+                .values(status='requested', updated_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            
+            if not claimed:
+                db.session.rollback()
+                if not db.session.query(FoodItem.id).filter_by(id=data['food_item_id']).first():
+                    return jsonify({'error': 'Food item not found'}), 404
                 return jsonify({'error': 'Food item is not available'}), 400
             
-            # Check if user already requested this item
-            existing_request = PickupRequest.query.filter_by(
-                food_item_id=food_item.id,
-                beneficiary_id=current_user.id
-            ).first()
-            
-            if existing_request:
-                return jsonify({'error': 'You have already requested this item'}), 400
+            food_item = db.session.query(FoodItem.id, FoodItem.donor_id, FoodItem.title, FoodItem.quantity).filter_by(
+                id=data['food_item_id']).one()
             
             # Create pickup request
             pickup_request = PickupRequest(
@@ -376,13 +577,25 @@ def create_app(config_name=None):
             
             db.session.add(pickup_request)
             
-            # Update food item status
-            food_item.status = 'requested'
-            
-            db.session.commit()
+            try:
+                db.session.flush()
+            except IntegrityError:
+                # The unique (food_item_id, beneficiary_id) key; rolling back also releases the claim
+                db.session.rollback()
+                return jsonify({'error': 'You have already requested this item'}), 400
             
-            # Notify donor
-            create_notification(
+            # The claim bypassed the flush hooks, so its counter deltas are appended here;
+            # no shared row is locked, so claims on unrelated listings never wait on each other
+            adjust_stats({
+                'food_items.available': -1,
+                'food_items.requested': 1,
+                'food_items.available_quantity': -(food_item.quantity or 0),
+                FEED_VERSION_COUNTER: 1
+            })
+            
+            # Queue notification for donor
+            enqueue_notification(
+                idempotency_key=f'pickup_request:{pickup_request.id}',
                 user_id=food_item.donor_id,
                 notification_type='pickup_request',
                 title='New Pickup Request',
@@ -393,11 +606,13 @@ def create_app(config_name=None):
                 }
             )
             
+            db.session.commit()
+            
             return jsonify({
                 'message': 'Pickup request created successfully',
                 'pickup_request': pickup_request.to_dict()
             }), 201
-            
+        
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
@@ -406,14 +621,14 @@ def create_app(config_name=None):
     @jwt_required()
     def get_pickup_requests():
         try:
-            current_user_id = int(get_jwt_identity())
-            user = User.query.get(current_user_id)
+            user = get_current_user()
             
             if not user:
                 return jsonify({'error': 'User not found'}), 404
             
             page = request.args.get('page', 1)
             per_page = request.args.get('per_page', 20)
+            cursor = request.args.get('cursor')
             
             if user.role == 'donor':
                 # Get requests for donor's food items
@@ -425,15 +640,15 @@ def create_app(config_name=None):
                 # Admin can see all requests
                 query = PickupRequest.query
             
-            paginated = paginate_query(query, page, per_page)
+            paginated = paginate_query(query, page, per_page, cursor=cursor)
             
             return jsonify({
                 'pickup_requests': paginated['items'],
-                'total': paginated['total'],
-                'page': paginated['current_page'],
-                'per_page': paginated['per_page']
+                **page_metadata(paginated)
             }), 200
-            
+        
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -441,8 +656,7 @@ def create_app(config_name=None):
     @jwt_required()
     def update_pickup_request(request_id):
         try:
-            current_user_id = int(get_jwt_identity())
-            user = User.query.get(current_user_id)
+            user = get_current_user()
             
             if not user:
                 return jsonify({'error': 'User not found'}), 404
@@ -461,6 +675,9 @@ def create_app(config_name=None):
             elif user.role == 'beneficiary' and pickup_request.beneficiary_id != user.id:
                 return jsonify({'error': 'Unauthorized'}), 403
             
+            if pickup_request.food_item.status == 'expired' and status != 'cancelled':
+                return jsonify({'error': 'Food item has expired'}), 400
+            
             # Update status
             if status in ['accepted', 'rejected'] and user.role == 'donor':
                 pickup_request.status = status
@@ -510,7 +727,7 @@ def create_app(config_name=None):
                 'message': 'Pickup request updated successfully',
                 'pickup_request': pickup_request.to_dict()
             }), 200
-            
+        
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
@@ -524,18 +741,121 @@ def create_app(config_name=None):
             
             page = request.args.get('page', 1)
             per_page = request.args.get('per_page', 20)
+            cursor = request.args.get('cursor')
             
             query = Notification.query.filter_by(user_id=current_user_id).order_by(Notification.created_at.desc())
-            paginated = paginate_query(query, page, per_page)
+            paginated = paginate_query(query, page, per_page, cursor=cursor)
             
             return jsonify({
                 'notifications': paginated['items'],
-                'total': paginated['total'],
-                'page': paginated['current_page'],
-                'per_page': paginated['per_page']
+                **page_metadata(paginated)
+            }), 200
+        
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/notifications/unread-count', methods=['GET'])
+    @jwt_required()
+    def get_unread_count():
+        try:
+            return jsonify({'unread_count': unread_count(get_jwt_identity())}), 200
+        
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/notifications/stream-ticket', methods=['POST'])
+    @jwt_required()
+    def create_stream_ticket():
+        # EventSource cannot send headers, so it authenticates with a short-lived
+        # signed cookie instead of putting the access token in the URL (and the logs)
+        ttl = app.config['NOTIFICATION_STREAM_TICKET_TTL']
+        response = jsonify({'expires_in': ttl})
+        response.set_cookie(
+            STREAM_TICKET_COOKIE, issue_stream_ticket(get_jwt_identity()),
+            max_age=ttl, httponly=True, samesite='Strict', secure=request.is_secure
+        )
+        return response, 200
+    
+    @app.route('/notifications/stream', methods=['GET'])
+    def stream_notifications():
+        # Browsers send the ticket cookie; other clients may use an Authorization header
+        if verify_jwt_in_request(optional=True, locations=['headers']):
+            user_id = int(get_jwt_identity())
+        else:
+            user_id = read_stream_ticket(request.cookies.get(STREAM_TICKET_COOKIE, ''))
+        if user_id is None:
+            return jsonify({'error': 'Stream ticket missing or expired'}), 401
+        
+        try:
+            # A client reopening the stream itself passes the id it last saw as a parameter
+            last_event_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0)
+        except ValueError:
+            last_event_id = 0
+        
+        return Response(
+            notification_stream(user_id, last_event_id),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    @app.route('/notifications/read-all', methods=['PUT'])
+    @jwt_required()
+    def mark_all_notifications_read():
+        try:
+            current_user_id = get_jwt_identity()
+            
+            updated = mark_notifications_read(current_user_id)
+            db.session.commit()
+            
+            return jsonify({
+                'message': 'All notifications marked as read',
+                'updated': updated,
+                'unread_count': unread_count(current_user_id)
             }), 200
+        
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/notifications/read', methods=['PUT'])
+    @jwt_required()
+    def mark_notifications_batch_read():
+        try:
+            current_user_id = get_jwt_identity()
+            data = request.get_json() or {}
             
+            ids = data.get('ids')
+            up_to_id = data.get('up_to_id')
+            before = data.get('before')
+            
+            if ids is None and up_to_id is None and before is None:
+                return jsonify({'error': 'ids, up_to_id or before is required'}), 400
+            
+            try:
+                if ids is not None:
+                    if not isinstance(ids, list):
+                        raise ValueError
+                    ids = [int(notification_id) for notification_id in ids]
+                if up_to_id is not None:
+                    up_to_id = int(up_to_id)
+                if before is not None:
+                    before = datetime.fromisoformat(before.replace('Z', '+00:00')).replace(tzinfo=None)
+            except (ValueError, TypeError, AttributeError):
+                return jsonify({'error': 'Invalid ids, up_to_id or before'}), 400
+            
+            updated = mark_notifications_read(current_user_id, ids=ids, up_to_id=up_to_id, before=before)
+            db.session.commit()
+            
+            return jsonify({
+                'message': 'Notifications marked as read',
+                'updated': updated,
+                'unread_count': unread_count(current_user_id)
+            }), 200
+        
         except Exception as e:
+            db.session.rollback()
             return jsonify({'error': str(e)}), 500
     
     @app.route('/notifications/<int:notification_id>/read', methods=['PUT'])
@@ -556,7 +876,7 @@ def create_app(config_name=None):
             db.session.commit()
             
             return jsonify({'message': 'Notification marked as read'}), 200
-            
+        
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
@@ -568,21 +888,22 @@ def create_app(config_name=None):
         try:
             page = request.args.get('page', 1)
             per_page = request.args.get('per_page', 20)
+            cursor = request.args.get('cursor')
             role = request.args.get('role')
             
             query = User.query
             if role:
                 query = query.filter_by(role=role)
             
-            paginated = paginate_query(query, page, per_page)
+            paginated = paginate_query(query, page, per_page, cursor=cursor)
             
             return jsonify({
                 'users': paginated['items'],
-                'total': paginated['total'],
-                'page': paginated['current_page'],
-                'per_page': paginated['per_page']
+                **page_metadata(paginated)
             }), 200
-            
+        
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -592,18 +913,19 @@ def create_app(config_name=None):
         try:
             page = request.args.get('page', 1)
             per_page = request.args.get('per_page', 20)
+            cursor = request.args.get('cursor')
             status = request.args.get('status', 'pending')
             
             query = VerificationRequest.query.filter_by(status=status)
-            paginated = paginate_query(query, page, per_page)
+            paginated = paginate_query(query, page, per_page, cursor=cursor)
             
             return jsonify({
                 'verification_requests': paginated['items'],
-                'total': paginated['total'],
-                'page': paginated['current_page'],
-                'per_page': paginated['per_page']
+                **page_metadata(paginated)
             }), 200
-            
+        
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -632,25 +954,149 @@ def create_app(config_name=None):
                 verification_request.user.verified = True
             
             db.session.commit()
+            invalidate_user(verification_request.user_id)
             
             return jsonify({
                 'message': 'Verification request updated successfully',
                 'verification_request': verification_request.to_dict()
             }), 200
-            
+        
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
     
+    @app.route('/admin/stats', methods=['GET'])
+    @role_required(['admin'])
+    def get_admin_stats(current_user):
+        try:
+            return jsonify({'stats': stats_snapshot()}), 200
+        
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/admin/export/<name>', methods=['GET'])
+    @role_required(['admin'])
+    def export_table(current_user, name):
+        try:
+            export_format = request.args.get('format', 'csv')
+            compress = request.accept_encodings['gzip'] > 0
+            body = export_stream(name, export_format, request.args.get('since'), request.args.get('until'),
+                                 compress=compress)
+            
+            response = Response(body, mimetype=EXPORT_FORMATS.get(export_format))
+            filename = f"{name}-{datetime.utcnow():%Y%m%d}.{export_format}"
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+            response.headers['Cache-Control'] = 'no-store'
+            response.headers['X-Accel-Buffering'] = 'no'  # let proxies pass chunks through as they are written
+            if compress:
+                response.headers['Content-Encoding'] = 'gzip'
+            response.vary.add('Accept-Encoding')
+            return response
+        
+        except InvalidExport as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/admin/db/pool', methods=['GET'])
+    @role_required(['admin'])
+    def get_db_pool_stats(current_user):
+        try:
+            stats = {'pool': pool_stats(db.engine)}
+            if 'replica_router' in app.extensions:
+                stats['replication'] = app.extensions['replica_router'].status()
+            return jsonify(stats), 200
+        
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/admin/dispatch/metrics', methods=['GET'])
+    @role_required(['admin'])
+    def get_dispatch_metrics(current_user):
+        try:
+            return jsonify({'dispatch': queue_metrics()}), 200
+        
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    # Upload Routes
+    @app.route('/uploads', methods=['POST'])
+    @jwt_required()
+    def upload_image():
+        try:
+            # Multipart bodies are spooled to disk by the form parser; raw bodies stream straight through
+            upload = request.files.get('file')
+            if upload:
+                result = save_upload(app, upload.stream, upload.filename, upload.mimetype)
+            else:
+                result = save_upload(app, request.stream, content_type=request.content_type)
+            
+            return jsonify({
+                'message': 'Image already uploaded' if result['deduplicated'] else 'Image uploaded successfully',
+                **result
+            }), 200 if result['deduplicated'] else 201
+        
+        except InvalidUpload as e:
+            return jsonify({'error': str(e)}), 400
+        except RequestEntityTooLarge:
+            return jsonify({'error': 'File is too large'}), 413
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/uploads/<path:filename>', methods=['GET'])
+    def serve_upload(filename):
+        folder = upload_folder(app)
+        if not os.path.exists(os.path.join(folder, filename)) and filename.startswith(f'{THUMBNAIL_DIR}/'):
+            # Thumbnail still being generated: fall back to the original without caching the redirect
+            original = find_original(folder, filename.split('/', 1)[1].rsplit('-', 1)[0])
+            if original:
+                response = redirect(f'/uploads/{original}')
+                response.headers['Cache-Control'] = 'no-store'
+                return response
+        
+        # Names are content hashes, so a stored file never changes
+        response = send_from_directory(folder, filename, max_age=31536000)
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+    
     # Health check
     @app.route('/health', methods=['GET'])
     def health_check():
         return jsonify({'status': 'healthy', 'timestamp': datetime.utcnow().isoformat()}), 200
     
+    # Readiness: only report ready when the primary database answers
+    @app.route('/ready', methods=['GET'])
+    def readiness_check():
+        start = time.perf_counter()
+        try:
+            with db.engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except Exception as e:
+            return jsonify({'status': 'unavailable', 'database': str(e)}), 503
+        
+        return jsonify({
+            'status': 'ready',
+            'database': 'ok',
+            'database_latency_ms': round((time.perf_counter() - start) * 1000, 2)
+        }), 200
+    
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics():
+        metrics = app.extensions.get('metrics')
+        if not metrics:
+            return jsonify({'error': 'Metrics are disabled'}), 404
+        
+        # Never served anonymously: the labels reveal routes and traffic
+        token = app.config['METRICS_TOKEN']
+        if not token:
+            return jsonify({'error': 'Set METRICS_TOKEN to enable /metrics'}), 403
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        return Response(metrics.exposition(db.engine), content_type=METRICS_CONTENT_TYPE)
+    
     return app
 
-# Create app instance for Gunicorn
-app = create_app()
-
+# Servers use the factory (gunicorn 'app:create_app()', flask --app app), so importing builds nothing
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
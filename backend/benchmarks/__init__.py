@@ -0,0 +1,77 @@
+"""Benchmarks for the Food Surplus backend
+
+Run from the backend directory, e.g. ``python -m benchmarks.notify_fanout``.
+Each benchmark runs against a throwaway SQLite database.
+"""
+import json
+import os
+import tempfile
+
+from werkzeug.serving import WSGIRequestHandler
+
+def create_benchmark_app(**overrides):
+    """Create the Flask app bound to a fresh temporary SQLite database with its schema"""
+    db_dir = tempfile.mkdtemp(prefix='food-surplus-bench-')
+    database_uri = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    
+    from config import config, DevelopmentConfig
+    from app import create_app
+    from models import db
+    from stats import reconcile_stats
+    
+    config['benchmark'] = type('BenchmarkConfig', (DevelopmentConfig,), {
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        **overrides
+    })
+    app = create_app('benchmark')
+    # The app no longer touches the database at startup; this is what `flask init-db` does
+    with app.app_context():
+        db.create_all()
+        reconcile_stats()
+    return app
+
+def eager_loads(model):
+    """Loader options for the relationships to_dict reads, for ORM baselines without N+1 queries"""
+    from sqlalchemy.orm import joinedload
+    from models import FoodItem, PickupRequest, VerificationRequest
+    
+    return {
+        FoodItem: [joinedload(FoodItem.donor)],
+        PickupRequest: [joinedload(PickupRequest.food_item).joinedload(FoodItem.donor),
+                        joinedload(PickupRequest.beneficiary)],
+        VerificationRequest: [joinedload(VerificationRequest.user)],
+    }.get(model, [])
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+def check_baseline(results, output=None, baseline=None, tolerance=0.25):
+    """Save results as JSON and report metrics more than tolerance worse than a saved baseline
+    
+    results maps a benchmark name to its metrics. Metrics ending in _ms or _us are
+    better lower, everything else (requests/sec, rows/sec) better higher.
+    """
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if not baseline:
+        return []
+    
+    with open(baseline) as f:
+        previous = json.load(f)
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            old = previous.get(name, {}).get(metric)
+            if not old:
+                continue
+            lower_is_better = metric.endswith(('_ms', '_us'))
+            worse = value > old * (1 + tolerance) if lower_is_better else value < old * (1 - tolerance)
+            if worse:
+                regressions.append(f'{name} {metric}: {old:.1f} -> {value:.1f}')
+    return regressions
@@ -0,0 +1,78 @@
+"""A donor publishing a batch of listings: one POST /food each against POST /food/bulk
+
+Seeds --beneficiaries around Manhattan, then posts --items listings both ways and
+drains the notification queue after each, reporting request time, fan-out time and
+the notifications written. The bulk path inserts once and coalesces the fan-out into
+one notification per beneficiary.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from benchmarks import create_benchmark_app
+from benchmarks.notify_fanout import seed_beneficiaries, NYC_LAT, NYC_LON
+from dispatch import process_batch
+from models import db, User, Notification
+from utils import identity_claims
+
+def listings(count, rng):
+    start = datetime.utcnow() + timedelta(hours=1)
+    return [
+        {
+            'title': f'Bench listing {i}',
+            'quantity': rng.randint(1, 20),
+            'pickup_start': start.isoformat(),
+            'pickup_end': (start + timedelta(hours=2)).isoformat(),
+            'latitude': NYC_LAT + rng.gauss(0, 0.05),
+            'longitude': NYC_LON + rng.gauss(0, 0.05)
+        }
+        for i in range(count)
+    ]
+
+def drain():
+    """Run the dispatcher until the queue is empty; returns seconds taken and notifications written"""
+    before = Notification.query.count()
+    start = time.perf_counter()
+    while process_batch():
+        pass
+    return time.perf_counter() - start, Notification.query.count() - before
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--beneficiaries', type=int, default=10000)
+    parser.add_argument('--items', type=int, default=200)
+    args = parser.parse_args()
+    
+    app = create_benchmark_app()
+    client = app.test_client()
+    with app.app_context():
+        donor = User(name='Bench Donor', email='bench-donor@example.com', password_hash='x',
+                     role='donor', latitude=NYC_LAT, longitude=NYC_LON)
+        db.session.add(donor)
+        db.session.commit()
+        seed_beneficiaries(args.beneficiaries, random.Random(1))
+        headers = {'Authorization': 'Bearer ' + create_access_token(
+            identity=str(donor.id), additional_claims=identity_claims(donor))}
+        
+        items = listings(args.items, random.Random(2))
+        start = time.perf_counter()
+        for item in items:
+            response = client.post('/food', json=item, headers=headers)
+            assert response.status_code == 201, response.get_json()
+        single = (time.perf_counter() - start, *drain())
+        
+        start = time.perf_counter()
+        response = client.post('/food/bulk', json=items, headers=headers)
+        assert response.status_code == 201, response.get_json()
+        bulk = (time.perf_counter() - start, *drain())
+    
+    print(f'{args.items} listings, {args.beneficiaries} beneficiaries')
+    print(f"{'':<16} {'requests ms':>12} {'fan-out ms':>11} {'notifications':>14}")
+    for name, (requests, fanout, notifications) in [('POST /food each', single), ('POST /food/bulk', bulk)]:
+        print(f'{name:<16} {requests * 1000:>12.0f} {fanout * 1000:>11.0f} {notifications:>14}')
+
+if __name__ == '__main__':
+    main()
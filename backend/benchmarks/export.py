@@ -0,0 +1,69 @@
+"""Memory and throughput of GET /admin/export against loading every row at once
+
+Seeds --notifications rows (benchmarks.seed), then exports them as CSV, NDJSON and
+gzipped NDJSON, reading each response as it streams. The baseline loads the same
+rows with Notification.query.all() and to_dict(), as a single unpaginated request
+would. Peak memory is the tracemalloc high-water mark while each export runs.
+"""
+import argparse
+import time
+import tracemalloc
+
+from flask_jwt_extended import create_access_token
+
+from benchmarks import create_benchmark_app
+from benchmarks.seed import generate
+from models import db, User, Notification
+from utils import identity_claims
+
+def measure_memory(func):
+    """Run func, returning its result, seconds taken and peak traced memory in MB"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notifications', type=int, default=1000000)
+    args = parser.parse_args()
+    
+    app = create_benchmark_app()
+    client = app.test_client()
+    with app.app_context():
+        ids = generate(users=2000, food_items=1000, pickup_requests=100, notifications=args.notifications)
+        admin = db.session.get(User, ids['admin'][0])
+        headers = {'Authorization': 'Bearer ' + create_access_token(
+            identity=str(admin.id), additional_claims=identity_claims(admin))}
+        
+        def export(query_string, encoding=None):
+            response = client.get('/admin/export/notifications', query_string=query_string, buffered=False,
+                                  headers={**headers, 'Accept-Encoding': encoding or 'identity'})
+            assert response.status_code == 200, response.get_data(as_text=True)
+            size = sum(len(chunk) for chunk in response.response)
+            response.close()
+            return size
+        
+        def load_all():
+            rows = [notification.to_dict() for notification in Notification.query.all()]
+            db.session.expunge_all()
+            return len(rows)
+        
+        runs = [
+            ('query.all() + to_dict', load_all),
+            ('export csv', lambda: export({'format': 'csv'})),
+            ('export ndjson', lambda: export({'format': 'ndjson'})),
+            ('export ndjson gzip', lambda: export({'format': 'ndjson'}, 'gzip')),
+        ]
+        print(f'{args.notifications} notifications')
+        print(f"{'':<22} {'seconds':>8} {'rows/s':>9} {'peak MB':>8} {'body MB':>8}")
+        for name, func in runs:
+            result, elapsed, peak = measure_memory(func)
+            body = f'{result / 1024 / 1024:>8.1f}' if name.startswith('export') else f"{'':>8}"
+            print(f'{name:<22} {elapsed:>8.1f} {args.notifications / elapsed:>9.0f} {peak:>8.1f} {body}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""Replay the main user flows against a local server and report latency and throughput
+
+Seeds a dataset (benchmarks.seed), serves the app on a threaded local server and
+runs --concurrency virtual users for --duration seconds. Each picks weighted
+flows: beneficiaries browse nearby food, request pickups and read notifications;
+donors check their dashboard, list food and answer requests; anyone logs in.
+
+Reports p50/p99 per endpoint and overall requests/sec. Exits non-zero on any
+unexpected status, or with --baseline when a run regresses past --tolerance:
+    
+    python -m benchmarks.load --output load.json          # on main
+    python -m benchmarks.load --baseline load.json        # on the branch
+"""
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from werkzeug.serving import make_server
+
+from benchmarks import create_benchmark_app, QuietHandler, percentile, check_baseline
+from benchmarks.seed import generate, PASSWORD
+from models import User
+from utils import identity_claims
+
+# Flow name, role that runs it, relative weight
+FLOWS = [
+    ('browse', 'beneficiary', 40),
+    ('request_pickup', 'beneficiary', 15),
+    ('notifications', 'beneficiary', 10),
+    ('dashboard', 'donor', 15),
+    ('list_food', 'donor', 10),
+    ('respond', 'donor', 5),
+    ('login', 'beneficiary', 5),
+]
+USERS_PER_ROLE = 200  # distinct identities the virtual users rotate through
+
+class VirtualUser:
+    """One client connection replaying flows and recording each call's latency"""
+    
+    def __init__(self, port, accounts, rng, record):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        self.accounts = accounts
+        self.rng = rng
+        self.record = record
+    
+    def call(self, method, path, label, token=None, body=None, expected=(200,)):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        start = time.perf_counter()
+        self.connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = self.connection.getresponse()
+        data = response.read()
+        self.record(label, time.perf_counter() - start, response.status in expected, response.status)
+        return json.loads(data) if data and response.status in expected else {}
+    
+    def run(self, flow, role):
+        email, token = self.rng.choice(self.accounts[role])
+        getattr(self, flow)(token, email)
+    
+    def browse(self, token, email):
+        page = self.rng.choice([1, 1, 1, 2, 3])
+        self.call('GET', f'/food?max_distance=10&page={page}', 'GET /food (nearby)', token)
+    
+    def request_pickup(self, token, email):
+        items = self.call('GET', '/food?max_distance=10', 'GET /food (nearby)', token).get('food_items')
+        if items:
+            # Another virtual user may have taken it first, or this one asked before
+            self.call('POST', '/pickup', 'POST /pickup', token, {'food_item_id': self.rng.choice(items)['id']},
+                      expected=(201, 400))
+    
+    def notifications(self, token, email):
+        self.call('GET', '/notifications', 'GET /notifications', token)
+        self.call('GET', '/notifications/unread-count', 'GET /notifications/unread-count', token)
+        if self.rng.random() < 0.2:
+            self.call('PUT', '/notifications/read-all', 'PUT /notifications/read-all', token)
+    
+    def dashboard(self, token, email):
+        self.call('GET', '/food', 'GET /food (donor)', token)
+        self.call('GET', '/pickup', 'GET /pickup', token)
+    
+    def list_food(self, token, email):
+        now = datetime.utcnow()
+        self.call('POST', '/food', 'POST /food', token, {
+            'title': 'Load test listing',
+            'quantity': self.rng.randint(1, 20),
+            'pickup_start': now.isoformat(),
+            'pickup_end': (now + timedelta(hours=4)).isoformat()
+        }, expected=(201,))
+    
+    def respond(self, token, email):
+        pickup_requests = self.call('GET', '/pickup', 'GET /pickup', token).get('pickup_requests', [])
+        pending = [pickup for pickup in pickup_requests if pickup['status'] == 'pending']
+        if pending:
+            # A concurrent expiry or another response can leave the request unanswerable
+            self.call('PUT', f"/pickup/{pending[0]['id']}", 'PUT /pickup/<id>', token,
+                      {'status': self.rng.choice(['accepted', 'rejected'])}, expected=(200, 400))
+    
+    def login(self, token, email):
+        self.call('POST', '/auth/login', 'POST /auth/login', body={'email': email, 'password': PASSWORD})
+
+def accounts_for(ids):
+    """(email, token) pairs for a sample of each role, minted without going through login"""
+    accounts = {}
+    for role in ('donor', 'beneficiary'):
+        users = User.query.filter(User.id.in_(ids[role][:USERS_PER_ROLE])).all()
+        accounts[role] = [(user.email, create_access_token(identity=str(user.id), additional_claims=identity_claims(user)))
+                          for user in users]
+    return accounts
+
+def run(app, accounts, concurrency, duration, seed):
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    lock = threading.Lock()
+    latencies = defaultdict(list)
+    failures = defaultdict(lambda: defaultdict(int))
+    
+    def record(label, elapsed, ok, status):
+        with lock:
+            latencies[label].append(elapsed)
+            if not ok:
+                failures[label][status] += 1
+    
+    deadline = time.perf_counter() + duration
+    names = [(flow, role) for flow, role, _ in FLOWS]
+    weights = [weight for _, _, weight in FLOWS]
+    
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        user = VirtualUser(server.server_port, accounts, rng, record)
+        while time.perf_counter() < deadline:
+            user.run(*rng.choices(names, weights=weights)[0])
+    
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    return latencies, failures, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--food-items', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20, help='seconds')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+    
+    # A low bcrypt cost keeps logins in the mix without them dominating the run
+    app = create_benchmark_app(BCRYPT_LOG_ROUNDS=4)
+    with app.app_context():
+        ids = generate(users=args.users, food_items=args.food_items, pickup_requests=args.food_items // 10,
+                       notifications=args.users * 5, seed=args.seed)
+        accounts = accounts_for(ids)
+    
+    latencies, failures, elapsed = run(app, accounts, args.concurrency, args.duration, args.seed)
+    
+    total = sum(len(samples) for samples in latencies.values())
+    results = {'overall': {'rps': total / elapsed}}
+    print(f"{'endpoint':<34} {'requests':>9} {'p50 ms':>9} {'p99 ms':>9} {'failed':>7}")
+    for label in sorted(latencies):
+        samples = latencies[label]
+        results[label] = {'p50_ms': percentile(samples, 50) * 1000, 'p99_ms': percentile(samples, 99) * 1000}
+        failed = sum(failures.get(label, {}).values())
+        print(f"{label:<34} {len(samples):>9} {results[label]['p50_ms']:>9.1f} {results[label]['p99_ms']:>9.1f} "
+              f"{failed:>7}")
+    print(f"\n{total} requests in {elapsed:.1f}s with {args.concurrency} clients: {results['overall']['rps']:.0f} req/s")
+    
+    errors = [f'{label} {dict(statuses)}' for label, statuses in failures.items()]
+    for error in errors:
+        print(f'UNEXPECTED STATUS {error}')
+    regressions = check_baseline(results, args.output, args.baseline, args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    sys.exit(1 if errors or regressions else 0)
+
+if __name__ == '__main__':
+    main()
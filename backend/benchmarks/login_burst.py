@@ -0,0 +1,98 @@
+"""GET /food latency while a burst of logins hammers bcrypt
+
+Runs the app on a local threaded server twice, once hashing inline and once
+through the bounded password pool, and reports GET /food p50/p99 plus how
+many logins were shed with 503 during the burst.
+"""
+import threading
+import time
+import urllib.error
+import urllib.request
+import json
+from datetime import datetime, timedelta
+
+from werkzeug.serving import make_server
+
+from benchmarks import create_benchmark_app, QuietHandler, percentile
+from models import db, User, FoodItem
+
+LOGIN_THREADS = 24
+FEED_REQUESTS = 50
+BCRYPT_LOG_ROUNDS = 10
+PASSWORD = 'benchmark-password'
+
+def call(url, body=None, token=None):
+    request = urllib.request.Request(url, data=json.dumps(body).encode() if body else None)
+    request.add_header('Content-Type', 'application/json')
+    if token:
+        request.add_header('Authorization', f'Bearer {token}')
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, None
+
+def seed(app):
+    with app.app_context():
+        now = datetime.utcnow()
+        user = User(name='Bench Beneficiary', email='bench@example.com', role='beneficiary',
+                    latitude=40.7128, longitude=-74.0060)
+        user.set_password(PASSWORD)
+        donor = User(name='Bench Donor', email='donor@example.com', password_hash='x', role='donor')
+        db.session.add_all([user, donor])
+        db.session.flush()
+        db.session.add_all([
+            FoodItem(donor_id=donor.id, title=f'Item {i}', quantity=1, pickup_start=now,
+                     pickup_end=now + timedelta(hours=1), latitude=40.7128 + i * 1e-4, longitude=-74.0060)
+            for i in range(50)
+        ])
+        db.session.commit()
+
+def run(workers):
+    app = create_benchmark_app(PASSWORD_HASH_WORKERS=workers, PASSWORD_HASH_QUEUE_SIZE=8,
+                               BCRYPT_LOG_ROUNDS=BCRYPT_LOG_ROUNDS)
+    seed(app)
+    
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+    
+    _, body = call(f'{base}/auth/login', {'email': 'bench@example.com', 'password': PASSWORD})
+    token = body['access_token']
+    
+    stop = threading.Event()
+    statuses = []
+    
+    def login_storm():
+        while not stop.is_set():
+            status, _ = call(f'{base}/auth/login', {'email': 'bench@example.com', 'password': PASSWORD})
+            statuses.append(status)
+    
+    storm = [threading.Thread(target=login_storm, daemon=True) for _ in range(LOGIN_THREADS)]
+    for thread in storm:
+        thread.start()
+    time.sleep(0.5)
+    
+    latencies = []
+    for _ in range(FEED_REQUESTS):
+        start = time.perf_counter()
+        status, _ = call(f'{base}/food', token=token)
+        latencies.append(time.perf_counter() - start)
+        assert status == 200
+    
+    stop.set()
+    for thread in storm:
+        thread.join()
+    server.shutdown()
+    
+    return (percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000,
+            statuses.count(200), statuses.count(503))
+
+def main():
+    print(f"{'mode':<16} {'food p50 ms':>12} {'food p99 ms':>12} {'logins ok':>10} {'shed 503':>9}")
+    for label, workers in [('inline', 0), ('pool (2+8 slots)', 2)]:
+        p50, p99, ok, shed = run(workers)
+        print(f"{label:<16} {p50:>12.1f} {p99:>12.1f} {ok:>10} {shed:>9}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Microbenchmarks for the hot helpers: distances, fan-out, map tiles, pagination and serializers
+
+Runs on a seeded dataset (benchmarks.seed) and reports the best and median
+time per operation. With --output the results are saved as JSON; with
+--baseline the run exits non-zero if any operation got slower than the
+saved run by more than --tolerance.
+"""
+import argparse
+import itertools
+import random
+import statistics
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from benchmarks import create_benchmark_app, check_baseline, eager_loads
+from benchmarks.seed import generate, clustered_point
+from models import db, User, FoodItem, PickupRequest, Notification
+from map_tiles import tiles_covering, compute_tiles, items_in_viewport
+from serialization import projection_for
+from utils import (calculate_distance, haversine_many, find_nearby_food_items, notify_nearby_beneficiaries,
+                   paginate_query)
+
+REPEATS = 5
+
+def measure(name, func, number):
+    """Seconds per call of func, best and median over REPEATS runs of number calls"""
+    func()  # warm caches and compiled statements
+    runs = [elapsed / number for elapsed in timeit.repeat(func, number=number, repeat=REPEATS)]
+    return name, {'best_us': min(runs) * 1e6, 'median_us': statistics.median(runs) * 1e6, 'number': number}
+
+def distance_benchmarks(rng):
+    points = [clustered_point(rng) for _ in range(10000)]
+    lats = [lat for lat, _ in points]
+    lons = [lon for _, lon in points]
+    lat, lon = points[0]
+    
+    yield measure('calculate_distance', lambda: calculate_distance(40.7589, -73.9851, 40.7831, -73.9712), 100000)
+    yield measure('calculate_distance x10k', lambda: [calculate_distance(lat, lon, a, b) for a, b in points], 10)
+    yield measure('haversine_many x10k', lambda: haversine_many(lat, lon, lats, lons), 50)
+    yield measure('find_nearby_food_items 10km', lambda: find_nearby_food_items('available', lat, lon, 10), 20)
+
+def notify_benchmark(ids):
+    donor = db.session.get(User, ids['donor'][0])
+    now = datetime.utcnow()
+    food_item = FoodItem(donor_id=donor.id, title='Micro listing', quantity=5, pickup_start=now,
+                         pickup_end=now + timedelta(hours=2), latitude=40.7589, longitude=-73.9851)
+    db.session.add(food_item)
+    db.session.commit()
+    
+    def notify():
+        notify_nearby_beneficiaries(food_item, commit=False)
+        db.session.rollback()
+    
+    yield measure('notify_nearby_beneficiaries', notify, 10)
+
+def map_benchmarks():
+    # Manhattan and Brooklyn at city zoom, and a few blocks of Midtown zoomed in
+    city = (-74.05, 40.6, -73.85, 40.85)
+    
+    yield measure('compute_tiles zoom 11 (uncached)', lambda: compute_tiles(11, tiles_covering(city, 11)), 20)
+    yield measure('items_in_viewport zoom 16', lambda: items_in_viewport((-73.995, 40.75, -73.975, 40.765), 500), 20)
+
+def pagination_benchmarks(ids):
+    available = lambda: FoodItem.query.filter_by(status='available')
+    
+    yield measure('paginate FoodItem page 1', lambda: paginate_query(available(), 1, 50), 50)
+    yield measure('paginate FoodItem page 20', lambda: paginate_query(available(), 20, 50), 50)
+    yield measure('paginate FoodItem cursor', lambda: paginate_query(available(), per_page=50, cursor=''), 50)
+    yield measure('paginate PickupRequest page 1', lambda: paginate_query(PickupRequest.query, 1, 50), 50)
+    yield measure('paginate Notification page 1',
+                  lambda: paginate_query(Notification.query.filter_by(user_id=ids['beneficiary'][0]), 1, 50), 50)
+
+def serializer_benchmarks():
+    for model in (FoodItem, PickupRequest, Notification, User):
+        first_ids = [row_id for (row_id,) in db.session.query(model.id).order_by(model.id).limit(500)]
+        query = model.query.filter(model.id.in_(first_ids)).order_by(model.id)
+        objects = query.options(*eager_loads(model)).all()
+        rows = projection_for(model).select(query).all()
+        serialize = projection_for(model).serialize
+        
+        yield measure(f'{model.__name__}.to_dict x{len(objects)}', lambda: [obj.to_dict() for obj in objects], 20)
+        yield measure(f'{model.__name__} projection x{len(rows)}', lambda: [serialize(row) for row in rows], 20)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--food-items', type=int, default=10000)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+    
+    app = create_benchmark_app()
+    results = {}
+    with app.app_context():
+        ids = generate(users=args.users, food_items=args.food_items, pickup_requests=args.food_items // 4,
+                       notifications=args.users * 5)
+        rng = random.Random(7)
+        
+        print(f"{'benchmark':<40} {'calls':>7} {'best us':>11} {'median us':>11}")
+        for name, result in itertools.chain(distance_benchmarks(rng), notify_benchmark(ids), map_benchmarks(),
+                                            pagination_benchmarks(ids), serializer_benchmarks()):
+            results[name] = result
+            print(f"{name:<40} {result['number']:>7} {result['best_us']:>11.1f} {result['median_us']:>11.1f}")
+    
+    regressions = check_baseline({name: {'median_us': r['median_us']} for name, r in results.items()},
+                                 args.output, args.baseline, args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
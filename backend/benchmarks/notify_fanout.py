@@ -0,0 +1,74 @@
+"""Per-listing cost of notify_nearby_beneficiaries at increasing beneficiary counts"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from benchmarks import create_benchmark_app
+from models import db, User, FoodItem, Notification
+from utils import notify_nearby_beneficiaries
+
+NYC_LAT, NYC_LON = 40.7128, -74.0060
+BENEFICIARY_COUNTS = [1000, 10000, 100000]
+LISTINGS_PER_RUN = 5
+
+def seed_beneficiaries(count, rng):
+    """Insert beneficiaries scattered within roughly 50 km of Manhattan"""
+    db.session.execute(insert(User), [
+        {
+            'name': f'Beneficiary {i}',
+            'email': f'bench-beneficiary-{count}-{i}@example.com',
+            'password_hash': 'x',
+            'role': 'beneficiary',
+            'latitude': NYC_LAT + rng.gauss(0, 0.15),
+            'longitude': NYC_LON + rng.gauss(0, 0.15)
+        }
+        for i in range(count)
+    ])
+    db.session.commit()
+
+def run(count):
+    rng = random.Random(count)
+    db.drop_all()
+    db.create_all()
+    
+    donor = User(name='Bench Donor', email='bench-donor@example.com', password_hash='x',
+                 role='donor', latitude=NYC_LAT, longitude=NYC_LON)
+    db.session.add(donor)
+    db.session.commit()
+    seed_beneficiaries(count, rng)
+    
+    now = datetime.utcnow()
+    elapsed = 0.0
+    sent = 0
+    for i in range(LISTINGS_PER_RUN):
+        food_item = FoodItem(
+            donor_id=donor.id,
+            title=f'Bench listing {i}',
+            quantity=10,
+            pickup_start=now,
+            pickup_end=now + timedelta(hours=2),
+            latitude=NYC_LAT + rng.gauss(0, 0.05),
+            longitude=NYC_LON + rng.gauss(0, 0.05)
+        )
+        db.session.add(food_item)
+        db.session.commit()
+        
+        start = time.perf_counter()
+        sent += notify_nearby_beneficiaries(food_item)
+        elapsed += time.perf_counter() - start
+    
+    assert Notification.query.count() == sent
+    return elapsed / LISTINGS_PER_RUN, sent / LISTINGS_PER_RUN
+
+def main():
+    app = create_benchmark_app()
+    with app.app_context():
+        print(f"{'beneficiaries':>14} {'notified/listing':>17} {'ms/listing':>11}")
+        for count in BENEFICIARY_COUNTS:
+            per_listing, notified = run(count)
+            print(f"{count:>14} {notified:>17.0f} {per_listing * 1000:>11.1f}")
+
+if __name__ == '__main__':
+    main()
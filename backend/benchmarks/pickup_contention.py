@@ -0,0 +1,148 @@
+"""Many beneficiaries racing to request the same listing
+
+For each listing, --threads clients released together by a barrier POST /pickup
+through a threaded local server. Exactly one must win (201) and the rest must
+see 400; any other outcome, a listing with more than one pickup request, or
+counter drift exits non-zero. Reports claim attempts per second and latency.
+
+With --distinct every client claims listings nobody else wants, so all of them
+must win; this measures how much unrelated claims still hold each other up.
+Save and compare runs with --output, --baseline and --tolerance like
+benchmarks.micro.
+
+SQLite serializes writers, so pass --database-url to race on PostgreSQL or MySQL.
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func, insert
+from werkzeug.serving import make_server
+
+from benchmarks import create_benchmark_app, QuietHandler, percentile, check_baseline
+from models import db, User, FoodItem, PickupRequest
+from stats import reconcile_stats
+from utils import identity_claims
+
+def seed(threads, items):
+    now = datetime.utcnow()
+    donor = User(name='Bench Donor', email='contention-donor@example.com', password_hash='x', role='donor',
+                 latitude=40.7589, longitude=-73.9851)
+    db.session.add(donor)
+    db.session.flush()
+    db.session.execute(insert(User), [
+        {'name': f'Beneficiary {i}', 'email': f'contention-{i}@example.com', 'password_hash': 'x',
+         'role': 'beneficiary', 'latitude': 40.7831, 'longitude': -73.9712}
+        for i in range(threads)
+    ])
+    listings = [FoodItem(donor_id=donor.id, title=f'Hot listing {i}', quantity=10, pickup_start=now,
+                         pickup_end=now + timedelta(hours=2), latitude=40.7589, longitude=-73.9851)
+                for i in range(items)]
+    db.session.add_all(listings)
+    db.session.commit()
+    reconcile_stats()
+    
+    beneficiaries = User.query.filter_by(role='beneficiary').order_by(User.id).all()
+    tokens = [create_access_token(identity=str(user.id), additional_claims=identity_claims(user))
+              for user in beneficiaries]
+    return tokens, [listing.id for listing in listings]
+
+def race(port, tokens, claims):
+    """Have every client POST /pickup for its list of item ids, round by round; claims[i] belongs to tokens[i]"""
+    barrier = threading.Barrier(len(tokens))
+    statuses = {item_id: Counter() for item_ids in claims for item_id in item_ids}
+    latencies = []
+    lock = threading.Lock()
+    
+    def client(token, item_ids):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'}
+        for item_id in item_ids:
+            barrier.wait()
+            start = time.perf_counter()
+            connection.request('POST', '/pickup', body=json.dumps({'food_item_id': item_id}), headers=headers)
+            response = connection.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[item_id][response.status] += 1
+                latencies.append(elapsed)
+    
+    threads = [threading.Thread(target=client, args=(token, item_ids)) for token, item_ids in zip(tokens, claims)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses, latencies, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--items', type=int, default=50)
+    parser.add_argument('--distinct', action='store_true', help='give every client its own listings to claim')
+    parser.add_argument('--database-url', help='race on this database instead of a temporary SQLite file')
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+    
+    overrides = {'SQLALCHEMY_DATABASE_URI': args.database_url} if args.database_url else {}
+    app = create_benchmark_app(**overrides)
+    with app.app_context():
+        if args.distinct:
+            tokens, item_ids = seed(args.threads, args.threads * args.items)
+            claims = [item_ids[i::args.threads] for i in range(args.threads)]
+        else:
+            tokens, item_ids = seed(args.threads, args.items)
+            claims = [item_ids] * args.threads
+    
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    statuses, latencies, elapsed = race(server.server_port, tokens, claims)
+    server.shutdown()
+    
+    failures = []
+    claimants = 1 if args.distinct else args.threads
+    for item_id, counts in statuses.items():
+        if counts[201] != 1 or counts[201] + counts[400] != claimants:
+            failures.append(f'item {item_id}: {dict(counts)}')
+    with app.app_context():
+        per_item = dict(db.session.query(PickupRequest.food_item_id, func.count(PickupRequest.id))
+                        .group_by(PickupRequest.food_item_id).all())
+        failures += [f'item {item_id}: {count} pickup requests stored' for item_id, count in per_item.items() if count != 1]
+        drift = reconcile_stats()
+        if drift:
+            failures.append(f'counter drift {drift}')
+    
+    attempts = len(latencies)
+    totals = sum(statuses.values(), Counter())
+    name = 'distinct' if args.distinct else 'contended'
+    results = {name: {
+        'attempts_per_s': attempts / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000
+    }}
+    if args.distinct:
+        print(f'{args.threads} beneficiaries x {args.items} listings each: {attempts} claim attempts in {elapsed:.2f}s')
+    else:
+        print(f'{args.items} listings x {args.threads} racing beneficiaries: {attempts} claim attempts in {elapsed:.2f}s')
+    print(f"  {results[name]['attempts_per_s']:.0f} attempts/s, p50 {results[name]['p50_ms']:.1f} ms, "
+          f"p99 {results[name]['p99_ms']:.1f} ms, statuses {dict(sorted(totals.items()))}")
+    for failure in failures:
+        print(f'FAIL {failure}')
+    print('exactly one winner per listing' if not failures else f'{len(failures)} failures')
+    
+    regressions = check_baseline(results, args.output, args.baseline, args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    sys.exit(1 if failures or regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Check that every list endpoint runs a bounded number of SQL queries
+
+Exits non-zero if any endpoint exceeds MAX_QUERIES for a full page, which
+catches N+1 regressions in the to_dict serializers.
+"""
+import sys
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from benchmarks import create_benchmark_app
+from models import db, User, FoodItem, PickupRequest, Notification, VerificationRequest
+
+PAGE_SIZE = 50
+MAX_QUERIES = 6
+
+def seed():
+    """Create one full page of rows for every list endpoint"""
+    now = datetime.utcnow()
+    admin = User(name='Admin', email='admin@example.com', password_hash='x', role='admin')
+    donors = [User(name=f'Donor {i}', email=f'donor{i}@example.com', password_hash='x', role='donor',
+                   latitude=40.75, longitude=-73.98) for i in range(3)]
+    beneficiaries = [User(name=f'Beneficiary {i}', email=f'beneficiary{i}@example.com', password_hash='x',
+                          role='beneficiary', latitude=40.76, longitude=-73.97) for i in range(PAGE_SIZE)]
+    db.session.add_all([admin] + donors + beneficiaries)
+    db.session.flush()
+    
+    for i, beneficiary in enumerate(beneficiaries):
+        donor = donors[i % len(donors)]
+        available = FoodItem(donor_id=donor.id, title=f'Available {i}', quantity=5, pickup_start=now,
+                             pickup_end=now + timedelta(hours=2), latitude=40.75, longitude=-73.98)
+        requested = FoodItem(donor_id=donors[0].id, title=f'Requested {i}', quantity=5, pickup_start=now,
+                             pickup_end=now + timedelta(hours=2), latitude=40.75, longitude=-73.98,
+                             status='requested')
+        db.session.add_all([available, requested])
+        db.session.flush()
+        
+        db.session.add(PickupRequest(food_item_id=requested.id, beneficiary_id=beneficiary.id))
+        db.session.add(PickupRequest(food_item_id=available.id, beneficiary_id=beneficiaries[0].id,
+                                     status='cancelled'))
+        db.session.add(Notification(user_id=beneficiaries[0].id, type='new_listing', title='New',
+                                    message=f'Available {i}'))
+        db.session.add(VerificationRequest(user_id=beneficiary.id, organization_type='ngo'))
+    
+    db.session.commit()
+    return admin, donors[0], beneficiaries[0]
+
+def main():
+    app = create_benchmark_app()
+    client = app.test_client()
+    
+    with app.app_context():
+        admin, donor, beneficiary = seed()
+        headers = {
+            user.role: {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+            for user in (admin, donor, beneficiary)
+        }
+    
+    checks = [
+        ('donor', '/food'),
+        ('beneficiary', '/food'),
+        ('admin', '/food'),
+        ('donor', '/pickup'),
+        ('beneficiary', '/pickup'),
+        ('admin', '/pickup'),
+        ('beneficiary', '/notifications'),
+        ('admin', '/admin/users'),
+        ('admin', '/admin/verification-requests'),
+    ]
+    
+    failures = 0
+    print(f"{'role':<12} {'endpoint':<32} {'rows':>5} {'queries':>8}")
+    for role, path in checks:
+        response = client.get(f'{path}?per_page={PAGE_SIZE}', headers=headers[role])
+        assert response.status_code == 200, response.get_json()
+        rows = next(len(value) for value in response.get_json().values() if isinstance(value, list))
+        queries = int(response.headers['X-Query-Count'])
+        status = '' if queries <= MAX_QUERIES else '  FAIL'
+        failures += bool(status)
+        print(f"{role:<12} {path:<32} {rows:>5} {queries:>8}{status}")
+    
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
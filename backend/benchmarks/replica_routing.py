@@ -0,0 +1,90 @@
+"""Exercise read-replica routing against two local SQLite databases
+
+The replica is a snapshot of the primary taken with SQLite's backup API, so
+anything written afterwards is only visible on the primary. The harness
+checks that GETs read the replica, that writers read their own writes from
+the primary, and that a lagging replica is bypassed. Exits non-zero on failure.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from benchmarks import create_benchmark_app
+from models import db, User, FoodItem
+
+def replicate(primary_path, replica_path):
+    """Copy the primary into the replica, standing in for replication catching up"""
+    source = sqlite3.connect(primary_path)
+    target = sqlite3.connect(replica_path)
+    source.backup(target)
+    source.close()
+    target.close()
+
+def food_titles(client, headers, cookies=True):
+    if not cookies:
+        client.delete_cookie('read_primary_until')
+    response = client.get('/food?status=available', headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return sorted(item['title'] for item in response.get_json()['food_items'])
+
+def main():
+    replica_dir = tempfile.mkdtemp(prefix='food-surplus-replica-')
+    replica_path = os.path.join(replica_dir, 'replica.db')
+    app = create_benchmark_app(
+        SQLALCHEMY_BINDS={'replica_0': f'sqlite:///{replica_path}'},
+        REPLICA_MAX_LAG=0.5,
+        REPLICA_LAG_CHECK_INTERVAL=0
+    )
+    client = app.test_client()
+    router = app.extensions['replica_router']
+    
+    with app.app_context():
+        primary_path = db.engine.url.database
+        donor = User(name='Donor', email='donor@example.com', password_hash='x', role='donor',
+                     latitude=40.75, longitude=-73.98)
+        db.session.add(donor)
+        db.session.commit()
+        headers = {'Authorization': f"Bearer {create_access_token(identity=str(donor.id), additional_claims={'role': 'donor'})}"}
+        
+        now = datetime.utcnow()
+        db.session.add(FoodItem(donor_id=donor.id, title='Replicated', quantity=1, pickup_start=now,
+                                pickup_end=now + timedelta(hours=1)))
+        db.session.commit()
+        router.refresh()
+    replicate(primary_path, replica_path)
+    
+    failures = []
+    def check(name, condition):
+        print(f"{'ok  ' if condition else 'FAIL'} {name}")
+        if not condition:
+            failures.append(name)
+    
+    check('GET reads the replica', food_titles(client, headers) == ['Replicated'])
+    
+    response = client.post('/food', headers=headers, json={
+        'title': 'Primary only', 'quantity': 1,
+        'pickup_start': '2030-01-01T10:00:00', 'pickup_end': '2030-01-01T12:00:00'
+    })
+    check('POST writes the primary', response.status_code == 201)
+    check('writer reads its own write from the primary', food_titles(client, headers) == ['Primary only', 'Replicated'])
+    check('other clients still read the replica', food_titles(client, headers, cookies=False) == ['Replicated'])
+    
+    # The replica never applies the newer heartbeat, so its lag grows past the limit
+    time.sleep(1)
+    check('lagging replica is bypassed', food_titles(client, headers, cookies=False) == ['Primary only', 'Replicated'])
+    check('router reports the replica unhealthy', router.status()['replicas']['replica_0']['healthy'] is False)
+    
+    replicate(primary_path, replica_path)
+    with app.app_context():
+        router.refresh()
+    check('caught-up replica is used again', router.status()['replicas']['replica_0']['healthy'] is True)
+    
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Full-text search over food listings against a LIKE scan, at 100k listings
+
+Seeds --food-items listings (benchmarks.seed), retitles them from a small food
+vocabulary so terms are as selective as in real listings, and times each query three ways
+from a Midtown beneficiary: a LIKE '%term%' filter over the nearby candidates
+followed by the Python distance loop, the full-text index via rank_food_items,
+and GET /food?q= end to end. Saves and compares results with --output,
+--baseline and --tolerance like benchmarks.micro.
+"""
+import argparse
+import random
+import sys
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import update, bindparam
+
+from benchmarks import create_benchmark_app, check_baseline
+from benchmarks.micro import measure
+from benchmarks.seed import generate
+from models import db, User, FoodItem, geocell_ranges
+from search import search_terms, rank_food_items
+from utils import calculate_distance, identity_claims
+
+DISHES = ['pasta', 'lasagna', 'risotto', 'curry', 'dal', 'biryani', 'noodles', 'ramen', 'dumplings', 'tacos',
+          'burritos', 'enchiladas', 'chili', 'stew', 'soup', 'chowder', 'salad', 'sandwiches', 'wraps', 'bagels',
+          'bread', 'baguettes', 'croissants', 'muffins', 'scones', 'cookies', 'brownies', 'pie', 'cake', 'pancakes',
+          'omelettes', 'rice', 'beans', 'lentils', 'hummus', 'falafel', 'kebabs', 'meatballs', 'pizza', 'quiche']
+STYLES = ['fresh', 'vegetarian', 'vegan', 'homemade', 'spicy', 'organic', 'roasted', 'grilled', 'baked',
+          'seasonal', 'gluten free', 'halal', 'kosher', 'frozen', 'chilled']
+SIDES = ['rice', 'salad', 'bread', 'fruit', 'yogurt', 'sauce', 'vegetables', 'potatoes']
+QUERIES = ['curry', 'vegan dumplings', 'gluten free bread', 'croiss', 'xyzzy']
+
+MAX_DISTANCE = 10
+ORIGIN = (40.7589, -73.9851)  # Midtown
+
+def retitle(item_ids, rng):
+    """Give every listing a title and description drawn from the vocabulary"""
+    rows = []
+    for item_id in item_ids:
+        dish, style, side = rng.choice(DISHES), rng.choice(STYLES), rng.choice(SIDES)
+        rows.append({'item_id': item_id, 'title': f'{style.title()} {dish}',
+                     'description': f'{dish.capitalize()} with {side}, packed for pickup'})
+    db.session.execute(
+        update(FoodItem.__table__).where(FoodItem.__table__.c.id == bindparam('item_id'))
+        .values(title=bindparam('title'), description=bindparam('description')),
+        rows
+    )
+    db.session.commit()
+
+def like_search(terms, lat, lon, max_distance):
+    """The unindexed alternative: substring filters on every nearby candidate, then distances"""
+    conditions = [
+        db.or_(FoodItem.title.ilike(f'%{term}%'), FoodItem.description.ilike(f'%{term}%'))
+        for term in terms
+    ]
+    cell_filters = [FoodItem.geocell.between(low, high) for low, high in geocell_ranges(lat, lon, max_distance)]
+    candidates = db.session.query(FoodItem.id, FoodItem.latitude, FoodItem.longitude).filter(
+        FoodItem.status == 'available', db.or_(*cell_filters), *conditions
+    ).all()
+    
+    nearby = []
+    for item_id, item_lat, item_lon in candidates:
+        if item_lat and item_lon:
+            distance = calculate_distance(float(item_lat), float(item_lon), lat, lon)
+            if distance <= max_distance:
+                nearby.append((distance, item_id))
+    nearby.sort()
+    return nearby
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--food-items', type=int, default=100000)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+    
+    app = create_benchmark_app()
+    client = app.test_client()
+    with app.app_context():
+        ids = generate(users=args.users, food_items=args.food_items, pickup_requests=args.food_items // 10,
+                       notifications=0)
+        retitle(ids['food_items'], random.Random(11))
+        beneficiary = db.session.get(User, ids['beneficiary'][0])
+        beneficiary.latitude, beneficiary.longitude = ORIGIN
+        db.session.commit()
+        headers = {'Authorization': 'Bearer ' + create_access_token(
+            identity=str(beneficiary.id), additional_claims=identity_claims(beneficiary))}
+        
+        def get_food(q):
+            response = client.get('/food', query_string={'q': q, 'max_distance': MAX_DISTANCE}, headers=headers)
+            assert response.status_code == 200, response.get_data(as_text=True)
+        
+        results = {}
+        print(f"{'query':<18} {'matches':>8} {'LIKE ms':>9} {'index ms':>9} {'GET /food ms':>13}")
+        for q in QUERIES:
+            terms = search_terms(q)
+            matched = len(rank_food_items(terms, 'available', *ORIGIN, MAX_DISTANCE))
+            runs = {
+                'like_ms': measure(q, lambda: like_search(terms, *ORIGIN, MAX_DISTANCE), 5)[1],
+                'index_ms': measure(q, lambda: rank_food_items(terms, 'available', *ORIGIN, MAX_DISTANCE), 5)[1],
+                'request_ms': measure(q, lambda: get_food(q), 5)[1],
+            }
+            results[q] = {name: run['median_us'] / 1000 for name, run in runs.items()}
+            print(f"{q:<18} {matched:>8} {results[q]['like_ms']:>9.1f} {results[q]['index_ms']:>9.1f} "
+                  f"{results[q]['request_ms']:>13.1f}")
+    
+    regressions = check_baseline(results, args.output, args.baseline, args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
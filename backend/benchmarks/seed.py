@@ -0,0 +1,181 @@
+"""Seeded synthetic data: users, food listings, pickup requests and notifications
+
+People and listings cluster around the New York locations of the sample data
+in db/schema.sql, so the spatial queries see realistic density. The same seed
+always produces the same rows.
+
+Used by the other benchmarks, or on its own to fill the database behind
+DATABASE_URL after ``flask --app app init-db``:
+    
+    python -m benchmarks.seed --users 5000 --food-items 20000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, func
+
+from models import db, bcrypt, geocell_for, User, FoodItem, PickupRequest, Notification
+from notifications import reconcile_unread_counts
+from stats import reconcile_stats
+
+PASSWORD = 'benchmark-password'
+
+# (latitude, longitude, spread in degrees, weight) around the db/schema.sql locations
+CLUSTERS = [
+    (40.7589, -73.9851, 0.010, 5),  # Midtown
+    (40.7505, -73.9934, 0.008, 3),  # Chelsea
+    (40.7614, -73.9776, 0.008, 3),  # Midtown East
+    (40.7831, -73.9712, 0.012, 2),  # Upper West Side
+    (40.7749, -73.9442, 0.012, 2),  # Upper East Side
+    (40.7128, -74.0060, 0.015, 3),  # Lower Manhattan
+    (40.7282, -73.7949, 0.030, 1),  # Queens
+]
+ROLES = [('donor', 20), ('beneficiary', 78), ('admin', 2)]
+LISTINGS = [
+    ('Fresh Pasta and Marinara Sauce', 'Leftover pasta from lunch service', 'servings'),
+    ('Vegetarian Sandwiches', 'Assorted vegetarian sandwiches, freshly made', 'pieces'),
+    ('Home-cooked Curry and Rice', 'Made too much curry for family dinner', 'servings'),
+    ('Bread and Pastries', 'End of day bakery items, still fresh', 'pieces'),
+    ('Fruit Boxes', 'Mixed seasonal fruit, slightly bruised', 'boxes'),
+    ('Soup of the Day', 'Vegetable soup in sealed containers', 'liters'),
+]
+# Pickup request status and the listing status it leaves behind
+PICKUP_OUTCOMES = [('pending', 'requested', 5), ('accepted', 'accepted', 2), ('completed', 'completed', 2),
+                   ('rejected', 'available', 1), ('cancelled', 'available', 1)]
+
+def clustered_point(rng):
+    lat, lon, spread, _ = rng.choices(CLUSTERS, weights=[c[3] for c in CLUSTERS])[0]
+    return round(lat + rng.gauss(0, spread), 8), round(lon + rng.gauss(0, spread), 8)
+
+def new_ids(model, after):
+    return [row_id for (row_id,) in db.session.query(model.id).filter(model.id > after).order_by(model.id)]
+
+def max_id(model):
+    return db.session.query(func.max(model.id)).scalar() or 0
+
+def generate(users=1000, food_items=2000, pickup_requests=500, notifications=5000, seed=42):
+    """Bulk insert a reproducible dataset and bring the maintained counters up to date
+    
+    Returns the new ids as {'donor': [...], 'beneficiary': [...], 'admin': [...],
+    'food_items': [...], 'available': [...]}.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    # One hash for everyone; bcrypt per row would dominate seeding
+    password_hash = bcrypt.generate_password_hash(PASSWORD).decode('utf-8')
+    
+    roles = rng.choices([role for role, _ in ROLES], weights=[weight for _, weight in ROLES], k=users)
+    roles[:2] = ['donor', 'beneficiary']  # every flow needs at least one of each
+    first_user = max_id(User)
+    user_rows = []
+    for i, role in enumerate(roles):
+        lat, lon = clustered_point(rng)
+        user_rows.append({
+            'name': f'{role.title()} {first_user + i + 1}',
+            'email': f'seed-{seed}-{first_user + i + 1}@example.com',
+            'password_hash': password_hash,
+            'role': role,
+            'latitude': lat,
+            'longitude': lon,
+            'verified': rng.random() < 0.6,
+            'created_at': now - timedelta(days=rng.uniform(30, 365))
+        })
+    db.session.execute(insert(User), user_rows)
+    ids = {role: [] for role, _ in ROLES}
+    for user_id, role in zip(new_ids(User, first_user), roles):
+        ids[role].append(user_id)
+    
+    # Bulk inserts skip the ORM hooks, so the geocell is computed here
+    first_item = max_id(FoodItem)
+    item_rows = []
+    for i in range(food_items):
+        title, description, unit = rng.choice(LISTINGS)
+        lat, lon = clustered_point(rng)
+        pickup_start = now + timedelta(hours=rng.uniform(-6, 24))
+        item_rows.append({
+            'donor_id': rng.choice(ids['donor']),
+            'title': title,
+            'description': description,
+            'quantity': rng.randint(1, 40),
+            'unit': unit,
+            'expiry_date': pickup_start + timedelta(hours=rng.uniform(12, 72)) if rng.random() < 0.7 else None,
+            'pickup_start': pickup_start,
+            'pickup_end': pickup_start + timedelta(hours=rng.uniform(2, 8)),
+            'location': 'Pickup point',
+            'latitude': lat,
+            'longitude': lon,
+            'status': 'available',
+            'geocell': geocell_for(lat, lon),
+            'created_at': now - timedelta(hours=rng.uniform(0, 72))
+        })
+    db.session.execute(insert(FoodItem), item_rows)
+    item_ids = new_ids(FoodItem, first_item)
+    
+    # At most one request per listing, so the listing status follows from it
+    statuses = {}
+    pickup_rows = []
+    for item_id in rng.sample(item_ids, min(pickup_requests, len(item_ids))):
+        status, item_status, _ = rng.choices(PICKUP_OUTCOMES, weights=[o[2] for o in PICKUP_OUTCOMES])[0]
+        statuses[item_id] = item_status
+        requested_at = now - timedelta(hours=rng.uniform(0, 48))
+        pickup_rows.append({
+            'food_item_id': item_id,
+            'beneficiary_id': rng.choice(ids['beneficiary']),
+            'status': status,
+            'message': 'We can collect this today.',
+            'requested_at': requested_at,
+            'responded_at': requested_at + timedelta(minutes=30) if status != 'pending' else None,
+            'completed_at': requested_at + timedelta(hours=3) if status == 'completed' else None
+        })
+    if pickup_rows:
+        db.session.execute(insert(PickupRequest), pickup_rows)
+    for item_status in ('requested', 'accepted', 'completed'):
+        changed = [item_id for item_id, value in statuses.items() if value == item_status]
+        if changed:
+            FoodItem.query.filter(FoodItem.id.in_(changed)).update({'status': item_status}, synchronize_session=False)
+    
+    notification_rows = []
+    for _ in range(notifications):
+        item_index = rng.randrange(len(item_rows))
+        notification_rows.append({
+            'user_id': rng.choice(ids['beneficiary']),
+            'type': 'new_listing',
+            'title': 'New Food Available Nearby',
+            'message': f"{item_rows[item_index]['title']} available for pickup",
+            'payload': {'food_item_id': item_ids[item_index], 'distance': round(rng.uniform(0.1, 10), 2)},
+            'is_read': rng.random() < 0.5,
+            'created_at': now - timedelta(hours=rng.uniform(0, 72))
+        })
+    if notification_rows:
+        db.session.execute(insert(Notification), notification_rows)
+    db.session.commit()
+    
+    reconcile_stats()
+    reconcile_unread_counts()
+    
+    ids['food_items'] = item_ids
+    ids['available'] = [item_id for item_id in item_ids if item_id not in statuses or statuses[item_id] == 'available']
+    return ids
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--food-items', type=int, default=2000)
+    parser.add_argument('--pickup-requests', type=int, default=500)
+    parser.add_argument('--notifications', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        ids = generate(args.users, args.food_items, args.pickup_requests, args.notifications, args.seed)
+        print(f"Seeded {len(ids['donor'])} donors, {len(ids['beneficiary'])} beneficiaries, "
+              f"{len(ids['admin'])} admins, {len(ids['food_items'])} food items "
+              f"in {time.perf_counter() - start:.1f}s (password: {PASSWORD})")
+
+if __name__ == '__main__':
+    main()
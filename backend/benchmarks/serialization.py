@@ -0,0 +1,109 @@
+"""Rows per second for ORM to_dict serialization versus the column projections
+
+Also checks that every projection produces exactly what to_dict does, and
+exits non-zero if any row differs.
+"""
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import insert
+
+from benchmarks import create_benchmark_app, eager_loads
+from models import db, User, FoodItem, PickupRequest, Notification, VerificationRequest
+from serialization import projection_for, OrjsonProvider, orjson
+
+ROWS = 20000
+REPEATS = 3
+
+def seed(rng):
+    now = datetime.utcnow()
+    donors = [User(name=f'Donor {i}', email=f'donor{i}@example.com', password_hash='x', role='donor',
+                   latitude=40.75, longitude=-73.98) for i in range(20)]
+    beneficiary = User(name='Beneficiary', email='beneficiary@example.com', password_hash='x', role='beneficiary')
+    db.session.add_all(donors + [beneficiary])
+    db.session.commit()
+    
+    db.session.execute(insert(FoodItem), [
+        {
+            'donor_id': donors[i % len(donors)].id,
+            'title': f'Item {i}',
+            'description': 'Fresh bread and pastries from today',
+            'quantity': rng.randint(1, 50),
+            'unit': 'servings',
+            'expiry_date': now + timedelta(hours=rng.randint(1, 72)) if i % 3 else None,
+            'pickup_start': now,
+            'pickup_end': now + timedelta(hours=4),
+            'location': '5th Avenue',
+            'latitude': 40.7 + rng.random() / 10,
+            'longitude': -74.0 + rng.random() / 10,
+            'status': 'available'
+        }
+        for i in range(ROWS)
+    ])
+    food_ids = [food_id for (food_id,) in db.session.query(FoodItem.id)]
+    db.session.execute(insert(PickupRequest), [
+        {'food_item_id': food_id, 'beneficiary_id': beneficiary.id, 'message': 'Can pick up at 5', 'requested_at': now}
+        for food_id in food_ids
+    ])
+    db.session.execute(insert(Notification), [
+        {'user_id': beneficiary.id, 'type': 'new_listing', 'title': 'New', 'message': f'Item {i}',
+         'payload': {'food_item_id': i}, 'created_at': now}
+        for i in range(ROWS)
+    ])
+    db.session.execute(insert(VerificationRequest), [
+        {'user_id': donors[i % len(donors)].id, 'organization_type': 'restaurant', 'submitted_at': now}
+        for i in range(len(donors))
+    ])
+    db.session.commit()
+
+def orm_rows(model):
+    query = model.query.options(*eager_loads(model)).order_by(model.id)
+    return [item.to_dict() for item in query]
+
+def projected_rows(model):
+    return projection_for(model).rows(model.query.order_by(model.id))
+
+def timed(fn):
+    best = float('inf')
+    for _ in range(REPEATS):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    app = create_benchmark_app()
+    stdlib = DefaultJSONProvider(app)
+    fast = OrjsonProvider(app) if orjson else stdlib
+    
+    with app.app_context():
+        seed(random.Random(14))
+        
+        mismatches = 0
+        for model in (User, FoodItem, PickupRequest, Notification, VerificationRequest):
+            db.session.expunge_all()
+            expected = orm_rows(model)
+            actual = projected_rows(model)
+            if expected != actual or json.loads(stdlib.dumps(expected)) != json.loads(fast.dumps(actual)):
+                mismatches += 1
+                print(f'MISMATCH {model.__name__}')
+        
+        print(f"{'model':<15}{'path':<32}{'rows/sec':>12}")
+        for model in (FoodItem, PickupRequest):
+            paths = [
+                ('ORM + to_dict + json', lambda: stdlib.dumps(orm_rows(model))),
+                ('projection + json', lambda: stdlib.dumps(projected_rows(model))),
+                ('projection + orjson', lambda: fast.dumps(projected_rows(model))),
+            ]
+            for name, fn in paths:
+                print(f'{model.__name__:<15}{name:<32}{ROWS / timed(fn):>12,.0f}')
+    
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Cold-start cost of a worker: import, app creation and the first request
+
+Each run is a fresh interpreter, as after a gunicorn worker is recycled
+(--max-requests) or a new instance is scheduled.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RUNS = 7
+
+WORKER = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+response = application.test_client().get('/health')
+assert response.status_code == 200, response.status_code
+served = time.perf_counter()
+print(json.dumps({'import': imported - start, 'create_app': created - imported,
+                  'first_request': served - created, 'total': served - start}))
+"""
+
+def run_once(backend_dir, env):
+    output = subprocess.run([sys.executable, '-c', WORKER], cwd=backend_dir, env=env, capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # Workers restart against an existing database, so every run shares one
+    database_uri = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='food-surplus-bench-'), 'bench.db')}"
+    env = dict(os.environ, DATABASE_URL=database_uri)
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], cwd=backend_dir, env=env,
+                   capture_output=True, check=True)
+    runs = [run_once(backend_dir, env) for _ in range(RUNS)]
+    
+    print(f"{'phase':<15}{'median ms':>12}{'max ms':>10}")
+    for phase in ('import', 'create_app', 'first_request', 'total'):
+        values = [run[phase] * 1000 for run in runs]
+        print(f'{phase:<15}{statistics.median(values):>12.1f}{max(values):>10.1f}')
+
+if __name__ == '__main__':
+    main()
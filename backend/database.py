@@ -0,0 +1,247 @@
+from flask import request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool, NullPool
+from sqlalchemy.sql.dml import UpdateBase
+from datetime import datetime, timedelta
+import itertools
+import math
+import sqlite3
+import threading
+import time
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            with self.stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self.stats_lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+    
+    def recreate(self):
+        # Keep counting across pool recreation after a disconnect
+        pool = super().recreate()
+        pool.checkouts, pool.timeouts = self.checkouts, self.timeouts
+        pool.wait_seconds_total, pool.wait_seconds_max = self.wait_seconds_total, self.wait_seconds_max
+        return pool
+
+def engine_options(config):
+    """Build SQLALCHEMY_ENGINE_OPTIONS for the configured database backend"""
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if uri.startswith('sqlite'):
+        # SQLite has a single writer; pragmas are applied per connection below
+        return {}
+    
+    if config['DB_PGBOUNCER']:
+        # PgBouncer does the pooling; hold no idle connections of our own
+        return {'poolclass': NullPool}
+    
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+def configure_engine(app):
+    """Fill in engine options unless the config already sets them explicitly"""
+    if not app.config.get('SQLALCHEMY_ENGINE_OPTIONS'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    if app.config.get('DATABASE_FALLBACK'):
+        app.logger.warning('Using SQLite fallback on Railway - writes are serialized, set DATABASE_URL for production')
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection for concurrent readers and a single writer"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.execute('PRAGMA cache_size=-16000')  # 16 MB page cache
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    try:
+        cursor.execute('SELECT floor(0)')
+    except sqlite3.OperationalError:
+        # Builds without the math functions still need floor() for map clustering
+        dbapi_connection.create_function('floor', 1, lambda x: None if x is None else math.floor(x), deterministic=True)
+    cursor.close()
+
+def pool_stats(engine):
+    """Live connection pool statistics for sizing the pool from real traffic"""
+    pool = engine.pool
+    stats = {'pool_class': type(pool).__name__, 'status': pool.status()}
+    
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+        })
+    
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool.stats_lock:
+            stats.update({
+                'checkouts': pool.checkouts,
+                'timeouts': pool.timeouts,
+                'wait_seconds_total': round(pool.wait_seconds_total, 6),
+                'wait_seconds_avg': round(pool.wait_seconds_total / pool.checkouts, 6) if pool.checkouts else 0.0,
+                'wait_seconds_max': round(pool.wait_seconds_max, 6),
+            })
+    
+    return stats
+
+class RoutingSession(Session):
+    """Session that sends plain reads to a replica when the request allows it
+    
+    Flushes, INSERT/UPDATE/DELETE statements and SELECT ... FOR UPDATE always
+    use the primary, and once a session has written anything the rest of its
+    reads stay on the primary too.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get('replica_engine')
+        if replica is not None and bind is None:
+            if isinstance(clause, UpdateBase) or getattr(clause, '_for_update_arg', None) is not None:
+                self.info['wrote'] = True
+            elif not self._flushing and not self.info.get('wrote'):
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def mark_session_wrote(session, flush_context):
+    session.info['wrote'] = True
+
+class ReplicaRouter:
+    """Picks a replica engine whose measured replication lag is acceptable
+    
+    Lag is measured with a heartbeat row: every check reads the heartbeat each
+    replica has applied, then writes a fresh one to the primary. A replica that
+    has not applied the previous beat is lagging by at least its age.
+    """
+    
+    def __init__(self, db, bind_keys, max_lag, check_interval):
+        self.db = db
+        self.bind_keys = bind_keys
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lags = {key: None for key in bind_keys}
+        self.last_beat = None
+        self._last_check = 0.0
+        self._check_lock = threading.Lock()
+        self._cycle_lock = threading.Lock()
+        self._cycle = itertools.cycle(bind_keys)
+    
+    def healthy_keys(self):
+        return [key for key in self.bind_keys if self.lags[key] is not None and self.lags[key] <= self.max_lag]
+    
+    def choose(self):
+        """Return a healthy replica engine, or None to fall back to the primary"""
+        if time.monotonic() - self._last_check >= self.check_interval:
+            self.refresh()
+        
+        healthy = self.healthy_keys()
+        if not healthy:
+            return None
+        with self._cycle_lock:
+            for key in self._cycle:
+                if key in healthy:
+                    return self.db.engines[key]
+    
+    def refresh(self):
+        """Measure every replica's lag and write a new heartbeat to the primary"""
+        # Only one thread measures; the others keep using the last result
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            from models import ReplicaHeartbeat
+            table = ReplicaHeartbeat.__table__
+            now = datetime.utcnow()
+            
+            for key in self.bind_keys:
+                try:
+                    with self.db.engines[key].connect() as connection:
+                        beat = connection.execute(table.select().with_only_columns(table.c.beat_at)
+                                                  .where(table.c.id == 1)).scalar()
+                    if beat is None:
+                        self.lags[key] = None
+                    elif self.last_beat is not None and beat >= self.last_beat:
+                        self.lags[key] = 0.0
+                    else:
+                        self.lags[key] = max((now - beat).total_seconds(), 0.0)
+                except Exception:
+                    # Unreachable replicas are skipped until the next check
+                    self.lags[key] = None
+            
+            try:
+                with self.db.engine.begin() as connection:
+                    result = connection.execute(table.update().where(table.c.id == 1).values(beat_at=now))
+                    if not result.rowcount:
+                        connection.execute(table.insert().values(id=1, beat_at=now))
+                self.last_beat = now
+            except Exception as e:
+                print(f"Replica heartbeat error: {e}")
+            
+            self._last_check = time.monotonic()
+        finally:
+            self._check_lock.release()
+    
+    def status(self):
+        return {
+            'replicas': {key: {'lag_seconds': lag, 'healthy': key in self.healthy_keys()}
+                         for key, lag in self.lags.items()},
+            'max_lag_seconds': self.max_lag
+        }
+
+def init_replica_routing(app, db):
+    """Route GET requests to replicas when any are configured in SQLALCHEMY_BINDS"""
+    bind_keys = [key for key in (app.config.get('SQLALCHEMY_BINDS') or {}) if key.startswith('replica')]
+    if not bind_keys:
+        return
+    
+    router = ReplicaRouter(db, bind_keys, app.config['REPLICA_MAX_LAG'], app.config['REPLICA_LAG_CHECK_INTERVAL'])
+    app.extensions['replica_router'] = router
+    pin_cookie = 'read_primary_until'
+    
+    @app.before_request
+    def route_reads_to_replica():
+        if request.method not in ('GET', 'HEAD'):
+            return
+        # Clients that just wrote read from the primary until the pin expires
+        try:
+            if float(request.cookies.get(pin_cookie, 0)) > time.time():
+                return
+        except ValueError:
+            pass
+        db.session.info['replica_engine'] = router.choose()
+    
+    @app.after_request
+    def pin_writers_to_primary(response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            pin_seconds = app.config['REPLICA_PIN_SECONDS']
+            response.set_cookie(pin_cookie, str(time.time() + pin_seconds), max_age=pin_seconds,
+                                httponly=True, samesite='Lax')
+        return response
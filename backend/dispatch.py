@@ -0,0 +1,194 @@
+from flask import current_app
+from sqlalchemy import update, func
+from datetime import datetime, timedelta
+import threading
+import time
+import uuid
+
+from models import db, FoodItem, NotificationJob
+from utils import create_notification, notify_nearby_beneficiaries, notify_beneficiaries_of_listings
+from stats import reconcile_stats, compact_stats, COMPACT_BATCH_SIZE
+from notifications import reconcile_unread_counts
+from metrics import observe_fanout
+
+def enqueue_job(kind, idempotency_key, payload):
+    """Add a notification job to the current transaction unless its key was already queued"""
+    existing = NotificationJob.query.filter_by(idempotency_key=idempotency_key).first()
+    if existing:
+        return existing
+    
+    job = NotificationJob(kind=kind, idempotency_key=idempotency_key, payload=payload)
+    db.session.add(job)
+    return job
+
+def enqueue_new_listing(food_item):
+    """Queue the nearby-beneficiary fan-out for a new food item"""
+    return enqueue_job('new_listing', f'new_listing:{food_item.id}', {'food_item_id': food_item.id})
+
+def enqueue_new_listings(food_items):
+    """Queue one fan-out for a batch of new food items, coalesced per beneficiary"""
+    ids = [food_item.id for food_item in food_items]
+    return enqueue_job('new_listing', f'new_listings:{ids[0]}:{len(ids)}', {'food_item_ids': ids})
+
+def enqueue_notification(idempotency_key, user_id, notification_type, title, message, payload=None):
+    """Queue a single notification for a user"""
+    return enqueue_job('notification', idempotency_key, {
+        'user_id': user_id,
+        'type': notification_type,
+        'title': title,
+        'message': message,
+        'payload': payload
+    })
+
+def claim_jobs(batch_size, visibility_timeout):
+    """Lock up to batch_size runnable jobs for this worker and return them"""
+    now = datetime.utcnow()
+    token = str(uuid.uuid4())
+    runnable = db.or_(
+        db.and_(NotificationJob.status == 'pending', NotificationJob.available_at <= now),
+        # Jobs held by a worker that died are picked up again after the timeout
+        db.and_(NotificationJob.status == 'processing',
+                NotificationJob.locked_at < now - timedelta(seconds=visibility_timeout))
+    )
+    
+    candidate_ids = [job_id for job_id, in db.session.query(NotificationJob.id).filter(runnable)
+                     .order_by(NotificationJob.id).limit(batch_size)]
+    if not candidate_ids:
+        return []
+    
+    # The status condition is re-checked so concurrent workers never claim the same job
+    db.session.execute(
+        update(NotificationJob)
+        .where(NotificationJob.id.in_(candidate_ids), runnable)
+        .values(status='processing', locked_by=token, locked_at=now,
+                attempts=NotificationJob.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    
+    return NotificationJob.query.filter_by(locked_by=token, status='processing').order_by(NotificationJob.id).all()
+
+def handle_job(job):
+    """Write the notifications for a job without committing"""
+    if job.kind == 'new_listing' and 'food_item_ids' in job.payload:
+        food_items = FoodItem.query.filter(FoodItem.id.in_(job.payload['food_item_ids'])).order_by(FoodItem.id).all()
+        if food_items:
+            observe_fanout(notify_beneficiaries_of_listings(food_items, commit=False))
+    elif job.kind == 'new_listing':
+        food_item = FoodItem.query.get(job.payload['food_item_id'])
+        if food_item:
+            observe_fanout(notify_nearby_beneficiaries(food_item, commit=False))
+    elif job.kind == 'notification':
+        create_notification(
+            user_id=job.payload['user_id'],
+            notification_type=job.payload['type'],
+            title=job.payload['title'],
+            message=job.payload['message'],
+            payload=job.payload.get('payload'),
+            commit=False
+        )
+    else:
+        raise ValueError(f'Unknown job kind: {job.kind}')
+
+def process_batch(batch_size=None):
+    """Claim and run one batch of jobs, returning the number processed successfully"""
+    config = current_app.config
+    batch_size = batch_size or config['DISPATCH_BATCH_SIZE']
+    jobs = claim_jobs(batch_size, config['DISPATCH_VISIBILITY_TIMEOUT'])
+    
+    processed = 0
+    for job in jobs:
+        job_id = job.id
+        try:
+            handle_job(job)
+            # Notifications and the done flag commit together, so a retry never duplicates them
+            job.status = 'done'
+            job.processed_at = datetime.utcnow()
+            job.last_error = None
+            db.session.commit()
+            processed += 1
+        except Exception as e:
+            db.session.rollback()
+            job = NotificationJob.query.get(job_id)
+            job.last_error = str(e)
+            if job.attempts >= config['DISPATCH_MAX_ATTEMPTS']:
+                job.status = 'failed'
+            else:
+                # Exponential backoff before the next attempt
+                job.status = 'pending'
+                job.available_at = datetime.utcnow() + timedelta(seconds=2 ** job.attempts)
+            db.session.commit()
+    
+    return processed
+
+def purge_completed_jobs(retention):
+    """Delete finished jobs older than the retention period"""
+    deleted = NotificationJob.query.filter(
+        NotificationJob.status == 'done',
+        NotificationJob.processed_at < datetime.utcnow() - retention
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+def queue_metrics():
+    """Return queue depth by status and the age of the oldest runnable job"""
+    counts = dict(db.session.query(NotificationJob.status, func.count(NotificationJob.id))
+                  .filter(NotificationJob.status != 'done')
+                  .group_by(NotificationJob.status).all())
+    oldest = db.session.query(func.min(NotificationJob.created_at)).filter(
+        NotificationJob.status.in_(['pending', 'processing'])
+    ).scalar()
+    
+    return {
+        'pending': counts.get('pending', 0),
+        'processing': counts.get('processing', 0),
+        'failed': counts.get('failed', 0),
+        'depth': counts.get('pending', 0) + counts.get('processing', 0),
+        'lag_seconds': round((datetime.utcnow() - oldest).total_seconds(), 3) if oldest else 0.0
+    }
+
+def run_worker(once=False):
+    """Drain the notification queue in batches until interrupted"""
+    config = current_app.config
+    last_purge = last_reconcile = last_compact = datetime.utcnow()
+    
+    while True:
+        try:
+            processed = process_batch()
+            
+            if datetime.utcnow() - last_purge > timedelta(hours=1):
+                purge_completed_jobs(config['DISPATCH_RETENTION'])
+                last_purge = datetime.utcnow()
+            
+            # Fold the counter deltas writers appended, keeping counter reads short
+            if datetime.utcnow() - last_compact > config['STATS_COMPACT_INTERVAL']:
+                while compact_stats() == COMPACT_BATCH_SIZE:
+                    pass
+                last_compact = datetime.utcnow()
+            
+            # Periodically correct any drift in the admin statistics counters
+            if datetime.utcnow() - last_reconcile > config['STATS_RECONCILE_INTERVAL']:
+                reconcile_stats()
+                reconcile_unread_counts()
+                last_reconcile = datetime.utcnow()
+        except Exception as e:
+            # Keep the worker alive through transient database errors
+            db.session.rollback()
+            print(f"Notification dispatch error: {e}")
+            processed = 0
+        
+        if once and not processed:
+            return
+        
+        if not processed:
+            time.sleep(config['DISPATCH_POLL_INTERVAL'])
+
+def start_worker_thread(app):
+    """Run the dispatch worker in a daemon thread of the web process"""
+    def target():
+        with app.app_context():
+            run_worker()
+    
+    thread = threading.Thread(target=target, name='notification-dispatch', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,109 @@
+from flask import current_app, stream_with_context
+import csv
+import io
+import zlib
+
+from models import User, FoodItem, PickupRequest, Notification
+from serialization import projection_for
+from utils import parse_datetime
+
+EXPORTS = {
+    'users': User,
+    'food': FoodItem,
+    'pickups': PickupRequest,
+    'notifications': Notification,
+}
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+CHUNK_SIZE = 64 * 1024  # bytes of rows buffered before each write to the client
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')  # spreadsheets evaluate cells starting with these
+
+class InvalidExport(ValueError):
+    """Raised when an export name, format or date range cannot be used"""
+
+def export_query(name, since=None, until=None):
+    """Query for every row of an export, optionally limited to [since, until) on its timestamp"""
+    model = EXPORTS.get(name)
+    if model is None:
+        raise InvalidExport(f"Unknown export '{name}', expected one of {', '.join(EXPORTS)}")
+    
+    timestamp = getattr(model, getattr(model, 'cursor_column', 'created_at'))
+    query = model.query
+    try:
+        if since:
+            query = query.filter(timestamp >= parse_datetime(since))
+        if until:
+            query = query.filter(timestamp < parse_datetime(until))
+    except ValueError:
+        raise InvalidExport('since and until must be ISO 8601 dates or datetimes')
+    # The primary key order streams straight off the index without a sort
+    return query.order_by(model.id)
+
+def flatten(row, nested, dumps, prefix=''):
+    """Spread nested objects into prefixed CSV columns, matching the projection's column labels"""
+    flat = {}
+    for key, value in row.items():
+        name = prefix + key
+        if name in nested:
+            if value is not None:
+                flat.update(flatten(value, nested, dumps, name + '__'))
+        elif isinstance(value, (dict, list)):
+            flat[name] = dumps(value)
+        elif isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+            # User text such as titles and messages must open as text, not run as a formula
+            flat[name] = "'" + value
+        else:
+            flat[name] = value
+    return flat
+
+def encode_rows(projection, rows, export_format):
+    """Yield text chunks of serialized rows, each roughly CHUNK_SIZE long"""
+    buffer = io.StringIO()
+    dumps = current_app.json.dumps
+    if export_format == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=[column.name for column in projection.columns],
+                                extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(flatten(projection.serialize(row), projection.nested, dumps))
+            if buffer.tell() >= CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    else:
+        for row in rows:
+            buffer.write(dumps(projection.serialize(row)))
+            buffer.write('\n')
+            if buffer.tell() >= CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    yield buffer.getvalue()
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of text chunks into one gzip member as they are produced"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_stream(name, export_format, since=None, until=None, compress=False):
+    """Generate an export body, fetching rows through a server-side cursor in batches
+    
+    Rows are projected tuples rather than ORM objects and each batch is released
+    once written, so memory stays flat however many rows the export holds.
+    """
+    if export_format not in FORMATS:
+        raise InvalidExport(f"format must be one of {', '.join(FORMATS)}")
+    query = export_query(name, since, until)
+    projection = projection_for(EXPORTS[name])
+    rows = projection.select(query).yield_per(current_app.config['EXPORT_BATCH_SIZE'])
+    
+    chunks = encode_rows(projection, rows, export_format)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    else:
+        chunks = (chunk.encode() for chunk in chunks)
+    # The session and request context stay open until the last row is sent
+    return stream_with_context(chunks)
@@ -0,0 +1,21 @@
+# Gunicorn server hooks, loaded with --config by every image; workers, threads and
+# the bind address stay on the command line
+import os
+import shutil
+
+from metrics import fold_exited_worker
+
+metrics_dir = os.environ.get('METRICS_DIR')
+
+def on_starting(server):
+    # Snapshots left by a previous run would be summed into this one
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+def child_exit(server, worker):
+    # Fold each recycled or crashed worker into the totals instead of leaving its file behind
+    if metrics_dir and os.path.isdir(metrics_dir):
+        try:
+            fold_exited_worker(metrics_dir, worker.pid)
+        except OSError as e:
+            server.log.warning("Could not fold metrics of worker %s: %s", worker.pid, e)
@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import func, text
+import math
+import threading
+
+from metrics import count_tile_lookups
+from models import db, FoodItem
+from serialization import projection_for
+
+MAX_ZOOM = 20
+CLUSTER_GRID = 4  # cells per tile edge, ~64 px on a 256 px map tile
+MAX_TILES = 256  # tiles one viewport may cover at its zoom
+
+class InvalidViewport(ValueError):
+    """Raised when a bbox or zoom argument cannot be used"""
+
+def parse_viewport(bbox, zoom):
+    """Parse 'min_lon,min_lat,max_lon,max_lat' (Leaflet's toBBoxString) and a zoom level"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in bbox.split(','))
+        zoom = int(zoom)
+    except (AttributeError, TypeError, ValueError):
+        raise InvalidViewport('bbox must be min_lon,min_lat,max_lon,max_lat and zoom an integer')
+    if not all(map(math.isfinite, (min_lon, min_lat, max_lon, max_lat))):
+        raise InvalidViewport('bbox must be finite')
+    if not 0 <= zoom <= MAX_ZOOM:
+        raise InvalidViewport(f'zoom must be between 0 and {MAX_ZOOM}')
+    if min_lon > max_lon or min_lat > max_lat:
+        raise InvalidViewport('bbox minimum exceeds its maximum')
+    # A map panned past the antimeridian reports longitudes beyond +-180
+    bounds = (max(min_lon, -180.0), max(min_lat, -90.0), min(max_lon, 180.0), min(max_lat, 90.0))
+    return bounds, zoom
+
+def tile_span(zoom):
+    """Edge of a tile in degrees; tiles match the longitude span of slippy map tiles"""
+    return 360 / 2 ** zoom
+
+def tiles_covering(bounds, zoom):
+    """(x, y) of the tiles a viewport touches, counted from (-180, -90)"""
+    min_lon, min_lat, max_lon, max_lat = bounds
+    span = tile_span(zoom)
+    columns = range(int((min_lon + 180) // span), int((max_lon + 180) // span) + 1)
+    rows = range(int((min_lat + 90) // span), int((max_lat + 90) // span) + 1)
+    if len(columns) * len(rows) > MAX_TILES:
+        raise InvalidViewport('bbox covers too many tiles at this zoom')
+    return [(x, y) for x in columns for y in rows]
+
+class TileCache:
+    """Process-wide LRU of clustered tiles, emptied whenever the food feed version moves"""
+    
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.version = None
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get_many(self, version, keys):
+        with self._lock:
+            if self.version is not None and version < self.version:
+                return {}  # a request still on the previous version
+            if version != self.version:
+                self._tiles.clear()
+                self.version = version
+            found = {}
+            for key in keys:
+                clusters = self._tiles.get(key)
+                if clusters is not None:
+                    self._tiles.move_to_end(key)
+                    found[key] = clusters
+            return found
+    
+    def put_many(self, version, tiles):
+        with self._lock:
+            if self.version is not None and version < self.version:
+                return  # computed before a change another request already saw
+            if version != self.version:
+                self._tiles.clear()
+                self.version = version
+            for key, clusters in tiles.items():
+                self._tiles[key] = clusters
+                self._tiles.move_to_end(key)
+            while len(self._tiles) > self.maxsize:
+                self._tiles.popitem(last=False)
+
+def init_map_tiles(app):
+    """Attach the clustered tile cache configured for this app"""
+    app.extensions['map_tiles'] = TileCache(app.config['MAP_TILE_CACHE_SIZE'])
+
+def compute_tiles(zoom, keys):
+    """Cluster available items of a block of tiles in one aggregate over the location index"""
+    span = tile_span(zoom)
+    cell = span / CLUSTER_GRID
+    min_x, max_x = min(x for x, _ in keys), max(x for x, _ in keys)
+    min_y, max_y = min(y for _, y in keys), max(y for _, y in keys)
+    
+    column = func.floor((FoodItem.longitude + 180) / cell).label('cell_column')
+    row = func.floor((FoodItem.latitude + 90) / cell).label('cell_row')
+    cells = db.session.query(
+        column, row, func.count(FoodItem.id), func.avg(FoodItem.latitude), func.avg(FoodItem.longitude)
+    ).filter(
+        FoodItem.status == 'available',
+        FoodItem.latitude.between(min_y * span - 90, (max_y + 1) * span - 90),
+        FoodItem.longitude.between(min_x * span - 180, (max_x + 1) * span - 180)
+    ).group_by(text('cell_column'), text('cell_row'))  # by alias, so MySQL sees one expression per cell
+    
+    # Every tile of the block is fresh now, including the empty ones
+    tiles = {(x, y): [] for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)}
+    for cell_column, cell_row, count, latitude, longitude in cells:
+        # Items exactly on the block's upper edge fall into the next tile, which owns them
+        key = (int(cell_column) // CLUSTER_GRID, int(cell_row) // CLUSTER_GRID)
+        if key in tiles:
+            tiles[key].append({
+                'latitude': round(float(latitude), 6),
+                'longitude': round(float(longitude), 6),
+                'count': count
+            })
+    return tiles
+
+def clustered_tiles(version, bounds, zoom):
+    """Clusters of every tile in the viewport, computing only those not cached at this version"""
+    cache = current_app.extensions['map_tiles']
+    keys = tiles_covering(bounds, zoom)
+    tiles = cache.get_many(version, keys)
+    missing = [key for key in keys if key not in tiles]
+    if missing:
+        computed = compute_tiles(zoom, missing)
+        cache.put_many(version, computed)
+        tiles.update((key, computed[key]) for key in missing)
+    count_tile_lookups(len(keys) - len(missing), len(missing))
+    return [cluster for key in keys for cluster in tiles[key]]
+
+def items_in_viewport(bounds, limit):
+    """Available items inside the viewport, oldest first, and whether more were left out"""
+    min_lon, min_lat, max_lon, max_lat = bounds
+    query = FoodItem.query.filter(
+        FoodItem.status == 'available',
+        FoodItem.latitude.between(min_lat, max_lat),
+        FoodItem.longitude.between(min_lon, max_lon)
+    ).order_by(FoodItem.id)
+    projection = projection_for(FoodItem)
+    rows = projection.select(query).limit(limit + 1).all()
+    return [projection.serialize(row) for row in rows[:limit]], len(rows) > limit
@@ -0,0 +1,309 @@
+from flask import g, request, has_request_context, has_app_context, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+FANOUT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+TOTALS_FILE = 'totals.json'  # counters of exited workers, folded together
+
+# name: (type, help, buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'HTTP requests by route and status', None),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by route', LATENCY_BUCKETS),
+    'http_requests_in_flight': ('gauge', 'HTTP requests being handled', None),
+    'http_request_sql_queries': ('histogram', 'SQL statements per HTTP request by route', QUERY_COUNT_BUCKETS),
+    'http_request_sql_duration_seconds': ('histogram', 'Time in SQL per HTTP request by route', LATENCY_BUCKETS),
+    'db_queries_total': ('counter', 'SQL statements executed, including background workers', None),
+    'db_query_duration_seconds_total': ('counter', 'Time spent executing SQL statements', None),
+    'notification_fanout_recipients': ('histogram', 'Beneficiaries notified per new listing or bulk upload', FANOUT_BUCKETS),
+    'map_tile_cache_lookups_total': ('counter', 'Clustered map tiles served from the tile cache or computed', None),
+    'db_pool_checked_out': ('gauge', 'Database connections checked out of the pool', None),
+}
+
+class Registry:
+    """Counters, gauges and histograms of one process, keyed by (name, label pairs)"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.histograms = {}  # key -> [count per bucket..., +Inf count, sum]
+    
+    def inc(self, name, labels=(), amount=1):
+        key = (name, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+    
+    def set(self, name, value, labels=()):
+        with self.lock:
+            self.values[(name, labels)] = value
+    
+    def observe(self, name, value, labels=()):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(buckets) + 2)
+            # Stored per bucket, made cumulative when rendered
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[-2] += 1
+            histogram[-1] += value
+    
+    def snapshot(self):
+        with self.lock:
+            return {
+                'values': [[name, list(labels), value] for (name, labels), value in self.values.items()],
+                'histograms': [[name, list(labels), list(h)] for (name, labels), h in self.histograms.items()],
+            }
+
+def merge(snapshots):
+    """Sum snapshots of several processes; gauges only count from live processes"""
+    values, histograms = {}, {}
+    for snapshot, alive in snapshots:
+        for name, labels, value in snapshot['values']:
+            if METRICS[name][0] == 'gauge' and not alive:
+                continue
+            key = (name, tuple(map(tuple, labels)))
+            values[key] = values.get(key, 0) + value
+        for name, labels, histogram in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.setdefault(key, [0] * len(histogram))
+            for i, count in enumerate(histogram):
+                total[i] += count
+    return values, histograms
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+def render(values, histograms):
+    """Prometheus text exposition format"""
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        if kind == 'histogram':
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], histogram[:-1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{format_labels(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(labels)} {histogram[-1]}')
+                lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+        else:
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def read_snapshot(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # missing, or removed or replaced mid-read
+
+def write_snapshot(directory, name, snapshot):
+    """Replace a snapshot file in one step so readers never see it half written"""
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(temp_path, os.path.join(directory, name))
+
+def fold_exited_worker(directory, pid):
+    """Add an exited worker's counters to the totals file and remove its snapshot
+    
+    Called from gunicorn's arbiter, the only writer of the totals file. The totals
+    list the snapshots they already include, so a scrape racing the removal below
+    does not count them twice.
+    """
+    names = [name for name in os.listdir(directory) if name.startswith(f'{pid}-') and name.endswith('.json')]
+    if not names:
+        return
+    
+    totals = read_snapshot(os.path.join(directory, TOTALS_FILE)) or {'values': [], 'histograms': [], 'folded': []}
+    snapshots = [(totals, False)]
+    for name in names:
+        snapshot = read_snapshot(os.path.join(directory, name))
+        if snapshot:
+            snapshots.append((snapshot, False))
+    # Gauges of dead processes are dropped by the merge
+    values, histograms = merge(snapshots)
+    
+    existing = set(os.listdir(directory))
+    write_snapshot(directory, TOTALS_FILE, {
+        'values': [[name, list(labels), value] for (name, labels), value in values.items()],
+        'histograms': [[name, list(labels), histogram] for (name, labels), histogram in histograms.items()],
+        'folded': [name for name in totals['folded'] if name in existing] + names,
+    })
+    for name in names:
+        os.remove(os.path.join(directory, name))
+
+class Metrics:
+    """Request, SQL and fan-out instrumentation for one app
+    
+    Each process keeps its own registry. With METRICS_DIR set, every gunicorn worker
+    writes its snapshot there (at most once per METRICS_FLUSH_INTERVAL) and /metrics
+    sums them, so a scrape sees the whole instance whichever worker answers it.
+    Exited workers are folded into one totals file by the gunicorn.conf.py hooks.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+        self.registry = Registry()
+        self.directory = app.config['METRICS_DIR']
+        self.flush_interval = app.config['METRICS_FLUSH_INTERVAL']
+        self._flushed_at = 0.0
+        self._pid = None
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            atexit.register(self.flush_at_exit)
+    
+    def flush(self, force=False):
+        """Write this process's snapshot for the other workers' scrapes"""
+        now = time.monotonic()
+        if not self.directory or (not force and now - self._flushed_at < self.flush_interval):
+            return
+        self._flushed_at = now
+        if self._pid != os.getpid():
+            # A fresh name per process, so a worker reusing a recycled pid is not
+            # mistaken for the one already folded into the totals
+            self._pid = os.getpid()
+            self._filename = f'{self._pid}-{uuid.uuid4().hex[:8]}.json'
+        write_snapshot(self.directory, self._filename, self.registry.snapshot())
+    
+    def flush_at_exit(self):
+        # Only workers that served requests; CLI commands such as init-db leave nothing behind
+        if self._pid == os.getpid():
+            self.flush(force=True)
+    
+    def collect(self):
+        """Snapshots of every worker, with whether each is still running"""
+        if not self.directory:
+            return [(self.registry.snapshot(), True)]
+        
+        self.flush(force=True)
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json') or name == TOTALS_FILE:
+                continue
+            snapshot = read_snapshot(os.path.join(self.directory, name))
+            if snapshot:
+                snapshots.append((name, snapshot))
+        
+        # Read after the workers' files: a snapshot removed before it could be read
+        # is then already in the totals, and one read before its removal is listed
+        totals = read_snapshot(os.path.join(self.directory, TOTALS_FILE))
+        folded = set(totals['folded']) if totals else set()
+        collected = [(snapshot, process_alive(int(name.split('-')[0])))
+                     for name, snapshot in snapshots if name not in folded]
+        if totals:
+            collected.append((totals, False))
+        return collected
+    
+    def exposition(self, engine):
+        pool = engine.pool
+        if hasattr(pool, 'checkedout'):
+            self.registry.set('db_pool_checked_out', pool.checkedout())
+        return render(*merge(self.collect()))
+
+def route_label():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if has_request_context():
+        g.sql_queries = g.get('sql_queries', 0) + 1
+        g.sql_seconds = g.get('sql_seconds', 0.0) + elapsed
+    metrics = current_app.extensions.get('metrics') if has_app_context() else None
+    if metrics:
+        metrics.registry.inc('db_queries_total')
+        metrics.registry.inc('db_query_duration_seconds_total', amount=elapsed)
+
+def observe_fanout(recipients):
+    """Record how many beneficiaries one new listing notified"""
+    metrics = current_app.extensions.get('metrics')
+    if metrics:
+        metrics.registry.observe('notification_fanout_recipients', recipients)
+
+def count_tile_lookups(hits, misses):
+    """Record clustered map tiles found in and missing from the tile cache"""
+    metrics = current_app.extensions.get('metrics')
+    if metrics:
+        metrics.registry.inc('map_tile_cache_lookups_total', (('result', 'hit'),), hits)
+        metrics.registry.inc('map_tile_cache_lookups_total', (('result', 'miss'),), misses)
+
+def instrument_sql():
+    """Count and time every SQL statement, per request in g and per process in the registry"""
+    if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+
+def init_metrics(app):
+    """Instrument every route and SQL statement of the app, served at /metrics"""
+    if not app.config['METRICS_ENABLED']:
+        return
+    metrics = app.extensions['metrics'] = Metrics(app)
+    registry = metrics.registry
+    instrument_sql()
+    
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        registry.inc('http_requests_in_flight')
+    
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+    
+    @app.teardown_request
+    def record_request(exc):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        route = (('route', route_label()),)
+        # A request that raised past the error handlers never reached after_request
+        status = g.get('metrics_status', 500)
+        
+        registry.inc('http_requests_in_flight', amount=-1)
+        registry.inc('http_requests_total', (('method', request.method),) + route + (('status', str(status)),))
+        registry.observe('http_request_duration_seconds', elapsed, (('method', request.method),) + route)
+        registry.observe('http_request_sql_queries', g.get('sql_queries', 0), route)
+        registry.observe('http_request_sql_duration_seconds', g.get('sql_seconds', 0.0), route)
+        metrics.flush()
@@ -1,11 +1,80 @@
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
+from sqlalchemy import event
 from datetime import datetime
 import math
 
-db = SQLAlchemy()
+from passwords import offload, hash_rounds
+from database import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 bcrypt = Bcrypt()
 
+# Spatial grid used to index food items by location
+GEOCELL_SIZE = 0.1  # Cell edge in degrees (~11 km of latitude)
+GEOCELL_COLUMNS = int(360 / GEOCELL_SIZE)
+GEOCELL_ROWS = int(180 / GEOCELL_SIZE)
+KM_PER_DEGREE = 6371 * math.pi / 180  # Great-circle km per degree (R = 6371 km)
+SEARCH_PADDING = 1e-6  # Degrees added to search bounds to absorb coordinate rounding
+MAX_GEOCELL_RANGES = 200  # Beyond this a latitude band is used; SQLite caps expression depth at 1000
+
+def geocell_for(lat, lon):
+    """Return the grid cell id containing a coordinate, or None if unset"""
+    if not lat or not lon:
+        return None
+    row = min(int((float(lat) + 90) / GEOCELL_SIZE), GEOCELL_ROWS - 1)
+    col = int((float(lon) + 180) / GEOCELL_SIZE) % GEOCELL_COLUMNS
+    return row * GEOCELL_COLUMNS + col
+
+def geocell_ranges(lat, lon, radius_km):
+    """Return (low, high) cell id ranges covering a circle around a coordinate"""
+    dlat = radius_km / KM_PER_DEGREE + SEARCH_PADDING
+    min_row = max(int((lat - dlat + 90) / GEOCELL_SIZE), 0)
+    max_row = min(int((lat + dlat + 90) / GEOCELL_SIZE), GEOCELL_ROWS - 1)
+    
+    # Widest longitude span is at the row edge closest to a pole
+    max_abs_lat = min(abs(lat) + dlat, 90)
+    cos_lat = math.cos(math.radians(max_abs_lat))
+    if cos_lat <= 0 or radius_km / (KM_PER_DEGREE * cos_lat) >= 180:
+        col_ranges = [(0, GEOCELL_COLUMNS - 1)]
+    else:
+        dlon = radius_km / (KM_PER_DEGREE * cos_lat) + SEARCH_PADDING
+        min_col = int((lon - dlon + 180) // GEOCELL_SIZE)
+        max_col = int((lon + dlon + 180) // GEOCELL_SIZE)
+        if max_col - min_col + 1 >= GEOCELL_COLUMNS:
+            col_ranges = [(0, GEOCELL_COLUMNS - 1)]
+        elif min_col < 0:
+            # Wraps around the antimeridian on the west side
+            col_ranges = [(0, max_col), (min_col + GEOCELL_COLUMNS, GEOCELL_COLUMNS - 1)]
+        elif max_col >= GEOCELL_COLUMNS:
+            # Wraps around the antimeridian on the east side
+            col_ranges = [(min_col, GEOCELL_COLUMNS - 1), (0, max_col - GEOCELL_COLUMNS)]
+        else:
+            col_ranges = [(min_col, max_col)]
+    
+    ranges = []
+    for row in range(min_row, max_row + 1):
+        for low, high in sorted(col_ranges):
+            low, high = row * GEOCELL_COLUMNS + low, row * GEOCELL_COLUMNS + high
+            if ranges and ranges[-1][1] + 1 >= low:
+                # Full-width rows and wrapped spans continue the previous range
+                ranges[-1] = (ranges[-1][0], high)
+            else:
+                ranges.append((low, high))
+    
+    if len(ranges) > MAX_GEOCELL_RANGES:
+        # Cells are numbered row by row, so one range covers the whole latitude band
+        return [(min_row * GEOCELL_COLUMNS, max_row * GEOCELL_COLUMNS + GEOCELL_COLUMNS - 1)]
+    return ranges
+
+def geocell_filter(lat, lon, radius_km):
+    """SQL condition matching food items in the cells covering a circle"""
+    return db.or_(*[
+        FoodItem.geocell.between(low, high)
+        for low, high in geocell_ranges(lat, lon, radius_km)
+    ])
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -22,6 +91,10 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('idx_users_location', 'latitude', 'longitude'),
+    )
+    
     # Relationships
     food_items = db.relationship('FoodItem', backref='donor', lazy=True, cascade='all, delete-orphan')
     pickup_requests = db.relationship('PickupRequest', backref='beneficiary', lazy=True, cascade='all, delete-orphan')
@@ -30,10 +103,14 @@ class User(db.Model):
     reviewed_verifications = db.relationship('VerificationRequest', foreign_keys='VerificationRequest.reviewed_by', backref='reviewer', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = offload(bcrypt.generate_password_hash, password).decode('utf-8')
     
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return offload(bcrypt.check_password_hash, self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """True when the stored hash was made with a different cost factor"""
+        return hash_rounds(self.password_hash) != current_app.config['BCRYPT_LOG_ROUNDS']
     
     def to_dict(self):
         return {
@@ -65,10 +142,18 @@ class FoodItem(db.Model):
     latitude = db.Column(db.Numeric(10, 8))
     longitude = db.Column(db.Numeric(11, 8))
     image_url = db.Column(db.String(500))
-    status = db.Column(db.Enum('available', 'requested', 'accepted', 'picked', 'completed', 'cancelled'), default='available')
+    status = db.Column(db.Enum('available', 'requested', 'accepted', 'picked', 'completed', 'cancelled', 'expired'), default='available')
+    geocell = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('idx_status_geocell', 'status', 'geocell'),
+        db.Index('idx_location', 'latitude', 'longitude'),
+        db.Index('idx_food_items_expiry', 'expiry_date'),
+        db.Index('idx_food_items_pickup_end', 'pickup_end'),
+    )
+    
     # Relationships
     pickup_requests = db.relationship('PickupRequest', backref='food_item', lazy=True, cascade='all, delete-orphan')
     
@@ -115,6 +200,12 @@ class FoodItem(db.Model):
         
         return data
 
+@event.listens_for(FoodItem, 'before_insert')
+@event.listens_for(FoodItem, 'before_update')
+def update_food_item_geocell(mapper, connection, target):
+    """Keep the spatial grid cell in sync with the item's coordinates"""
+    target.geocell = geocell_for(target.latitude, target.longitude)
+
 class PickupRequest(db.Model):
     __tablename__ = 'pickup_requests'
     
@@ -128,6 +219,13 @@ class PickupRequest(db.Model):
     picked_at = db.Column(db.DateTime)
     completed_at = db.Column(db.DateTime)
     
+    __table_args__ = (
+        # One request per beneficiary per listing, enforced by the database instead of a pre-check
+        db.UniqueConstraint('food_item_id', 'beneficiary_id', name='uq_pickup_requests_item_beneficiary'),
+    )
+    
+    cursor_column = 'requested_at'  # Timestamp used for keyset pagination
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -155,6 +253,10 @@ class Notification(db.Model):
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('idx_user_read', 'user_id', 'is_read'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -182,6 +284,8 @@ class VerificationRequest(db.Model):
     reviewed_at = db.Column(db.DateTime)
     reviewed_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     
+    cursor_column = 'submitted_at'  # Timestamp used for keyset pagination
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -197,3 +301,69 @@ class VerificationRequest(db.Model):
             'reviewed_at': self.reviewed_at.isoformat() if self.reviewed_at else None,
             'reviewed_by': self.reviewed_by
         }
+
+class NotificationJob(db.Model):
+    __tablename__ = 'notification_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.Enum('new_listing', 'notification'), nullable=False)
+    idempotency_key = db.Column(db.String(100), unique=True, nullable=False)
+    payload = db.Column(db.JSON)
+    status = db.Column(db.Enum('pending', 'processing', 'done', 'failed'), default='pending')
+    attempts = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text)
+    locked_by = db.Column(db.String(36))
+    locked_at = db.Column(db.DateTime)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('idx_status_available', 'status', 'available_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'idempotency_key': self.idempotency_key,
+            'payload': self.payload,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'available_at': self.available_at.isoformat() if self.available_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None
+        }
+
+class StatCounter(db.Model):
+    __tablename__ = 'stat_counters'
+    
+    name = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class StatDelta(db.Model):
+    __tablename__ = 'stat_deltas'
+    
+    # Append-only: writers insert their changes here instead of updating the shared counter rows
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    amount = db.Column(db.BigInteger, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_stat_deltas_name', 'name'),
+    )
+
+class NotificationCounter(db.Model):
+    __tablename__ = 'notification_counters'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+
+class ReplicaHeartbeat(db.Model):
+    __tablename__ = 'replica_heartbeats'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    beat_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,277 @@
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import event, func, inspect, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+import json
+import queue
+import threading
+import time
+
+from models import db, Notification, NotificationCounter
+
+STREAM_TICKET_COOKIE = 'notification_stream_ticket'
+STREAM_TICKET_SALT = 'notification-stream'
+
+def on_conflict_upsert(insert):
+    def upsert(table, rows, new_count):
+        statement = insert(table).values(rows)
+        return statement.on_conflict_do_update(index_elements=[table.c.user_id], set_={'unread_count': new_count})
+    return upsert
+
+def mysql_upsert(table, rows, new_count):
+    return mysql.insert(table).values(rows).on_duplicate_key_update(unread_count=new_count)
+
+# INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE per dialect; others UPDATE then INSERT
+UPSERTS = {
+    'sqlite': on_conflict_upsert(sqlite.insert),
+    'postgresql': on_conflict_upsert(postgresql.insert),
+    'mysql': mysql_upsert,
+}
+
+def adjust_unread_counts(deltas, connection=None):
+    """Add per-user deltas to the unread counters, creating missing rows"""
+    connection = connection or db.session.connection()
+    table = NotificationCounter.__table__
+    
+    # Group users by delta so a fan-out becomes a single UPDATE
+    by_amount = {}
+    for user_id, amount in deltas.items():
+        if amount:
+            by_amount.setdefault(amount, []).append(user_id)
+    
+    upsert = UPSERTS.get(connection.dialect.name)
+    for amount, user_ids in by_amount.items():
+        # Sorted so concurrent fan-outs lock the counter rows in the same order
+        rows = [{'user_id': user_id, 'unread_count': max(amount, 0)} for user_id in sorted(user_ids)]
+        if upsert:
+            # Creates first counters atomically, so two fan-outs to a new user cannot collide on its key
+            connection.execute(upsert(table, rows, table.c.unread_count + amount))
+            continue
+        
+        connection.execute(
+            update(table)
+            .where(table.c.user_id.in_(user_ids))
+            .values(unread_count=table.c.unread_count + amount)
+        )
+        existing = {row[0] for row in connection.execute(
+            table.select().with_only_columns(table.c.user_id).where(table.c.user_id.in_(user_ids))
+        )}
+        missing = [row for row in rows if row['user_id'] not in existing]
+        if missing:
+            connection.execute(table.insert(), missing)
+
+def is_unread(obj, old=False):
+    history = inspect(obj).attrs.is_read.history
+    if old and history.has_changes():
+        value = history.deleted[0] if history.deleted else None
+    else:
+        value = obj.is_read
+    return not value
+
+@event.listens_for(Session, 'before_flush')
+def collect_unread_deltas(session, flush_context, instances):
+    """Track unread notifications created, read or deleted through the ORM"""
+    deltas = session.info.setdefault('unread_deltas', {})
+    
+    for obj in session.new:
+        if isinstance(obj, Notification) and is_unread(obj):
+            deltas[obj.user_id] = deltas.get(obj.user_id, 0) + 1
+    
+    for obj in session.deleted:
+        if isinstance(obj, Notification) and is_unread(obj, old=True):
+            deltas[obj.user_id] = deltas.get(obj.user_id, 0) - 1
+    
+    for obj in session.dirty:
+        if isinstance(obj, Notification) and session.is_modified(obj):
+            change = int(is_unread(obj)) - int(is_unread(obj, old=True))
+            if change:
+                deltas[obj.user_id] = deltas.get(obj.user_id, 0) + change
+
+@event.listens_for(Session, 'after_rollback')
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_unread_deltas(session, *args):
+    """Drop the deltas of a flush that failed, so the next flush does not apply them"""
+    session.info.pop('unread_deltas', None)
+
+@event.listens_for(Session, 'after_flush')
+def apply_unread_deltas(session, flush_context):
+    deltas = session.info.pop('unread_deltas', {})
+    if any(deltas.values()):
+        adjust_unread_counts(deltas, session.connection())
+
+# Record the previous value on assignment so history always knows what changed
+event.listen(Notification.is_read, 'set', lambda *args: None, active_history=True)
+
+def mark_notifications_read(user_id, ids=None, up_to_id=None, before=None):
+    """Mark a user's unread notifications read with one UPDATE, returning how many changed
+    
+    With no filters every unread notification is marked. ids limits the update
+    to those notifications; up_to_id and before are inclusive/exclusive
+    watermarks on id and created_at.
+    """
+    user_id = int(user_id)
+    conditions = [Notification.user_id == user_id, Notification.is_read == False]
+    if ids is not None:
+        conditions.append(Notification.id.in_(ids))
+    if up_to_id is not None:
+        conditions.append(Notification.id <= up_to_id)
+    if before is not None:
+        conditions.append(Notification.created_at < before)
+    
+    result = db.session.execute(
+        update(Notification)
+        .where(*conditions)
+        .values(is_read=True)
+        .execution_options(synchronize_session=False)
+    )
+    # Bulk updates bypass the ORM hooks, so adjust the counter explicitly
+    if result.rowcount:
+        adjust_unread_counts({user_id: -result.rowcount})
+    return result.rowcount
+
+def unread_count(user_id):
+    """Unread notifications for a user, read from the maintained counter"""
+    counter = NotificationCounter.query.get(int(user_id))
+    return counter.unread_count if counter else 0
+
+def reconcile_unread_counts():
+    """Recompute every unread counter from the notifications table"""
+    actual = dict(db.session.query(Notification.user_id, func.count(Notification.id))
+                  .filter(Notification.is_read == False)
+                  .group_by(Notification.user_id).all())
+    
+    corrected = 0
+    for counter in NotificationCounter.query.with_for_update():
+        value = actual.pop(counter.user_id, 0)
+        if counter.unread_count != value:
+            counter.unread_count = value
+            corrected += 1
+    for user_id, value in actual.items():
+        db.session.add(NotificationCounter(user_id=user_id, unread_count=value))
+        corrected += 1
+    
+    db.session.commit()
+    return corrected
+
+class NotificationBroker:
+    """Fans new notifications out to connected stream clients of this process
+    
+    A single poller thread reads rows past a high-water id once per interval,
+    so idle clients cost no queries however many are connected.
+    """
+    
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._last_id = None
+        self._thread = None
+    
+    def subscribe(self, user_id):
+        subscription = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(int(user_id), set()).add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='notification-broker', daemon=True)
+                self._thread.start()
+        return subscription
+    
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(int(user_id))
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[int(user_id)]
+    
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    self.poll()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Notification broker error: {e}")
+                finally:
+                    db.session.remove()
+                time.sleep(self.interval)
+    
+    def poll(self):
+        """Deliver notifications written since the last poll to their subscribers"""
+        if self._last_id is None:
+            self._last_id = db.session.query(func.max(Notification.id)).scalar() or 0
+            return
+        
+        rows = Notification.query.filter(Notification.id > self._last_id).order_by(Notification.id).limit(1000).all()
+        for notification in rows:
+            self._last_id = notification.id
+            with self._lock:
+                subscriptions = list(self._subscribers.get(notification.user_id, ()))
+            if subscriptions:
+                data = notification.to_dict()
+                for subscription in subscriptions:
+                    subscription.put(data)
+
+def init_notification_broker(app):
+    app.extensions['notification_broker'] = NotificationBroker(app, app.config['NOTIFICATION_STREAM_POLL_INTERVAL'])
+
+def sse_event(event_name, data, event_id=None):
+    """Format one server-sent event"""
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines += [f'event: {event_name}', f'data: {json.dumps(data)}']
+    return '\n'.join(lines) + '\n\n'
+
+def issue_stream_ticket(user_id):
+    """Sign a stream ticket for a user, sent as a cookie rather than in the URL"""
+    serializer = URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=STREAM_TICKET_SALT)
+    return serializer.dumps(int(user_id))
+
+def read_stream_ticket(ticket):
+    """Return the user id a stream ticket was issued to, or None if it is invalid or expired"""
+    serializer = URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=STREAM_TICKET_SALT)
+    try:
+        return int(serializer.loads(ticket, max_age=current_app.config['NOTIFICATION_STREAM_TICKET_TTL']))
+    except (BadSignature, TypeError, ValueError):
+        return None
+
+def notification_stream(user_id, last_event_id=None):
+    """Generate server-sent events for a user's new notifications"""
+    app = current_app._get_current_object()
+    config = app.config
+    broker = app.extensions['notification_broker']
+    
+    def generate():
+        # Subscribing inside the generator ties the subscription to the response:
+        # the finally runs whether the stream ends, the client leaves or the
+        # response is discarded before it was ever iterated
+        subscription = broker.subscribe(user_id)
+        try:
+            with app.app_context():
+                # Read everything needed from the database before the stream starts
+                initial = [sse_event('unread_count', {'unread_count': unread_count(user_id)})]
+                if last_event_id:
+                    missed = Notification.query.filter(
+                        Notification.user_id == user_id,
+                        Notification.id > last_event_id
+                    ).order_by(Notification.id).limit(100).all()
+                    initial += [sse_event('notification', n.to_dict(), n.id) for n in missed]
+                db.session.remove()
+            
+            yield f"retry: {config['NOTIFICATION_STREAM_RETRY_MS']}\n\n"
+            for message in initial:
+                yield message
+            
+            deadline = time.monotonic() + config['NOTIFICATION_STREAM_TIMEOUT']
+            while time.monotonic() < deadline:
+                try:
+                    data = subscription.get(timeout=config['NOTIFICATION_STREAM_HEARTBEAT'])
+                    yield sse_event('notification', data, data['id'])
+                except queue.Empty:
+                    # Comment lines keep proxies from closing an idle connection
+                    yield ': keep-alive\n\n'
+        finally:
+            broker.unsubscribe(user_id, subscription)
+    
+    return generate()
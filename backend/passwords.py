@@ -0,0 +1,69 @@
+from flask import current_app, has_app_context
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import threading
+
+class PasswordHashingBusy(Exception):
+    """Raised when the password hashing pool cannot take more work"""
+
+def make_executor(workers):
+    """Create a pool of native threads, even when gevent has patched threading"""
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            # gevent's executor runs on real OS threads and waits cooperatively
+            from gevent.threadpool import ThreadPoolExecutor
+            return ThreadPoolExecutor(max_workers=workers)
+    except ImportError:
+        pass
+    
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+
+class PasswordHashingPool:
+    """Bounded pool that keeps CPU-bound bcrypt work off the request workers"""
+    
+    def __init__(self, workers, queue_size, timeout):
+        self.timeout = timeout
+        self._executor = make_executor(workers)
+        # Admit at most one job per worker plus queue_size waiting jobs
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+    
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashingBusy('Too many concurrent password operations')
+        
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise PasswordHashingBusy('Password operation timed out')
+
+def init_password_pool(app):
+    """Attach the password hashing pool, unless disabled with zero workers"""
+    workers = app.config['PASSWORD_HASH_WORKERS']
+    if workers > 0:
+        app.extensions['password_pool'] = PasswordHashingPool(
+            workers,
+            app.config['PASSWORD_HASH_QUEUE_SIZE'],
+            app.config['PASSWORD_HASH_TIMEOUT']
+        )
+
+def offload(fn, *args):
+    """Run a password hashing call on the app's pool, or inline without one"""
+    pool = current_app.extensions.get('password_pool') if has_app_context() else None
+    if pool is None:
+        return fn(*args)
+    return pool.run(fn, *args)
+
+def hash_rounds(password_hash):
+    """Return the bcrypt cost factor encoded in a stored hash"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
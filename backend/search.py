@@ -0,0 +1,136 @@
+from sqlalchemy import event, text, column, Integer, Float
+import re
+
+from models import db, FoodItem, geocell_filter
+from utils import calculate_distance
+
+MAX_TERMS = 8
+DISTANCE_DECAY_KM = 5  # a match this far away ranks half as high as the same match next door
+
+TERM_PATTERN = re.compile(r'\w+')
+
+# Full-text index per backend; each is maintained by the database on every insert and update
+SQLITE_DDL = [
+    # External content: the index stores tokens only and reads text back from food_items
+    "CREATE VIRTUAL TABLE food_items_fts USING fts5(title, description, content='food_items', "
+    "content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER food_items_fts_insert AFTER INSERT ON food_items BEGIN "
+    "INSERT INTO food_items_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER food_items_fts_delete AFTER DELETE ON food_items BEGIN "
+    "INSERT INTO food_items_fts(food_items_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER food_items_fts_update AFTER UPDATE OF title, description ON food_items BEGIN "
+    "INSERT INTO food_items_fts(food_items_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO food_items_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "INSERT INTO food_items_fts(food_items_fts) VALUES ('rebuild')",
+]
+POSTGRESQL_DDL = [
+    # Titles weigh more than descriptions in ts_rank
+    "ALTER TABLE food_items ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX idx_food_items_search ON food_items USING GIN (search_vector)",
+]
+MYSQL_DDL = [
+    "ALTER TABLE food_items ADD FULLTEXT INDEX ft_food_items_search (title, description)",
+]
+
+# LIMIT -1 stops SQLite flattening the match into the join, where it would rerun for every row
+SQLITE_MATCH = ("SELECT rowid AS id, -bm25(food_items_fts, 2.0, 1.0) AS relevance "
+                "FROM food_items_fts WHERE food_items_fts MATCH :query LIMIT -1")
+POSTGRESQL_MATCH = ("SELECT id, ts_rank(search_vector, to_tsquery('english', :query)) AS relevance "
+                    "FROM food_items WHERE search_vector @@ to_tsquery('english', :query)")
+MYSQL_MATCH = ("SELECT id, MATCH (title, description) AGAINST (:query IN BOOLEAN MODE) AS relevance "
+               "FROM food_items WHERE MATCH (title, description) AGAINST (:query IN BOOLEAN MODE)")
+
+def search_index_exists(connection):
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        return connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'food_items_fts'"
+        )).first() is not None
+    if dialect == 'postgresql':
+        return connection.execute(text(
+            "SELECT 1 FROM information_schema.columns WHERE table_name = 'food_items' AND column_name = 'search_vector'"
+        )).first() is not None
+    if dialect == 'mysql':
+        return connection.execute(text(
+            "SELECT 1 FROM information_schema.statistics WHERE table_schema = DATABASE() "
+            "AND table_name = 'food_items' AND index_name = 'ft_food_items_search'"
+        )).first() is not None
+    return True  # other backends search with LIKE
+
+def create_search_index(connection):
+    """Create the full-text index over food item titles and descriptions if it is missing"""
+    if search_index_exists(connection):
+        return False
+    statements = {'sqlite': SQLITE_DDL, 'postgresql': POSTGRESQL_DDL, 'mysql': MYSQL_DDL}[connection.dialect.name]
+    for statement in statements:
+        connection.execute(text(statement))
+    return True
+
+@event.listens_for(FoodItem.__table__, 'after_create')
+def create_search_index_with_table(target, connection, **kw):
+    create_search_index(connection)
+
+def search_terms(q):
+    """Lowercased words of a search string; punctuation never reaches the match syntax"""
+    return TERM_PATTERN.findall(q.lower())[:MAX_TERMS] if q else []
+
+def match_query(terms, dialect):
+    """Every term required, the last one as a prefix so results follow typing"""
+    *words, last = terms
+    if dialect == 'sqlite':
+        return ' '.join([f'"{word}"' for word in words] + [f'"{last}"*'])
+    if dialect == 'postgresql':
+        return ' & '.join(words + [f'{last}:*'])
+    return ' '.join([f'+{word}' for word in words] + [f'+{last}*'])
+
+def matches(terms):
+    """Subquery of (id, relevance) for items matching every term, higher relevance first"""
+    dialect = db.session.get_bind(FoodItem).dialect.name
+    statement = {'sqlite': SQLITE_MATCH, 'postgresql': POSTGRESQL_MATCH, 'mysql': MYSQL_MATCH}.get(dialect)
+    if statement is None:
+        # Without a full-text index every term is a substring scan
+        conditions = ' AND '.join(
+            f"(lower(title) LIKE :term{i} OR lower(coalesce(description, '')) LIKE :term{i})"
+            for i in range(len(terms))
+        )
+        return text(f'SELECT id, 1.0 AS relevance FROM food_items WHERE {conditions}').bindparams(
+            **{f'term{i}': f'%{term}%' for i, term in enumerate(terms)}
+        ).columns(column('id', Integer), column('relevance', Float)).subquery('matches')
+    return text(statement).bindparams(query=match_query(terms, dialect)).columns(
+        column('id', Integer), column('relevance', Float)
+    ).subquery('matches')
+
+def filter_by_search(query, terms):
+    """Restrict a FoodItem query to matches of terms, most relevant first"""
+    found = matches(terms)
+    return query.join(found, found.c.id == FoodItem.id).order_by(found.c.relevance.desc(), FoodItem.id)
+
+def rank_food_items(terms, status, lat, lon, max_distance):
+    """Return (-score, id) pairs of matching items within max_distance km, best first
+    
+    The score is the text relevance discounted by distance, so a strong match a few
+    kilometres away can outrank a weak one next door. Like find_nearby_food_items, the
+    pairs sort ascending and work as keyset cursors.
+    """
+    found = matches(terms)
+    candidates = db.session.query(FoodItem.id, FoodItem.latitude, FoodItem.longitude, found.c.relevance).join(
+        found, found.c.id == FoodItem.id
+    ).filter(
+        FoodItem.status == status,
+        geocell_filter(lat, lon, max_distance)
+    ).all()
+    
+    ranked = []
+    for item_id, item_lat, item_lon, relevance in candidates:
+        if item_lat and item_lon:
+            distance = calculate_distance(float(item_lat), float(item_lon), lat, lon)
+            if distance <= max_distance:
+                ranked.append((-float(relevance) / (1 + distance / DISTANCE_DECAY_KM), item_id))
+    
+    # Ties keep id order, like the distance ranking
+    ranked.sort()
+    return ranked
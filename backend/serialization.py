@@ -0,0 +1,188 @@
+from flask.json.provider import JSONProvider, _default
+from sqlalchemy import Float, type_coerce
+from sqlalchemy.orm import aliased
+
+from models import User, FoodItem, PickupRequest, Notification, VerificationRequest
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib provider is used instead
+    orjson = None
+
+class Projection:
+    """Column projection of a model plus a compiled function turning rows into its to_dict shape
+    
+    Fields are (key, expression, kind) tuples. kind is None for plain values, 'iso' for
+    datetimes, 'float' for Numeric coordinates and 'nested' for a list of fields rendered
+    as a sub-dict (None when its first column is NULL, like a missing relationship).
+    """
+    
+    def __init__(self, fields, joins=()):
+        self.columns = []
+        self.nested = set()  # labels of nested fields, so flat exports can prefix their columns
+        self.joins = joins
+        source = f'def serialize(row):\n    return {self._compile(fields, "")}\n'
+        namespace = {}
+        exec(compile(source, '<projection>', 'exec'), namespace)
+        self.serialize = namespace['serialize']
+    
+    def _compile(self, fields, prefix):
+        entries = []
+        for key, expression, kind in fields:
+            if kind == 'nested':
+                self.nested.add(f'{prefix}{key}')
+                presence = len(self.columns)
+                inner = self._compile(expression, f'{prefix}{key}__')
+                entries.append(f'{key!r}: ({inner} if row[{presence}] is not None else None)')
+                continue
+            
+            index = len(self.columns)
+            if kind == 'float':
+                # Skip the Decimal round trip; rounding to the column scale matches what it produced
+                scale = expression.type.scale
+                expression = type_coerce(expression, Float)
+                value = f'(round(float(row[{index}]), {scale}) if row[{index}] else None)'
+            elif kind == 'iso':
+                value = f'(row[{index}].isoformat() if row[{index}] else None)'
+            else:
+                value = f'row[{index}]'
+            self.columns.append(expression.label(f'{prefix}{key}'))
+            entries.append(f'{key!r}: {value}')
+        return '{' + ', '.join(entries) + '}'
+    
+    def select(self, query):
+        """Narrow a model query to the projected columns and their joins"""
+        query = query.with_entities(*self.columns)
+        for target, onclause in self.joins:
+            query = query.outerjoin(target, onclause)
+        return query
+    
+    def rows(self, query):
+        """Run a model query through the projection and serialize every row"""
+        return [self.serialize(row) for row in self.select(query)]
+
+def food_item_fields(food_item, donor):
+    return [
+        ('id', food_item.id, None),
+        ('donor_id', food_item.donor_id, None),
+        ('donor_name', donor.name, None),
+        ('title', food_item.title, None),
+        ('description', food_item.description, None),
+        ('quantity', food_item.quantity, None),
+        ('unit', food_item.unit, None),
+        ('expiry_date', food_item.expiry_date, 'iso'),
+        ('pickup_start', food_item.pickup_start, 'iso'),
+        ('pickup_end', food_item.pickup_end, 'iso'),
+        ('location', food_item.location, None),
+        ('latitude', food_item.latitude, 'float'),
+        ('longitude', food_item.longitude, 'float'),
+        ('image_url', food_item.image_url, None),
+        ('status', food_item.status, None),
+        ('created_at', food_item.created_at, 'iso')
+    ]
+
+def build_food_item_projection():
+    donor = aliased(User)
+    return Projection(food_item_fields(FoodItem, donor), joins=[(donor, FoodItem.donor_id == donor.id)])
+
+def build_pickup_request_projection():
+    # Aliased, since callers may already join food_items to filter by donor
+    food_item = aliased(FoodItem)
+    donor = aliased(User)
+    beneficiary = aliased(User)
+    return Projection([
+        ('id', PickupRequest.id, None),
+        ('food_item_id', PickupRequest.food_item_id, None),
+        ('food_item', food_item_fields(food_item, donor), 'nested'),
+        ('beneficiary_id', PickupRequest.beneficiary_id, None),
+        ('beneficiary_name', beneficiary.name, None),
+        ('status', PickupRequest.status, None),
+        ('message', PickupRequest.message, None),
+        ('requested_at', PickupRequest.requested_at, 'iso'),
+        ('responded_at', PickupRequest.responded_at, 'iso'),
+        ('picked_at', PickupRequest.picked_at, 'iso'),
+        ('completed_at', PickupRequest.completed_at, 'iso')
+    ], joins=[
+        (food_item, PickupRequest.food_item_id == food_item.id),
+        (donor, food_item.donor_id == donor.id),
+        (beneficiary, PickupRequest.beneficiary_id == beneficiary.id)
+    ])
+
+def build_notification_projection():
+    return Projection([
+        ('id', Notification.id, None),
+        ('user_id', Notification.user_id, None),
+        ('type', Notification.type, None),
+        ('title', Notification.title, None),
+        ('message', Notification.message, None),
+        ('payload', Notification.payload, None),
+        ('is_read', Notification.is_read, None),
+        ('created_at', Notification.created_at, 'iso')
+    ])
+
+def build_user_projection():
+    return Projection([
+        ('id', User.id, None),
+        ('name', User.name, None),
+        ('email', User.email, None),
+        ('role', User.role, None),
+        ('phone', User.phone, None),
+        ('latitude', User.latitude, 'float'),
+        ('longitude', User.longitude, 'float'),
+        ('address', User.address, None),
+        ('verified', User.verified, None),
+        ('created_at', User.created_at, 'iso')
+    ])
+
+def build_verification_request_projection():
+    user = aliased(User)
+    return Projection([
+        ('id', VerificationRequest.id, None),
+        ('user_id', VerificationRequest.user_id, None),
+        ('user_name', user.name, None),
+        ('organization_name', VerificationRequest.organization_name, None),
+        ('organization_type', VerificationRequest.organization_type, None),
+        ('document_url', VerificationRequest.document_url, None),
+        ('description', VerificationRequest.description, None),
+        ('status', VerificationRequest.status, None),
+        ('admin_notes', VerificationRequest.admin_notes, None),
+        ('submitted_at', VerificationRequest.submitted_at, 'iso'),
+        ('reviewed_at', VerificationRequest.reviewed_at, 'iso'),
+        ('reviewed_by', VerificationRequest.reviewed_by, None)
+    ], joins=[(user, VerificationRequest.user_id == user.id)])
+
+PROJECTION_BUILDERS = {
+    FoodItem: build_food_item_projection,
+    PickupRequest: build_pickup_request_projection,
+    Notification: build_notification_projection,
+    User: build_user_projection,
+    VerificationRequest: build_verification_request_projection,
+}
+
+_projections = {}
+
+def projection_for(model):
+    """Return the (cached) list projection for a model, or None if it has none"""
+    if model not in _projections:
+        builder = PROJECTION_BUILDERS.get(model)
+        _projections[model] = builder() if builder else None
+    return _projections[model]
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson, encoding values the way Flask's default provider does"""
+    
+    sort_keys = True
+    
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if kwargs.pop('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=kwargs.pop('default', _default), option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+def init_json_provider(app):
+    """Serialize responses with orjson when it is installed and enabled"""
+    if orjson is not None and app.config['JSON_USE_ORJSON']:
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,149 @@
+from flask import request
+import gzip
+import hashlib
+import mimetypes
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip variants are still served
+    brotli = None
+
+# Variants in order of preference when the client accepts several
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+MIN_COMPRESS_SIZE = 1024  # bytes; smaller files are not worth the extra header
+IMMUTABLE_PREFIX = 'assets/'  # Vite puts content-hashed bundles here
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+class InvalidStaticBuild(ValueError):
+    """Raised at startup when the static folder is not a servable frontend build"""
+
+def compressible(path, mimetype):
+    return mimetype.startswith(COMPRESSIBLE_TYPES) or path.endswith('.map')
+
+def decompresses_to(decompress, variant, body):
+    try:
+        return decompress(variant) == body
+    except Exception:
+        return False
+
+class StaticAsset:
+    """One file of the static folder held in memory with its compressed variants"""
+    
+    def __init__(self, path, body, variants):
+        self.path = path
+        self.body = body
+        self.variants = variants
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        self.cache_control = IMMUTABLE_CACHE if path.startswith(IMMUTABLE_PREFIX) else REVALIDATE_CACHE
+    
+    def negotiate(self, accept_encodings):
+        """Pick the best variant the client accepts, as (encoding, body)"""
+        for encoding, _ in ENCODINGS:
+            if encoding in self.variants and accept_encodings[encoding]:
+                return encoding, self.variants[encoding]
+        return None, self.body
+
+class StaticManifest:
+    """Every file of the static folder, read and checked once when the app is created"""
+    
+    def __init__(self, folder):
+        self.folder = folder
+        self.assets = self.load()
+    
+    def load(self):
+        assets = {}
+        if not os.path.isdir(self.folder):
+            return assets  # API-only images ship no frontend
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                if name.endswith(suffixes):
+                    continue
+                full_path = os.path.join(root, name)
+                path = os.path.relpath(full_path, self.folder).replace(os.sep, '/')
+                try:
+                    with open(full_path, 'rb') as f:
+                        body = f.read()
+                    variants = self.load_variants(full_path, path, body)
+                except OSError as e:
+                    raise InvalidStaticBuild(f"Cannot read static file {path}: {e}")
+                assets[path] = StaticAsset(path, body, variants)
+        
+        # Every client-side route falls back to index.html
+        if assets and 'index.html' not in assets:
+            raise InvalidStaticBuild(f"{self.folder} has no index.html; rebuild the frontend")
+        return assets
+    
+    def load_variants(self, full_path, path, body):
+        """Use the .br/.gz files written at build time, gzipping here when none exist"""
+        mimetype = mimetypes.guess_type(path)[0] or ''
+        if len(body) < MIN_COMPRESS_SIZE or not compressible(path, mimetype):
+            return {}
+        
+        variants = {}
+        for encoding, suffix in ENCODINGS:
+            if os.path.exists(full_path + suffix):
+                with open(full_path + suffix, 'rb') as f:
+                    variants[encoding] = f.read()
+        # A variant left over from an earlier build would serve stale code to most clients
+        if 'gzip' in variants and not decompresses_to(gzip.decompress, variants['gzip'], body):
+            raise InvalidStaticBuild(f"{path}.gz does not match {path}; run static_assets.py again")
+        if 'br' in variants and brotli is not None and not decompresses_to(brotli.decompress, variants['br'], body):
+            raise InvalidStaticBuild(f"{path}.br does not match {path}; run static_assets.py again")
+        if 'gzip' not in variants:
+            variants['gzip'] = gzip.compress(body, compresslevel=6, mtime=0)
+        return variants
+    
+    def get(self, path):
+        return self.assets.get(path)
+    
+    def response(self, app, asset):
+        """Build the response for an asset, or a 304 if the client's copy is current"""
+        encoding, body = asset.negotiate(request.accept_encodings)
+        etag = f'{asset.etag}-{encoding}' if encoding else asset.etag
+        
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(body, mimetype=asset.mimetype)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = asset.cache_control
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+        return response
+
+def init_static_assets(app, folder):
+    """Load the built frontend served by the catch-all routes, failing the boot if it is broken"""
+    app.extensions['static_assets'] = StaticManifest(folder)
+
+def precompress(folder):
+    """Write .gz (and .br when brotli is installed) next to every compressible file"""
+    written = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                continue
+            full_path = os.path.join(root, name)
+            with open(full_path, 'rb') as f:
+                body = f.read()
+            if len(body) < MIN_COMPRESS_SIZE or not compressible(name, mimetypes.guess_type(name)[0] or ''):
+                continue
+            with open(full_path + '.gz', 'wb') as f:
+                f.write(gzip.compress(body, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(full_path + '.br', 'wb') as f:
+                    f.write(brotli.compress(body, quality=11))
+            written += 1
+    return written
+
+if __name__ == '__main__':
+    # Run at image build time: python static_assets.py static
+    print(f"Precompressed {precompress(sys.argv[1] if len(sys.argv) > 1 else 'static')} static files")
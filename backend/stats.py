@@ -0,0 +1,220 @@
+from sqlalchemy import event, func, inspect, insert, delete, select, union_all, cast, literal, String
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+from models import db, User, FoodItem, PickupRequest, StatCounter, StatDelta
+
+# Attributes whose changes move the admin statistics
+TRACKED_ATTRIBUTES = {
+    User: ['role'],
+    FoodItem: ['status', 'quantity'],
+    PickupRequest: ['status'],
+}
+
+# Bumped on every change to a food item or a donor's name, so feed responses can be revalidated
+FEED_VERSION_COUNTER = 'food_items.version'
+
+COMPACT_BATCH_SIZE = 5000  # deltas folded per transaction
+
+def counter_contributions(model, values):
+    """Counters a single row contributes to, given its tracked attribute values"""
+    if model is User:
+        return {f"users.{values['role']}": 1}
+    if model is FoodItem:
+        return {
+            f"food_items.{values['status']}": 1,
+            'food_items.available_quantity': (values['quantity'] or 0) if values['status'] == 'available' else 0
+        }
+    return {f"pickup_requests.{values['status']}": 1}
+
+def attribute_values(obj, old=False):
+    """Current (or pre-change) values of an object's tracked attributes"""
+    state = inspect(obj)
+    values = {}
+    for attribute in TRACKED_ATTRIBUTES[type(obj)]:
+        history = state.attrs[attribute].history
+        if old and history.has_changes():
+            value = history.deleted[0] if history.deleted else None
+        else:
+            value = getattr(obj, attribute)
+        if value is None:
+            # Column defaults are only applied at INSERT time
+            default = obj.__table__.columns[attribute].default
+            value = default.arg if default is not None else None
+        values[attribute] = value
+    return values
+
+def changes_feed(obj):
+    """Whether flushing this object changes what the food feed serializes"""
+    if isinstance(obj, FoodItem):
+        return True
+    return isinstance(obj, User) and inspect(obj).attrs.name.history.has_changes()
+
+def add_deltas(deltas, contributions, sign):
+    for name, amount in contributions.items():
+        deltas[name] = deltas.get(name, 0) + sign * amount
+
+@event.listens_for(Session, 'before_flush')
+def collect_stat_deltas(session, flush_context, instances):
+    """Accumulate counter changes for the rows about to be flushed"""
+    deltas = session.info.setdefault('stat_deltas', {})
+    
+    for obj in session.new:
+        if type(obj) in TRACKED_ATTRIBUTES:
+            add_deltas(deltas, counter_contributions(type(obj), attribute_values(obj)), 1)
+    
+    for obj in session.deleted:
+        if type(obj) in TRACKED_ATTRIBUTES:
+            add_deltas(deltas, counter_contributions(type(obj), attribute_values(obj, old=True)), -1)
+    
+    for obj in session.dirty:
+        if type(obj) in TRACKED_ATTRIBUTES and session.is_modified(obj):
+            add_deltas(deltas, counter_contributions(type(obj), attribute_values(obj, old=True)), -1)
+            add_deltas(deltas, counter_contributions(type(obj), attribute_values(obj)), 1)
+    
+    changed = list(session.new) + list(session.deleted) + [obj for obj in session.dirty if session.is_modified(obj)]
+    if any(changes_feed(obj) for obj in changed):
+        add_deltas(deltas, {FEED_VERSION_COUNTER: 1}, 1)
+
+@event.listens_for(Session, 'after_flush')
+def apply_stat_deltas(session, flush_context):
+    """Record accumulated counter changes in the same transaction as the rows"""
+    deltas = session.info.pop('stat_deltas', {})
+    adjust_stats(deltas, session.connection())
+
+@event.listens_for(Session, 'after_rollback')
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_stat_deltas(session, *args):
+    """Drop the deltas of a flush that failed, so the next flush does not apply them"""
+    session.info.pop('stat_deltas', None)
+
+def adjust_stats(deltas, connection=None):
+    """Append counter changes to the delta log; writers never update the shared counter rows
+    
+    The counters are the stored values plus every delta not yet folded in, so the
+    changes count as soon as the transaction commits and vanish if it rolls back.
+    """
+    connection = connection or db.session.connection()
+    now = datetime.utcnow()
+    rows = [{'name': name, 'amount': amount, 'created_at': now} for name, amount in sorted(deltas.items()) if amount]
+    if rows:
+        connection.execute(insert(StatDelta.__table__), rows)
+
+# Record the previous value on assignment so history always knows what changed
+for model, attributes in TRACKED_ATTRIBUTES.items():
+    for attribute in attributes:
+        event.listen(getattr(model, attribute), 'set', lambda *args: None, active_history=True)
+
+def computed_counters():
+    """Every counter computed from the tables, and the deltas pending against each
+    
+    A single UNION ALL statement reads both, so a transaction committing midway
+    can never be counted in one and missed in the other.
+    """
+    def grouped(prefix, column, key):
+        return select(literal(prefix), cast(column, String(100)), func.count(key)).group_by(column)
+    
+    statement = union_all(
+        grouped('users', User.role, User.id),
+        grouped('food_items', FoodItem.status, FoodItem.id),
+        grouped('pickup_requests', PickupRequest.status, PickupRequest.id),
+        select(literal('food_items'), literal('available_quantity'), func.coalesce(func.sum(FoodItem.quantity), 0))
+        .where(FoodItem.status == 'available'),
+        select(literal('pending'), StatDelta.name, func.sum(StatDelta.amount)).group_by(StatDelta.name)
+    )
+    
+    counters = {}
+    for role in User.role.type.enums:
+        counters[f'users.{role}'] = 0
+    for status in FoodItem.status.type.enums:
+        counters[f'food_items.{status}'] = 0
+    for status in PickupRequest.status.type.enums:
+        counters[f'pickup_requests.{status}'] = 0
+    
+    pending = {}
+    for prefix, key, value in db.session.execute(statement):
+        if prefix == 'pending':
+            pending[key] = int(value)
+        else:
+            counters[f'{prefix}.{key}'] = int(value)
+    return counters, pending
+
+def lock_counters():
+    """Lock every stored counter row in name order, so folds and rebuilds never interleave"""
+    return {counter.name: counter for counter in StatCounter.query.order_by(StatCounter.name).with_for_update()}
+
+def reconcile_stats():
+    """Rebuild the stored counters from the tables, returning the drift that was corrected"""
+    stored = lock_counters()
+    # Counts and pending deltas come from one statement, so they see the same committed rows
+    counters, pending = computed_counters()
+    
+    drift = {}
+    for name, value in counters.items():
+        counter = stored.get(name)
+        if counter is None:
+            counter = StatCounter(name=name, value=0)
+            db.session.add(counter)
+        current = counter.value + pending.get(name, 0)
+        if current != value:
+            drift[name] = value - current
+        counter.value = value - pending.get(name, 0)
+    
+    # The feed version is not a count; it only needs to exist
+    if FEED_VERSION_COUNTER not in stored:
+        db.session.add(StatCounter(name=FEED_VERSION_COUNTER, value=0))
+    
+    db.session.commit()
+    return drift
+
+def compact_stats(batch_size=COMPACT_BATCH_SIZE):
+    """Fold committed deltas into the stored counters, returning how many were folded"""
+    stored = lock_counters()
+    deltas = db.session.query(StatDelta.id, StatDelta.name, StatDelta.amount, StatDelta.created_at).order_by(
+        StatDelta.id).limit(batch_size).all()
+    
+    for delta in deltas:
+        counter = stored.get(delta.name)
+        if counter is None:
+            counter = stored[delta.name] = StatCounter(name=delta.name, value=0, updated_at=delta.created_at)
+            db.session.add(counter)
+        counter.value += delta.amount
+        # Keep the time of the change itself, which feed Last-Modified headers report
+        counter.updated_at = max(counter.updated_at or delta.created_at, delta.created_at)
+    if deltas:
+        db.session.execute(delete(StatDelta).where(StatDelta.id.in_([delta.id for delta in deltas])))
+    
+    db.session.commit()
+    return len(deltas)
+
+def current_counters(*names):
+    """Stored counters plus their pending deltas as {name: (value, updated_at)}, read in one statement"""
+    stored = select(StatCounter.name, StatCounter.value, StatCounter.updated_at)
+    pending = select(StatDelta.name, func.sum(StatDelta.amount), func.max(StatDelta.created_at)).group_by(StatDelta.name)
+    if names:
+        stored = stored.where(StatCounter.name.in_(names))
+        pending = pending.where(StatDelta.name.in_(names))
+    
+    counters = {}
+    for name, value, updated_at in db.session.execute(union_all(stored, pending)):
+        previous, previous_at = counters.get(name, (0, None))
+        counters[name] = (previous + int(value), max(filter(None, (previous_at, updated_at)), default=None))
+    return counters
+
+def stats_snapshot():
+    """Read the admin statistics from the counters table"""
+    counters = {name: value for name, (value, _) in current_counters().items()}
+    
+    def group(prefix, keys):
+        return {key: counters.get(f'{prefix}.{key}', 0) for key in keys}
+    
+    return {
+        'users': group('users', User.role.type.enums),
+        'food_items': group('food_items', FoodItem.status.type.enums),
+        'available_quantity': counters.get('food_items.available_quantity', 0),
+        'pickup_requests': group('pickup_requests', PickupRequest.status.type.enums)
+    }
+
+def feed_version():
+    """Current food feed version and when it last changed"""
+    return current_counters(FEED_VERSION_COUNTER).get(FEED_VERSION_COUNTER, (0, None))
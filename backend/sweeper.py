@@ -0,0 +1,142 @@
+from flask import current_app
+from sqlalchemy import update
+from datetime import datetime
+import threading
+import time
+
+from models import db, FoodItem, PickupRequest
+from stats import adjust_stats, FEED_VERSION_COUNTER
+from dispatch import enqueue_notification
+
+# Listings the sweeper may retire; accepted pickups are left for the donor to settle
+EXPIRABLE_STATUSES = ('available', 'requested')
+
+def expired_candidates(deadline, now, batch_size):
+    """Lock up to batch_size live items whose deadline column has passed, oldest first"""
+    return (db.session.query(FoodItem.id, FoodItem.status, FoodItem.quantity)
+            .filter(deadline < now, FoodItem.status.in_(EXPIRABLE_STATUSES))
+            .order_by(deadline)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all())
+
+def update_changed(statement, id_column, ids):
+    """Run a bulk UPDATE whose WHERE re-checks the status and return the ids it changed
+    
+    A concurrent sweeper that got to a row first makes it fail the status check; where
+    UPDATE ... RETURNING is unavailable (MySQL), the candidates' row locks rule that out.
+    """
+    statement = statement.execution_options(synchronize_session=False)
+    if db.session.connection().dialect.update_returning:
+        return {row[0] for row in db.session.execute(statement.returning(id_column))}
+    db.session.execute(statement)
+    return set(ids)
+
+def expire_batch(batch_size, now=None):
+    """Expire one batch of stale listings and cancel their pending pickups, returning the count"""
+    now = now or datetime.utcnow()
+    
+    # Each condition walks its own index (idx_food_items_expiry, idx_food_items_pickup_end)
+    items = {}
+    for deadline in (FoodItem.expiry_date, FoodItem.pickup_end):
+        for row in expired_candidates(deadline, now, batch_size - len(items)):
+            items[row.id] = row
+        if len(items) >= batch_size:
+            break
+    if not items:
+        db.session.commit()
+        return 0
+    
+    # One UPDATE per previous status, so the counters move only for rows that changed
+    expired = []
+    for status in EXPIRABLE_STATUSES:
+        ids = [item.id for item in items.values() if item.status == status]
+        if ids:
+            changed = update_changed(
+                update(FoodItem)
+                .where(FoodItem.id.in_(ids), FoodItem.status == status)
+                .values(status='expired', updated_at=now),
+                FoodItem.id, ids
+            )
+            expired += [items[item_id] for item_id in ids if item_id in changed]
+    if not expired:
+        db.session.commit()
+        return 0
+    
+    item_ids = [item.id for item in expired]
+    pending = (db.session.query(PickupRequest.id, PickupRequest.beneficiary_id, FoodItem.title)
+               .join(FoodItem, PickupRequest.food_item_id == FoodItem.id)
+               .filter(PickupRequest.food_item_id.in_(item_ids), PickupRequest.status == 'pending')
+               .all())
+    if pending:
+        pickup_ids = [pickup.id for pickup in pending]
+        cancelled = update_changed(
+            update(PickupRequest)
+            .where(PickupRequest.id.in_(pickup_ids), PickupRequest.status == 'pending')
+            .values(status='cancelled', responded_at=now),
+            PickupRequest.id, pickup_ids
+        )
+        pending = [pickup for pickup in pending if pickup.id in cancelled]
+        for pickup in pending:
+            enqueue_notification(
+                idempotency_key=f'pickup_expired:{pickup.id}',
+                user_id=pickup.beneficiary_id,
+                notification_type='request_rejected',
+                title='Pickup Request Update',
+                message=f'{pickup.title} expired before your pickup request was accepted',
+                payload={'request_id': pickup.id}
+            )
+    
+    # Bulk UPDATEs bypass the flush hooks, so the counters are adjusted here
+    deltas = {'food_items.expired': len(expired), FEED_VERSION_COUNTER: 1}
+    for item in expired:
+        deltas[f'food_items.{item.status}'] = deltas.get(f'food_items.{item.status}', 0) - 1
+        if item.status == 'available':
+            deltas['food_items.available_quantity'] = deltas.get('food_items.available_quantity', 0) - (item.quantity or 0)
+    if pending:
+        deltas['pickup_requests.pending'] = -len(pending)
+        deltas['pickup_requests.cancelled'] = len(pending)
+    adjust_stats(deltas)
+    
+    db.session.commit()
+    return len(expired)
+
+def sweep_expired(batch_size=None):
+    """Expire every stale listing in batches, returning the total retired"""
+    batch_size = batch_size or current_app.config['EXPIRY_SWEEP_BATCH_SIZE']
+    total = 0
+    while True:
+        expired = expire_batch(batch_size)
+        total += expired
+        # A batch can come up short while more remain: an item past both deadlines is found twice
+        if not expired:
+            return total
+
+def run_sweeper(once=False):
+    """Retire stale listings on a fixed interval until interrupted"""
+    config = current_app.config
+    
+    while True:
+        try:
+            expired = sweep_expired()
+            if expired:
+                print(f"Expired {expired} food items")
+        except Exception as e:
+            # Keep the sweeper alive through transient database errors
+            db.session.rollback()
+            print(f"Expiry sweep error: {e}")
+        
+        if once:
+            return
+        
+        time.sleep(config['EXPIRY_SWEEP_INTERVAL'])
+
+def start_sweeper_thread(app):
+    """Run the expiry sweeper in a daemon thread of the web process"""
+    def target():
+        with app.app_context():
+            run_sweeper()
+    
+    thread = threading.Thread(target=target, name='expiry-sweeper', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,148 @@
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import importlib.util
+import os
+import tempfile
+import threading
+
+from utils import allowed_file
+
+CHUNK_SIZE = 64 * 1024
+THUMBNAIL_DIR = 'thumbs'
+# Pillow is imported by the thumbnail workers only; without it originals are still stored and served
+HAS_PILLOW = importlib.util.find_spec('PIL') is not None
+
+# Leading bytes of each accepted format, checked instead of trusting the client
+SIGNATURES = {
+    'png': [b'\x89PNG\r\n\x1a\n'],
+    'jpg': [b'\xff\xd8\xff'],
+    'gif': [b'GIF87a', b'GIF89a'],
+}
+CONTENT_TYPES = {'image/png': 'png', 'image/jpeg': 'jpg', 'image/gif': 'gif'}
+
+class InvalidUpload(ValueError):
+    """Raised when an upload is empty or not an accepted image"""
+
+def upload_extension(filename, content_type, allowed_extensions):
+    """Storage extension for an upload, from its filename or else its content type"""
+    if filename:
+        if not allowed_file(filename, allowed_extensions):
+            raise InvalidUpload('File type not allowed')
+        extension = filename.rsplit('.', 1)[1].lower()
+        return 'jpg' if extension == 'jpeg' else extension
+    extension = CONTENT_TYPES.get((content_type or '').split(';')[0].strip())
+    if extension is None:
+        raise InvalidUpload('File type not allowed')
+    return extension
+
+def thumbnail_paths(folder, digest, sizes):
+    return {size: os.path.join(folder, THUMBNAIL_DIR, f'{digest}-{size}.webp') for size in sizes}
+
+def store_stream(stream, folder, extension):
+    """Hash a stream to a temporary file in chunks, then move it to its content address
+    
+    Returns (digest, size, created); created is False when the same bytes were stored before.
+    """
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if len(head) < 16:
+                    head += chunk[:16]
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        
+        if not size:
+            raise InvalidUpload('Empty upload')
+        if not any(head.startswith(signature) for signature in SIGNATURES[extension]):
+            raise InvalidUpload('File content does not match its type')
+        
+        digest = digest.hexdigest()
+        final_path = os.path.join(folder, f'{digest}.{extension}')
+        if os.path.exists(final_path):
+            os.remove(temp_path)
+            return digest, size, False
+        os.replace(temp_path, final_path)
+        return digest, size, True
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def make_thumbnails(source_path, targets):
+    """Write WebP thumbnails no larger than each size; runs in a worker process"""
+    from PIL import Image
+    with Image.open(source_path) as image:
+        image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        for size, target in targets.items():
+            thumbnail = image.copy()
+            thumbnail.thumbnail((size, size))
+            temp_path = f'{target}.tmp'
+            thumbnail.save(temp_path, 'WEBP', quality=80, method=4)
+            os.replace(temp_path, target)
+    return len(targets)
+
+class ThumbnailPool:
+    """Process pool for thumbnailing, started on first use so forked web workers each get their own"""
+    
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def submit(self, source_path, targets):
+        if not HAS_PILLOW or not self.workers:
+            return None
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._executor.submit(make_thumbnails, source_path, targets)
+
+def init_upload_storage(app):
+    """Attach the thumbnail pool used for new uploads"""
+    app.extensions['thumbnail_pool'] = ThumbnailPool(app.config['THUMBNAIL_WORKERS'])
+
+def upload_folder(app):
+    """Absolute upload folder; a relative UPLOAD_FOLDER is taken from the backend directory"""
+    return os.path.join(app.root_path, app.config['UPLOAD_FOLDER'])
+
+def find_original(folder, digest):
+    """Stored filename of the original image with this digest, if any"""
+    for extension in set(CONTENT_TYPES.values()):
+        if os.path.exists(os.path.join(folder, f'{digest}.{extension}')):
+            return f'{digest}.{extension}'
+    return None
+
+def save_upload(app, stream, filename=None, content_type=None):
+    """Store an uploaded image and queue any missing thumbnails, returning its URLs"""
+    config = app.config
+    folder = upload_folder(app)
+    extension = upload_extension(filename, content_type, config['ALLOWED_EXTENSIONS'])
+    digest, size, created = store_stream(stream, folder, extension)
+    
+    sizes = config['THUMBNAIL_SIZES']
+    targets = {size: path for size, path in thumbnail_paths(folder, digest, sizes).items() if not os.path.exists(path)}
+    if targets:
+        os.makedirs(os.path.join(folder, THUMBNAIL_DIR), exist_ok=True)
+        app.extensions['thumbnail_pool'].submit(os.path.join(folder, f'{digest}.{extension}'), targets)
+    
+    return {
+        'sha256': digest,
+        'size': size,
+        'deduplicated': not created,
+        'url': f'/uploads/{digest}.{extension}',
+        'thumbnails': {str(size): f'/uploads/{THUMBNAIL_DIR}/{digest}-{size}.webp' for size in sizes}
+    }
@@ -1,8 +1,109 @@
 from functools import wraps
-from flask import jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import User, Notification, db
+from collections import OrderedDict
+from flask import jsonify, request, g, has_request_context, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy import func, insert, inspect, select, text
+from sqlalchemy.orm import make_transient_to_detached
+from models import User, FoodItem, PickupRequest, Notification, db, geocell_for, geocell_filter, KM_PER_DEGREE, SEARCH_PADDING
+from notifications import adjust_unread_counts
+from stats import adjust_stats, FEED_VERSION_COUNTER
+from serialization import projection_for
+from metrics import instrument_sql
+from datetime import datetime, timezone
+import base64
+import codecs
+import csv
+import hashlib
+import json
 import math
+import threading
+import time
+
+PICKUP_UNIQUE_KEY = 'uq_pickup_requests_item_beneficiary'
+# Which of several requests for the same listing survives deduplication, most progressed first
+PICKUP_STATUS_PRIORITY = ['completed', 'picked', 'accepted', 'pending', 'rejected', 'cancelled']
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+class InvalidListing(ValueError):
+    """Raised when a submitted food item fails validation"""
+
+class InvalidDistance(ValueError):
+    """Raised when a max_distance argument is not a finite, non-negative number of km"""
+
+class UserCache:
+    """Process-wide TTL/LRU cache of user column snapshots keyed by id"""
+    
+    def __init__(self, ttl=0, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, user_id):
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, values = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return values
+    
+    def set(self, user):
+        if self.ttl <= 0:
+            return
+        values = {column.key: getattr(user, column.key) for column in User.__table__.columns}
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+def init_user_cache(app):
+    """Attach the process-level user cache configured for this app"""
+    app.extensions['user_cache'] = UserCache(app.config['USER_CACHE_TTL'], app.config['USER_CACHE_SIZE'])
+
+def invalidate_user(user_id):
+    """Drop a user from the per-request and process-level caches"""
+    current_app.extensions['user_cache'].invalidate(int(user_id))
+    if has_request_context() and g.get('current_user_id') == int(user_id):
+        g.pop('current_user', None)
+
+def get_current_user():
+    """Return the authenticated user, loading it at most once per request"""
+    current_user_id = int(get_jwt_identity())
+    if g.get('current_user_id') == current_user_id and g.get('current_user') is not None:
+        return g.current_user
+    
+    cache = current_app.extensions['user_cache']
+    values = cache.get(current_user_id)
+    if values is not None:
+        # Attach a detached copy of the cached row to this session without a SELECT
+        user = User(**values)
+        make_transient_to_detached(user)
+        user = db.session.merge(user, load=False)
+    else:
+        user = User.query.get(current_user_id)
+        if user:
+            cache.set(user)
+    
+    g.current_user_id = current_user_id
+    g.current_user = user
+    return user
+
+def identity_claims(user):
+    """Extra JWT claims so role checks need no database lookup"""
+    return {'role': user.role, 'verified': user.verified}
 
 def role_required(allowed_roles):
     """Decorator to check if user has required role"""
@@ -10,8 +111,12 @@ def role_required(allowed_roles):
         @wraps(f)
         @jwt_required()
         def decorated_function(*args, **kwargs):
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
+            # Tokens carry the role claim, so forbidden requests never touch the database
+            role = get_jwt().get('role')
+            if role is not None and role not in allowed_roles:
+                return jsonify({'error': 'Insufficient permissions'}), 403
+            
+            user = get_current_user()
             
             if not user:
                 return jsonify({'error': 'User not found'}), 404
@@ -41,7 +146,142 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     
     return R * c
 
-def create_notification(user_id, notification_type, title, message, payload=None):
+def find_nearby_food_items(status, lat, lon, max_distance):
+    """Return (distance, id) pairs of food items within max_distance km, nearest first"""
+    # Only project coordinates of candidates in the covering cells
+    candidates = db.session.query(FoodItem.id, FoodItem.latitude, FoodItem.longitude).filter(
+        FoodItem.status == status,
+        geocell_filter(lat, lon, max_distance)
+    ).order_by(FoodItem.id).all()
+    
+    nearby = []
+    for item_id, item_lat, item_lon in candidates:
+        if item_lat and item_lon:
+            distance = calculate_distance(float(item_lat), float(item_lon), lat, lon)
+            if distance <= max_distance:
+                nearby.append((distance, item_id))
+    
+    # Stable sort keeps id order among equidistant items
+    nearby.sort(key=lambda pair: pair[0])
+    return nearby
+
+def upgrade_schema():
+    """Add the columns and indexes create_all cannot add to tables that already exist
+    
+    Returns a description of each change made; an up-to-date database gets none.
+    """
+    connection = db.session.connection()
+    inspector = inspect(connection)
+    changes = []
+    
+    if 'geocell' not in {column['name'] for column in inspector.get_columns('food_items')}:
+        connection.execute(text('ALTER TABLE food_items ADD COLUMN geocell INTEGER'))
+        changes.append('food_items.geocell')
+    
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        changes += upgrade_enums(connection, inspector, table)
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+                changes.append(index.name)
+    
+    # create_pickup_request relies on this key instead of checking for an earlier request
+    if inspector.has_table('pickup_requests'):
+        existing = {constraint['name'] for constraint in inspector.get_unique_constraints('pickup_requests')}
+        existing |= {index['name'] for index in inspector.get_indexes('pickup_requests')}
+        if PICKUP_UNIQUE_KEY not in existing:
+            removed = deduplicate_pickup_requests(connection)
+            if removed:
+                changes.append(f'removed {removed} duplicate pickup requests')
+            connection.execute(text(
+                f'CREATE UNIQUE INDEX {PICKUP_UNIQUE_KEY} ON pickup_requests (food_item_id, beneficiary_id)'
+            ))
+            changes.append(PICKUP_UNIQUE_KEY)
+    
+    db.session.commit()
+    return changes
+
+def deduplicate_pickup_requests(connection):
+    """Keep one pickup request per beneficiary and listing, the one furthest along, and delete the rest"""
+    table = PickupRequest.__table__
+    duplicated = select(table.c.food_item_id, table.c.beneficiary_id).group_by(
+        table.c.food_item_id, table.c.beneficiary_id
+    ).having(func.count() > 1).subquery()
+    rows = connection.execute(select(table.c.id, table.c.food_item_id, table.c.beneficiary_id, table.c.status).join(
+        duplicated,
+        (duplicated.c.food_item_id == table.c.food_item_id) & (duplicated.c.beneficiary_id == table.c.beneficiary_id)
+    )).all()
+    
+    priority = {status: rank for rank, status in enumerate(PICKUP_STATUS_PRIORITY)}
+    kept = {}
+    for row in sorted(rows, key=lambda row: (priority.get(row.status, len(priority)), row.id)):
+        kept.setdefault((row.food_item_id, row.beneficiary_id), row.id)
+    removed = [row.id for row in rows if kept[(row.food_item_id, row.beneficiary_id)] != row.id]
+    for start in range(0, len(removed), 500):
+        connection.execute(table.delete().where(table.c.id.in_(removed[start:start + 500])))
+    # init-db reconciles the stats counters afterwards
+    return len(removed)
+
+def upgrade_enums(connection, inspector, table):
+    """Add enum values the model declares (such as 'expired') to a table's existing enum columns"""
+    changes = []
+    reflected = {column['name']: column for column in inspector.get_columns(table.name)}
+    for column in table.columns:
+        if not isinstance(column.type, db.Enum) or column.name not in reflected:
+            continue
+        existing = getattr(reflected[column.name]['type'], 'enums', None)
+        if existing is None:
+            continue  # stored as plain strings, as on SQLite
+        missing = [value for value in column.type.enums if value not in existing]
+        if not missing:
+            continue
+        
+        if connection.dialect.name == 'postgresql':
+            for value in missing:
+                connection.execute(text(
+                    f"ALTER TYPE {reflected[column.name]['type'].name} ADD VALUE IF NOT EXISTS '{value}'"
+                ))
+        elif connection.dialect.name == 'mysql':
+            # Existing values stay listed so no stored row becomes invalid
+            values = ', '.join(f"'{value}'" for value in list(existing) + missing)
+            null = '' if reflected[column.name]['nullable'] else ' NOT NULL'
+            default = reflected[column.name]['default']
+            default = f' DEFAULT {default}' if default is not None else ''
+            connection.execute(text(
+                f'ALTER TABLE {table.name} MODIFY COLUMN {column.name} ENUM({values}){null}{default}'
+            ))
+        else:
+            continue
+        changes.append(f"{table.name}.{column.name} values {', '.join(missing)}")
+    return changes
+
+def backfill_geocells(batch_size=1000):
+    """Populate the spatial grid cell for food items stored without one"""
+    updated = 0
+    last_id = 0
+    while True:
+        items = FoodItem.query.filter(
+            FoodItem.id > last_id,
+            FoodItem.geocell.is_(None),
+            FoodItem.latitude.isnot(None),
+            FoodItem.longitude.isnot(None)
+        ).order_by(FoodItem.id).limit(batch_size).all()
+        
+        if not items:
+            break
+        
+        for item in items:
+            item.geocell = geocell_for(item.latitude, item.longitude)
+            updated += item.geocell is not None
+        db.session.commit()
+        last_id = items[-1].id
+    
+    return updated
+
+def create_notification(user_id, notification_type, title, message, payload=None, commit=True):
     """Create a new notification for a user"""
     notification = Notification(
         user_id=user_id,
@@ -51,34 +291,116 @@ def create_notification(user_id, notification_type, title, message, payload=None
         payload=payload
     )
     db.session.add(notification)
-    db.session.commit()
+    if commit:
+        db.session.commit()
     return notification
 
-def notify_nearby_beneficiaries(food_item, max_distance=10):
+def bounding_box(lat, lon, radius_km):
+    """Return (min_lat, max_lat, min_lon, max_lon) enclosing a circle, or None for longitude if it wraps"""
+    dlat = radius_km / KM_PER_DEGREE + SEARCH_PADDING
+    cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 90)))
+    if cos_lat <= 0:
+        return lat - dlat, lat + dlat, None, None
+    
+    dlon = radius_km / (KM_PER_DEGREE * cos_lat) + SEARCH_PADDING
+    if lon - dlon < -180 or lon + dlon > 180:
+        return lat - dlat, lat + dlat, None, None
+    
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+def haversine_many(lat, lon, lats, lons):
+    """Vectorized Haversine distance in km from one point to arrays of points"""
+    import numpy as np  # deferred: only the listing fan-out needs it, not worker start-up
+    R = 6371  # Earth's radius in kilometers
+    
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    
+    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    c = 2 * np.arcsin(np.sqrt(a))
+    
+    return R * c
+
+def notify_nearby_beneficiaries(food_item, max_distance=10, commit=True):
     """Notify beneficiaries within max_distance km of new food listing"""
-    if not food_item.latitude or not food_item.longitude:
-        return
+    return notify_beneficiaries_of_listings([food_item], max_distance, commit)
+
+def listing_message(food_items):
+    """Notification text for one or several listings reaching the same beneficiary"""
+    if len(food_items) == 1:
+        return f'{food_items[0].title} available for pickup'
+    titles = ', '.join(item.title for item in food_items[:3])
+    more = f' and {len(food_items) - 3} more' if len(food_items) > 3 else ''
+    return f'{len(food_items)} new listings available for pickup: {titles}{more}'
+
+def notify_beneficiaries_of_listings(food_items, max_distance=10, commit=True):
+    """Send each beneficiary within max_distance km of any new listing a single notification"""
+    located = [item for item in food_items if item.latitude and item.longitude]
+    if not located:
+        return 0
     
-    beneficiaries = User.query.filter_by(role='beneficiary').all()
+    points = [(float(item.latitude), float(item.longitude)) for item in located]
     
-    for beneficiary in beneficiaries:
-        if beneficiary.latitude and beneficiary.longitude:
-            distance = calculate_distance(
-                float(food_item.latitude), float(food_item.longitude),
-                float(beneficiary.latitude), float(beneficiary.longitude)
-            )
-            
-            if distance <= max_distance:
-                create_notification(
-                    user_id=beneficiary.id,
-                    notification_type='new_listing',
-                    title='New Food Available Nearby',
-                    message=f'{food_item.title} available for pickup',
-                    payload={
-                        'food_item_id': food_item.id,
-                        'distance': round(distance, 2)
-                    }
-                )
+    # Prefilter candidates by the bounding boxes of every distinct listing location
+    boxes = []
+    for min_lat, max_lat, min_lon, max_lon in {bounding_box(lat, lon, max_distance) for lat, lon in points}:
+        box = User.latitude.between(min_lat, max_lat)
+        if min_lon is not None:
+            box = db.and_(box, User.longitude.between(min_lon, max_lon))
+        boxes.append(box)
+    candidates = db.session.query(User.id, User.latitude, User.longitude).filter(
+        User.role == 'beneficiary',
+        User.longitude.isnot(None),
+        db.or_(*boxes)
+    ).all()
+    
+    if not candidates:
+        return 0
+    
+    import numpy as np
+    ids = np.array([row[0] for row in candidates])
+    lats = np.array([float(row[1]) for row in candidates])
+    lons = np.array([float(row[2]) for row in candidates])
+    
+    # One row of distances per listing, one column per candidate
+    distances = np.array([haversine_many(lat, lon, lats, lons) for lat, lon in points])
+    within = (lats != 0) & (lons != 0) & (distances <= max_distance)
+    recipients = np.nonzero(within.any(axis=0))[0]
+    
+    if not len(recipients):
+        return 0
+    
+    # Write every notification in a single bulk insert and transaction
+    now = datetime.utcnow()
+    rows = []
+    for i in recipients:
+        listings = np.nonzero(within[:, i])[0]
+        nearest = listings[np.argmin(distances[listings, i])]
+        payload = {
+            'food_item_id': located[nearest].id,
+            'distance': round(float(distances[nearest, i]), 2)
+        }
+        if len(listings) > 1:
+            payload['food_item_ids'] = [located[j].id for j in listings]
+        rows.append({
+            'user_id': int(ids[i]),
+            'type': 'new_listing',
+            'title': 'New Food Available Nearby',
+            'message': listing_message([located[j] for j in listings]),
+            'payload': payload,
+            'is_read': False,
+            'created_at': now
+        })
+    db.session.execute(insert(Notification), rows)
+    # Bulk inserts bypass the ORM, so bump the unread counters explicitly
+    adjust_unread_counts({int(ids[i]): 1 for i in recipients})
+    if commit:
+        db.session.commit()
+    
+    return len(recipients)
 
 def allowed_file(filename, allowed_extensions):
     """Check if file extension is allowed"""
@@ -94,15 +416,156 @@ def validate_coordinates(lat, lon):
     except (ValueError, TypeError):
         return False
 
-def paginate_query(query, page=1, per_page=20):
-    """Paginate a SQLAlchemy query"""
+def parse_datetime(value):
+    """Parse an ISO 8601 timestamp into naive UTC, accepting a trailing Z
+    
+    Timestamps are stored naive in UTC, like created_at; ones without an offset are taken as UTC.
+    """
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def food_item_values(data, donor):
+    """Validate a submitted listing and return the FoodItem column values for donor"""
+    required_fields = ['title', 'quantity', 'pickup_start', 'pickup_end']
+    for field in required_fields:
+        if not data.get(field):
+            raise InvalidListing(f'{field} is required')
+    
+    try:
+        pickup_start = parse_datetime(data['pickup_start'])
+        pickup_end = parse_datetime(data['pickup_end'])
+        expiry_date = parse_datetime(data['expiry_date']) if data.get('expiry_date') else None
+    except (AttributeError, ValueError):
+        raise InvalidListing('Invalid datetime format')
+    
+    try:
+        quantity = int(data['quantity'])
+    except (TypeError, ValueError):
+        raise InvalidListing('quantity must be a whole number')
+    
+    # Listings without coordinates fall back to the donor's location
+    latitude = data.get('latitude') or donor.latitude
+    longitude = data.get('longitude') or donor.longitude
+    
+    if latitude and longitude:
+        if not validate_coordinates(latitude, longitude):
+            raise InvalidListing('Invalid coordinates')
+        latitude, longitude = float(latitude), float(longitude)
+    
+    return {
+        'donor_id': donor.id,
+        'title': data['title'],
+        'description': data.get('description'),
+        'quantity': quantity,
+        'unit': data.get('unit') or 'servings',
+        'expiry_date': expiry_date,
+        'pickup_start': pickup_start,
+        'pickup_end': pickup_end,
+        'location': data.get('location'),
+        'latitude': latitude,
+        'longitude': longitude,
+        'image_url': data.get('image_url')
+    }
+
+def insert_food_items(values):
+    """Insert validated listings, in one multi-row statement where RETURNING allows, oldest first"""
+    if not db.session.get_bind(FoodItem).dialect.insert_executemany_returning:
+        # Without RETURNING the ORM inserts row by row to learn each id
+        food_items = [FoodItem(**row) for row in values]
+        db.session.add_all(food_items)
+        db.session.flush()
+        return food_items
+    
+    # Core inserts skip the ORM hooks, so geocells and counters are maintained here
+    rows = [dict(row, status='available', geocell=geocell_for(row['latitude'], row['longitude'])) for row in values]
+    ids = db.session.scalars(insert(FoodItem.__table__).returning(FoodItem.__table__.c.id), rows).all()
+    adjust_stats({
+        'food_items.available': len(rows),
+        'food_items.available_quantity': sum(row['quantity'] for row in rows),
+        FEED_VERSION_COUNTER: 1
+    })
+    return FoodItem.query.filter(FoodItem.id.in_(ids)).order_by(FoodItem.id).all()
+
+def read_listings(req):
+    """Yield the listings of a bulk upload: a JSON array, NDJSON lines or CSV rows with a header
+    
+    NDJSON and CSV bodies are decoded line by line as they stream in. Lines that are
+    not JSON objects yield None so the caller can report them by position.
+    """
+    if req.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        for line in codecs.iterdecode(req.stream, 'utf-8-sig'):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+    elif req.mimetype == 'text/csv':
+        for row in csv.DictReader(codecs.iterdecode(req.stream, 'utf-8-sig')):
+            # Empty cells are missing values, so optional columns keep their defaults
+            yield {key: value for key, value in row.items() if key and value}
+    else:
+        data = req.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('items')
+        if not isinstance(data, list):
+            raise InvalidListing('Expected a JSON array of listings')
+        yield from data
+
+def encode_cursor(*key):
+    """Encode a keyset position as an opaque cursor string"""
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def decode_cursor(cursor, *types):
+    """Decode a cursor string back into its keyset position, converting each part"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(key, list) or len(key) != len(types):
+            raise ValueError(cursor)
+        return [convert(part) for convert, part in zip(types, key)]
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+def parse_max_distance(max_distance, default=10):
+    """Parse a max_distance argument in km"""
+    if max_distance is None or max_distance == '':
+        return float(default)
+    try:
+        max_distance = float(max_distance)
+    except ValueError:
+        raise InvalidDistance('max_distance must be a number of km')
+    if not math.isfinite(max_distance) or max_distance < 0:
+        raise InvalidDistance('max_distance must be a finite, non-negative number of km')
+    return max_distance
+
+def parse_per_page(per_page):
+    """Parse a per_page argument, between 1 and 100 items"""
     try:
-        page = int(page) if page else 1
         per_page = int(per_page) if per_page else 20
-        per_page = min(per_page, 100)  # Max 100 items per page
     except ValueError:
-        page = 1
         per_page = 20
+    return max(1, min(per_page, 100))  # Max 100 items per page
+
+def paginate_query(query, page=1, per_page=20, cursor=None):
+    """Paginate a SQLAlchemy query, by page number or by keyset cursor"""
+    model = query.column_descriptions[0]['entity']
+    projection = projection_for(model)
+    if projection:
+        # Select plain column tuples, joining what to_dict would lazy-load, so a page is one query
+        query = projection.select(query)
+        serialize = projection.serialize
+    else:
+        serialize = model.to_dict
+    
+    if cursor is not None:
+        return paginate_query_by_cursor(query, cursor, parse_per_page(per_page), model, serialize)
+    
+    try:
+        page = int(page) if page else 1
+    except ValueError:
+        page = 1
+    per_page = parse_per_page(per_page)
     
     paginated = query.paginate(
         page=page,
@@ -111,7 +574,7 @@ def paginate_query(query, page=1, per_page=20):
     )
     
     return {
-        'items': [item.to_dict() for item in paginated.items],
+        'items': [serialize(item) for item in paginated.items],
         'total': paginated.total,
         'pages': paginated.pages,
         'current_page': paginated.page,
@@ -119,3 +582,82 @@ def paginate_query(query, page=1, per_page=20):
         'has_next': paginated.has_next,
         'has_prev': paginated.has_prev
     }
+
+def paginate_query_by_cursor(query, cursor, per_page, model, serialize):
+    """Keyset pagination over (timestamp, id), newest first, without a COUNT"""
+    timestamp = getattr(model, getattr(model, 'cursor_column', 'created_at'))
+    
+    query = query.order_by(None).order_by(timestamp.desc(), model.id.desc())
+    if cursor:
+        last_timestamp, last_id = decode_cursor(cursor, datetime.fromisoformat, int)
+        query = query.filter(db.or_(
+            timestamp < last_timestamp,
+            db.and_(timestamp == last_timestamp, model.id < last_id)
+        ))
+    
+    # Fetch one extra row to learn whether another page follows
+    rows = query.limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    
+    next_cursor = None
+    if has_next and rows:
+        last = rows[-1]
+        last_timestamp = getattr(last, timestamp.key)
+        next_cursor = encode_cursor(last_timestamp.isoformat() if last_timestamp else None, last.id)
+    
+    return {
+        'items': [serialize(item) for item in rows],
+        'next_cursor': next_cursor,
+        'per_page': per_page,
+        'has_next': has_next
+    }
+
+def page_metadata(paginated):
+    """Pagination fields for a list response in either pagination mode"""
+    if 'next_cursor' in paginated:
+        return {
+            'next_cursor': paginated['next_cursor'],
+            'per_page': paginated['per_page']
+        }
+    
+    return {
+        'total': paginated['total'],
+        'page': paginated['current_page'],
+        'per_page': paginated['per_page']
+    }
+
+def make_etag(*parts):
+    """Build an opaque entity tag from the values a response depends on"""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+def not_modified(etag, last_modified=None):
+    """Return a 304 response if the client's cached copy is still current, else None"""
+    if request.if_none_match:
+        current = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified:
+        current = last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    else:
+        current = False
+    
+    if not current:
+        return None
+    return set_validators(current_app.response_class(status=304), etag, last_modified)
+
+def set_validators(response, etag, last_modified=None):
+    """Attach a weak ETag and Last-Modified, and make clients revalidate before reuse"""
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def init_query_counter(app):
+    """Report the number of SQL queries per request in an X-Query-Count header"""
+    # The metrics listeners already count statements per request; reuse them
+    instrument_sql()
+    
+    @app.after_request
+    def add_query_count_header(response):
+        response.headers['X-Query-Count'] = str(g.get('sql_queries', 0))
+        return response
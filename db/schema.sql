@@ -35,13 +35,16 @@ CREATE TABLE food_items (
     latitude DECIMAL(10, 8),
     longitude DECIMAL(11, 8),
     image_url VARCHAR(500),
-    status ENUM('available', 'requested', 'accepted', 'picked', 'completed', 'cancelled') DEFAULT 'available',
+    status ENUM('available', 'requested', 'accepted', 'picked', 'completed', 'cancelled', 'expired') DEFAULT 'available',
+    geocell INT, -- Spatial grid cell, filled in by the backend (flask backfill-geocells)
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (donor_id) REFERENCES users(id) ON DELETE CASCADE,
     INDEX idx_status (status),
+    INDEX idx_status_geocell (status, geocell),
     INDEX idx_location (latitude, longitude),
-    INDEX idx_donor (donor_id)
+    INDEX idx_donor (donor_id),
+    FULLTEXT INDEX ft_food_items_search (title, description)
 );
 
 -- Pickup requests table for managing food pickup requests
@@ -57,6 +60,7 @@ CREATE TABLE pickup_requests (
     completed_at TIMESTAMP NULL,
     FOREIGN KEY (food_item_id) REFERENCES food_items(id) ON DELETE CASCADE,
     FOREIGN KEY (beneficiary_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE KEY uq_pickup_requests_item_beneficiary (food_item_id, beneficiary_id),
     INDEX idx_food_item (food_item_id),
     INDEX idx_beneficiary (beneficiary_id),
     INDEX idx_status (status)
@@ -77,6 +81,46 @@ CREATE TABLE notifications (
     INDEX idx_created (created_at)
 );
 
+-- Notification jobs table, drained by the dispatch worker (flask dispatch-worker)
+CREATE TABLE notification_jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    kind ENUM('new_listing', 'notification') NOT NULL,
+    idempotency_key VARCHAR(100) UNIQUE NOT NULL,
+    payload JSON,
+    status ENUM('pending', 'processing', 'done', 'failed') DEFAULT 'pending',
+    attempts INT DEFAULT 0,
+    last_error TEXT,
+    locked_by VARCHAR(36),
+    locked_at DATETIME NULL,
+    available_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    processed_at DATETIME NULL,
+    INDEX idx_status_available (status, available_at)
+);
+
+-- Admin statistics counters, maintained incrementally by the backend
+CREATE TABLE stat_counters (
+    name VARCHAR(100) PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Counter changes not yet folded into stat_counters; writers only ever append here
+CREATE TABLE stat_deltas (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    amount BIGINT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_stat_deltas_name (name)
+);
+
+-- Unread notification counters per user, maintained by the backend
+CREATE TABLE notification_counters (
+    user_id INT PRIMARY KEY,
+    unread_count INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
 -- Verification requests table for organization verification
 CREATE TABLE verification_requests (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -140,4 +184,5 @@ INSERT INTO verification_requests (user_id, organization_name, organization_type
 CREATE INDEX idx_users_location ON users(latitude, longitude);
 CREATE INDEX idx_users_role ON users(role);
 CREATE INDEX idx_food_items_expiry ON food_items(expiry_date);
+CREATE INDEX idx_food_items_pickup_end ON food_items(pickup_end);
 CREATE INDEX idx_notifications_created ON notifications(created_at DESC);
@@ -2,6 +2,7 @@ import React from 'react'
 import { BrowserRouter as Router, Routes, Route, Navigate } from 'react-router-dom'
 import { Toaster } from 'react-hot-toast'
 import { AuthProvider, useAuth } from './contexts/AuthContext'
+import { NotificationProvider } from './contexts/NotificationContext'
 import Navbar from './components/Navbar'
 import LandingPage from './pages/LandingPage'
 import Login from './pages/Login'
@@ -132,113 +133,115 @@ const Unauthorized = () => (
 function App() {
   return (
     <AuthProvider>
-      <Router>
-        <div className="min-h-screen bg-gray-50">
-          <Navbar />
-          <main>
-            <Routes>
-              {/* Public Routes */}
-              <Route path="/" element={
-                <PublicLandingRoute>
-                  <LandingPage />
-                </PublicLandingRoute>
-              } />
-              <Route path="/login" element={
-                <PublicRoute>
-                  <Login />
-                </PublicRoute>
-              } />
-              <Route path="/register" element={
-                <PublicRoute>
-                  <Register />
-                </PublicRoute>
-              } />
-
-              {/* Protected Routes */}
-              <Route path="/dashboard" element={
-                <ProtectedRoute>
-                  <DashboardRouter />
-                </ProtectedRoute>
-              } />
-
-              <Route path="/donor" element={
-                <ProtectedRoute allowedRoles={['donor']}>
-                  <DonorDashboard />
-                </ProtectedRoute>
-              } />
-
-              <Route path="/beneficiary" element={
-                <ProtectedRoute allowedRoles={['beneficiary']}>
-                  <BeneficiaryDashboard />
-                </ProtectedRoute>
-              } />
-
-              <Route path="/admin" element={
-                <ProtectedRoute allowedRoles={['admin']}>
-                  <AdminDashboard />
-                </ProtectedRoute>
-              } />
-
-              <Route path="/profile" element={
-                <ProtectedRoute>
-                  <Profile />
-                </ProtectedRoute>
-              } />
-
-              <Route path="/map" element={
-                <ProtectedRoute>
-                  <FoodMap />
-                </ProtectedRoute>
-              } />
-
-              <Route path="/notifications" element={
-                <ProtectedRoute>
-                  <Notifications />
-                </ProtectedRoute>
-              } />
-
-              {/* Error Routes */}
-              <Route path="/unauthorized" element={<Unauthorized />} />
-              <Route path="*" element={
-                <div className="min-h-screen flex items-center justify-center bg-gray-50">
-                  <div className="text-center">
-                    <h1 className="text-4xl font-bold text-gray-900 mb-4">404</h1>
-                    <p className="text-xl text-gray-600 mb-8">Page Not Found</p>
-                    <button
-                      onClick={() => window.history.back()}
-                      className="btn-primary"
-                    >
-                      Go Back
-                    </button>
+      <NotificationProvider>
+        <Router>
+          <div className="min-h-screen bg-gray-50">
+            <Navbar />
+            <main>
+              <Routes>
+                {/* Public Routes */}
+                <Route path="/" element={
+                  <PublicLandingRoute>
+                    <LandingPage />
+                  </PublicLandingRoute>
+                } />
+                <Route path="/login" element={
+                  <PublicRoute>
+                    <Login />
+                  </PublicRoute>
+                } />
+                <Route path="/register" element={
+                  <PublicRoute>
+                    <Register />
+                  </PublicRoute>
+                } />
+
+                {/* Protected Routes */}
+                <Route path="/dashboard" element={
+                  <ProtectedRoute>
+                    <DashboardRouter />
+                  </ProtectedRoute>
+                } />
+
+                <Route path="/donor" element={
+                  <ProtectedRoute allowedRoles={['donor']}>
+                    <DonorDashboard />
+                  </ProtectedRoute>
+                } />
+
+                <Route path="/beneficiary" element={
+                  <ProtectedRoute allowedRoles={['beneficiary']}>
+                    <BeneficiaryDashboard />
+                  </ProtectedRoute>
+                } />
+
+                <Route path="/admin" element={
+                  <ProtectedRoute allowedRoles={['admin']}>
+                    <AdminDashboard />
+                  </ProtectedRoute>
+                } />
+
+                <Route path="/profile" element={
+                  <ProtectedRoute>
+                    <Profile />
+                  </ProtectedRoute>
+                } />
+
+                <Route path="/map" element={
+                  <ProtectedRoute>
+                    <FoodMap />
+                  </ProtectedRoute>
+                } />
+
+                <Route path="/notifications" element={
+                  <ProtectedRoute>
+                    <Notifications />
+                  </ProtectedRoute>
+                } />
+
+                {/* Error Routes */}
+                <Route path="/unauthorized" element={<Unauthorized />} />
+                <Route path="*" element={
+                  <div className="min-h-screen flex items-center justify-center bg-gray-50">
+                    <div className="text-center">
+                      <h1 className="text-4xl font-bold text-gray-900 mb-4">404</h1>
+                      <p className="text-xl text-gray-600 mb-8">Page Not Found</p>
+                      <button
+                        onClick={() => window.history.back()}
+                        className="btn-primary"
+                      >
+                        Go Back
+                      </button>
+                    </div>
                   </div>
-                </div>
-              } />
-            </Routes>
-          </main>
-          <Toaster
-            position="top-right"
-            toastOptions={{
-              duration: 4000,
-              style: {
-                background: '#363636',
-                color: '#fff',
-              },
-              success: {
-                duration: 3000,
-                theme: {
-                  primary: '#4ade80',
+                } />
+              </Routes>
+            </main>
+            <Toaster
+              position="top-right"
+              toastOptions={{
+                duration: 4000,
+                style: {
+                  background: '#363636',
+                  color: '#fff',
                 },
-              },
-              error: {
-                duration: 5000,
-                theme: {
-                  primary: '#ef4444',
+                success: {
+                  duration: 3000,
+                  theme: {
+                    primary: '#4ade80',
+                  },
                 },
-              },
-            }}
-          />
-        </div>
-      </Router>
+                error: {
+                  duration: 5000,
+                  theme: {
+                    primary: '#ef4444',
+                  },
+                },
+              }}
+            />
+          </div>
+        </Router>
+      </NotificationProvider>
     </AuthProvider>
   )
 }
@@ -2,6 +2,7 @@ import React, { useState } from 'react'
 import { X, Upload, MapPin, Package, Clock, FileText } from 'lucide-react'
 import { useAuth } from '../contexts/AuthContext'
 import { validateCoordinates } from '../utils/helpers'
+import { uploadAPI } from '../utils/api'
 
 const CreateFoodModal = ({ onClose, onSubmit }) => {
     const { user } = useAuth()
@@ -19,6 +20,7 @@ const CreateFoodModal = ({ onClose, onSubmit }) => {
         image_url: ''
     })
     const [loading, setLoading] = useState(false)
+    const [uploading, setUploading] = useState(false)
     const [errors, setErrors] = useState({})
 
     const handleChange = (e) => {
@@ -36,6 +38,31 @@ const CreateFoodModal = ({ onClose, onSubmit }) => {
         }
     }
 
+    const handleImageUpload = async (e) => {
+        const file = e.target.files[0]
+        if (!file) return
+
+        setUploading(true)
+        try {
+            const response = await uploadAPI.image(file)
+            setFormData(prev => ({
+                ...prev,
+                image_url: response.data.url
+            }))
+            setErrors(prev => ({
+                ...prev,
+                image_url: ''
+            }))
+        } catch (error) {
+            setErrors(prev => ({
+                ...prev,
+                image_url: error.response?.data?.error || 'Image upload failed'
+            }))
+        } finally {
+            setUploading(false)
+        }
+    }
+
     const validateForm = () => {
         const newErrors = {}
 
@@ -98,6 +125,10 @@ const CreateFoodModal = ({ onClose, onSubmit }) => {
             const submitData = {
                 ...formData,
                 quantity: parseInt(formData.quantity),
+                // datetime-local values are local wall-clock times; the API stores UTC
+                pickup_start: new Date(formData.pickup_start).toISOString(),
+                pickup_end: new Date(formData.pickup_end).toISOString(),
+                expiry_date: formData.expiry_date ? new Date(formData.expiry_date).toISOString() : '',
                 latitude: formData.latitude ? parseFloat(formData.latitude) : undefined,
                 longitude: formData.longitude ? parseFloat(formData.longitude) : undefined
             }
@@ -388,14 +419,14 @@ const CreateFoodModal = ({ onClose, onSubmit }) => {
                         {/* Image URL */}
                         <div className="md:col-span-2">
                             <label htmlFor="image_url" className="block text-sm font-bold text-gray-700 mb-2">
-                                Image URL (Optional)
+                                Image (Optional)
                             </label>
                             <div className="relative">
                                 <div className="absolute inset-y-0 left-0 pl-3 flex items-center pointer-events-none">
                                     <Upload className="h-5 w-5 text-violet-400" />
                                 </div>
                                 <input
-                                    type="url"
+                                    type="text"
                                     id="image_url"
                                     name="image_url"
                                     value={formData.image_url}
@@ -404,6 +435,19 @@ const CreateFoodModal = ({ onClose, onSubmit }) => {
                                     placeholder="https://example.com/image.jpg"
                                 />
                             </div>
+                            <input
+                                type="file"
+                                accept="image/png,image/jpeg,image/gif"
+                                onChange={handleImageUpload}
+                                disabled={uploading}
+                                className="mt-3 block w-full text-sm text-gray-600"
+                            />
+                            {uploading && (
+                                <p className="mt-2 text-sm text-violet-600 font-medium">Uploading image...</p>
+                            )}
+                            {errors.image_url && (
+                                <p className="mt-2 text-sm text-red-600 font-medium">{errors.image_url}</p>
+                            )}
                         </div>
                     </div>
 
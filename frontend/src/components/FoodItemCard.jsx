@@ -1,6 +1,6 @@
 import React from 'react'
 import { MapPin, Clock, Package, User } from 'lucide-react'
-import { formatDateTime, formatUTCDateTime, formatDistance, getStatusBadgeClass, getStatusText } from '../utils/helpers'
+import { formatDateTime, formatUTCDateTime, formatDistance, getStatusBadgeClass, getStatusText, getThumbnailUrl } from '../utils/helpers'
 
 const FoodItemCard = ({ item, onStatusUpdate, showActions = false }) => {
   const handleStatusChange = (newStatus) => {
@@ -17,7 +17,7 @@ const FoodItemCard = ({ item, onStatusUpdate, showActions = false }) => {
           {item.image_url && (
             <div className="mb-4">
               <img
-                src={item.image_url}
+                src={getThumbnailUrl(item.image_url)}
                 alt={item.title}
                 className="w-full h-40 object-cover rounded-xl shadow-md"
                 onError={(e) => {
@@ -130,12 +130,12 @@ const FoodItemCard = ({ item, onStatusUpdate, showActions = false }) => {
               </button>
             )}
 
-            {(item.status === 'completed' || item.status === 'cancelled') && (
+            {(item.status === 'completed' || item.status === 'cancelled' || item.status === 'expired') && (
               <span className={`text-xs text-center px-3 py-2 rounded-lg font-semibold ${item.status === 'completed'
                 ? 'text-green-700 bg-green-50 border border-green-200'
                 : 'text-gray-600 bg-gray-50 border border-gray-200'
                 }`}>
-                {item.status === 'completed' ? 'Completed' : 'Cancelled'}
+                {getStatusText(item.status)}
               </span>
             )}
           </div>
@@ -1,11 +1,13 @@
 import React, { useState } from 'react'
 import { Link, useNavigate, useLocation } from 'react-router-dom'
 import { useAuth } from '../contexts/AuthContext'
+import { useNotifications } from '../contexts/NotificationContext'
 import { Bell, User, LogOut, Menu, X, MapPin, Home } from 'lucide-react'
 import { getRoleDisplayName, getInitials } from '../utils/helpers'
 
 const Navbar = () => {
   const { user, logout } = useAuth()
+  const { unreadCount } = useNotifications()
   const navigate = useNavigate()
   const location = useLocation()
   const [isMenuOpen, setIsMenuOpen] = useState(false)
@@ -97,6 +99,11 @@ const Navbar = () => {
               >
                 <Icon size={18} />
                 <span>{label}</span>
+                {to === '/notifications' && unreadCount > 0 && (
+                  <span className="ml-1 min-w-[1.25rem] px-1.5 py-0.5 rounded-full bg-red-500 text-white text-xs font-semibold text-center">
+                    {unreadCount > 99 ? '99+' : unreadCount}
+                  </span>
+                )}
               </Link>
             ))}
 
@@ -167,6 +174,11 @@ const Navbar = () => {
               >
                 <Icon size={20} />
                 <span>{label}</span>
+                {to === '/notifications' && unreadCount > 0 && (
+                  <span className="ml-auto min-w-[1.25rem] px-1.5 py-0.5 rounded-full bg-red-500 text-white text-xs font-semibold text-center">
+                    {unreadCount > 99 ? '99+' : unreadCount}
+                  </span>
+                )}
               </Link>
             ))}
             <button
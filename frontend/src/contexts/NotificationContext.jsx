@@ -0,0 +1,100 @@
+import React, { createContext, useContext, useState, useEffect, useRef, useCallback } from 'react'
+import { notificationAPI } from '../utils/api'
+import { useAuth } from './AuthContext'
+
+const NotificationContext = createContext()
+const RECONNECT_DELAY_MS = 3000
+
+export const useNotifications = () => {
+  const context = useContext(NotificationContext)
+  if (!context) {
+    throw new Error('useNotifications must be used within a NotificationProvider')
+  }
+  return context
+}
+
+export const NotificationProvider = ({ children }) => {
+  const { user } = useAuth()
+  const [unreadCount, setUnreadCount] = useState(0)
+  const listeners = useRef(new Set())
+
+  // One stream per tab, shared by the navbar badge and the notifications page
+  useEffect(() => {
+    if (!user) {
+      setUnreadCount(0)
+      return
+    }
+
+    let source = null
+    let retryTimer = null
+    let lastEventId = null
+    let closed = false
+
+    const handleNotification = (event) => {
+      lastEventId = event.lastEventId
+      const notification = JSON.parse(event.data)
+      if (!notification.is_read) {
+        setUnreadCount(count => count + 1)
+      }
+      listeners.current.forEach(listener => listener(notification))
+    }
+
+    const connect = async () => {
+      try {
+        // The ticket cookie authenticates the stream; the browser resends it on reconnect
+        await notificationAPI.streamTicket()
+      } catch (error) {
+        console.error('Failed to open notification stream:', error)
+        retryTimer = setTimeout(connect, RECONNECT_DELAY_MS)
+        return
+      }
+      if (closed) return
+
+      source = notificationAPI.stream(lastEventId)
+      source.addEventListener('unread_count', (event) => {
+        setUnreadCount(JSON.parse(event.data).unread_count)
+      })
+      source.addEventListener('notification', handleNotification)
+      source.onerror = () => {
+        // A rejected ticket closes the EventSource for good, so fetch a fresh one
+        if (source.readyState === EventSource.CLOSED && !closed) {
+          retryTimer = setTimeout(connect, RECONNECT_DELAY_MS)
+        }
+      }
+    }
+
+    connect()
+    return () => {
+      closed = true
+      clearTimeout(retryTimer)
+      if (source) source.close()
+    }
+  }, [user])
+
+  const subscribe = useCallback((listener) => {
+    listeners.current.add(listener)
+    return () => listeners.current.delete(listener)
+  }, [])
+
+  // Resync the badge after marking notifications read
+  const refreshUnreadCount = useCallback(async () => {
+    try {
+      const response = await notificationAPI.getUnreadCount()
+      setUnreadCount(response.data.unread_count)
+    } catch (error) {
+      console.error('Failed to fetch unread count:', error)
+    }
+  }, [])
+
+  const value = {
+    unreadCount,
+    refreshUnreadCount,
+    subscribe
+  }
+
+  return (
+    <NotificationContext.Provider value={value}>
+      {children}
+    </NotificationContext.Provider>
+  )
+}
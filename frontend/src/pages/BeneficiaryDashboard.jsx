@@ -12,6 +12,7 @@ const BeneficiaryDashboard = () => {
   const [myRequests, setMyRequests] = useState([])
   const [loading, setLoading] = useState(true)
   const [searchTerm, setSearchTerm] = useState('')
+  const [searchQuery, setSearchQuery] = useState('')
   const [maxDistance, setMaxDistance] = useState(10)
   const [stats, setStats] = useState({
     available: 0,
@@ -22,13 +23,19 @@ const BeneficiaryDashboard = () => {
 
   useEffect(() => {
     fetchData()
-  }, [maxDistance])
+  }, [maxDistance, searchQuery])
+
+  // Search on the server once typing pauses
+  useEffect(() => {
+    const timer = setTimeout(() => setSearchQuery(searchTerm.trim()), 300)
+    return () => clearTimeout(timer)
+  }, [searchTerm])
 
   const fetchData = async () => {
     try {
-      setLoading(true)
+      // The full-page spinner only covers the first load, so the search box keeps focus
       const [foodResponse, requestsResponse] = await Promise.all([
-        foodAPI.getAll({ status: 'available', max_distance: maxDistance }),
+        foodAPI.getAll({ status: 'available', max_distance: maxDistance, ...(searchQuery && { q: searchQuery }) }),
         pickupAPI.getAll()
       ])
 
@@ -78,11 +85,6 @@ const BeneficiaryDashboard = () => {
     }
   }
 
-  const filteredFood = availableFood.filter(item =>
-    item.title.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    item.description?.toLowerCase().includes(searchTerm.toLowerCase())
-  )
-
   if (loading) {
     return (
       <div className="min-h-screen bg-gradient-to-br from-primary-100 via-blue-100 to-violet-100 flex items-center justify-center">
@@ -203,7 +205,7 @@ const BeneficiaryDashboard = () => {
               </div>
             </div>
             <div className="p-6">
-              {filteredFood.length === 0 ? (
+              {availableFood.length === 0 ? (
                 <div className="text-center py-12">
                   <Package className="mx-auto h-16 w-16 text-gray-400" />
                   <h3 className="mt-4 text-lg font-semibold text-gray-900">No food available</h3>
@@ -216,7 +218,7 @@ const BeneficiaryDashboard = () => {
                 </div>
               ) : (
                 <div className="space-y-4 max-h-96 overflow-y-auto custom-scrollbar">
-                  {filteredFood.map((item) => (
+                  {availableFood.map((item) => (
                     <div key={item.id} className="bg-gradient-to-r from-gray-50 to-primary-50 border border-gray-200 rounded-xl p-4 hover:shadow-lg transition-all duration-300">
                       <div className="flex items-start justify-between">
                         <div className="flex-1">
@@ -1,5 +1,5 @@
-import React, { useState, useEffect } from 'react'
-import { MapContainer, TileLayer, Marker, Popup, useMap } from 'react-leaflet'
+import React, { useState, useEffect, useRef, useCallback } from 'react'
+import { MapContainer, TileLayer, Marker, Popup, useMap, useMapEvents } from 'react-leaflet'
 import { MapPin, Package, Clock, User, Navigation } from 'lucide-react'
 import { foodAPI } from '../utils/api'
 import { useAuth } from '../contexts/AuthContext'
@@ -28,6 +28,17 @@ const createCustomIcon = (color) => {
 const foodIcon = createCustomIcon('#10b981') // green
 const userIcon = createCustomIcon('#3b82f6') // blue
 
+// Server-side clusters are drawn as a sized bubble with their listing count
+const createClusterIcon = (count) => {
+    const size = count < 10 ? 30 : count < 100 ? 38 : 46
+    return L.divIcon({
+        className: 'custom-div-icon',
+        html: `<div style="background-color: #10b981; width: ${size}px; height: ${size}px; border-radius: 50%; border: 3px solid white; box-shadow: 0 2px 4px rgba(0,0,0,0.3); color: white; font-weight: 700; font-size: 12px; display: flex; align-items: center; justify-content: center;">${count}</div>`,
+        iconSize: [size, size],
+        iconAnchor: [size / 2, size / 2]
+    })
+}
+
 // Component to handle map centering
 const MapController = ({ center, zoom }) => {
     const map = useMap()
@@ -41,14 +52,45 @@ const MapController = ({ center, zoom }) => {
     return null
 }
 
+// Reports the visible bounds and zoom on load and after every pan or zoom
+const ViewportWatcher = ({ onChange }) => {
+    const map = useMapEvents({
+        moveend: () => onChange(map.getBounds().toBBoxString(), map.getZoom())
+    })
+
+    useEffect(() => {
+        onChange(map.getBounds().toBBoxString(), map.getZoom())
+    }, [map, onChange])
+
+    return null
+}
+
+// Zooms into a cluster when it is clicked
+const ClusterMarker = ({ cluster }) => {
+    const map = useMap()
+
+    return (
+        <Marker
+            position={[cluster.latitude, cluster.longitude]}
+            icon={createClusterIcon(cluster.count)}
+            eventHandlers={{
+                click: () => map.setView([cluster.latitude, cluster.longitude], Math.min(map.getZoom() + 2, map.getMaxZoom()))
+            }}
+        />
+    )
+}
+
 const FoodMap = () => {
     const { user } = useAuth()
     const [foodItems, setFoodItems] = useState([])
+    const [clusters, setClusters] = useState([])
+    const [total, setTotal] = useState(0)
+    const [truncated, setTruncated] = useState(false)
     const [loading, setLoading] = useState(true)
     const [selectedFood, setSelectedFood] = useState(null)
     const [userLocation, setUserLocation] = useState(null)
     const [mapCenter, setMapCenter] = useState([40.7128, -74.0060]) // Default to NYC
-    const [maxDistance, setMaxDistance] = useState(10)
+    const latestRequest = useRef(0)
 
     useEffect(() => {
         // Set user location if available
@@ -57,31 +99,30 @@ const FoodMap = () => {
             setUserLocation(location)
             setMapCenter(location)
         }
+    }, [user])
 
-        fetchFoodItems()
-    }, [user, maxDistance])
-
-    const fetchFoodItems = async () => {
+    // Only what the map shows is fetched: clusters when zoomed out, listings when zoomed in
+    const fetchViewport = useCallback(async (bbox, zoom) => {
+        const requestId = ++latestRequest.current
         try {
             setLoading(true)
-            const response = await foodAPI.getAll({
-                status: 'available',
-                max_distance: maxDistance
-            })
-
-            // Filter items that have coordinates
-            const itemsWithCoords = (response.data.food_items || []).filter(
-                item => item.latitude && item.longitude
-            )
+            const response = await foodAPI.getMap({ bbox, zoom })
+
+            // A later pan or zoom has already been requested
+            if (requestId !== latestRequest.current) return
 
-            setFoodItems(itemsWithCoords)
+            setClusters(response.data.clusters || [])
+            setFoodItems(response.data.food_items || [])
+            setTotal(response.data.total || 0)
+            setTruncated(Boolean(response.data.truncated))
         } catch (error) {
+            if (requestId !== latestRequest.current) return
             console.error('Error fetching food items:', error)
             toast.error('Failed to load food items')
         } finally {
-            setLoading(false)
+            if (requestId === latestRequest.current) setLoading(false)
         }
-    }
+    }, [])
 
     const getCurrentLocation = () => {
         if (navigator.geolocation) {
@@ -136,23 +177,9 @@ const FoodMap = () => {
                     <div className="bg-white bg-opacity-90 shadow-2xl rounded-2xl p-6 border border-gray-200 hover:border-primary-300 transition-all duration-300">
                         <div className="flex flex-col sm:flex-row sm:items-center sm:justify-between space-y-4 sm:space-y-0">
                             <div className="flex items-center space-x-6">
-                                <div className="flex items-center space-x-3">
-                                    <label className="text-sm font-semibold text-gray-700">Max distance:</label>
-                                    <select
-                                        value={maxDistance}
-                                        onChange={(e) => setMaxDistance(Number(e.target.value))}
-                                        className="px-3 py-2 border border-gray-300 rounded-lg focus:ring-primary-500 focus:border-primary-500 bg-gray-50 hover:border-primary-300 transition font-medium"
-                                    >
-                                        <option value={5}>5 km</option>
-                                        <option value={10}>10 km</option>
-                                        <option value={20}>20 km</option>
-                                        <option value={50}>50 km</option>
-                                    </select>
-                                </div>
-
                                 <div className="flex items-center space-x-2 text-sm text-gray-700 bg-emerald-50 px-3 py-2 rounded-lg border border-emerald-200">
                                     <Package size={16} className="text-emerald-600" />
-                                    <span className="font-semibold">{foodItems.length} items found</span>
+                                    <span className="font-semibold">{total}{truncated ? '+' : ''} items in view</span>
                                 </div>
                             </div>
 
@@ -172,97 +199,95 @@ const FoodMap = () => {
                     <div className="lg:col-span-2">
                         <div className="bg-white bg-opacity-90 shadow-2xl rounded-2xl border border-gray-200 hover:border-primary-300 transition-all duration-300 overflow-hidden">
                             <div className="p-0">
-                                {loading ? (
-                                    <div className="h-96 flex items-center justify-center bg-gradient-to-r from-primary-50 to-violet-50">
-                                        <div className="flex flex-col items-center space-y-4">
-                                            <div className="spinner"></div>
-                                            <p className="text-gray-600 font-semibold">Loading map...</p>
-                                        </div>
-                                    </div>
-                                ) : (
-                                    <MapContainer
-                                        center={mapCenter}
-                                        zoom={13}
-                                        style={{ height: '500px', width: '100%' }}
-                                        className="rounded-lg"
-                                    >
-                                        <MapController center={mapCenter} zoom={13} />
-                                        <TileLayer
-                                            attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
-                                            url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
-                                        />
-
-                                        {/* User location marker */}
-                                        {userLocation && (
-                                            <Marker position={userLocation} icon={userIcon}>
-                                                <Popup>
-                                                    <div className="text-center">
-                                                        <strong>Your Location</strong>
-                                                        <br />
-                                                        <span className="text-sm text-gray-600">
-                                                            {user?.name || 'You are here'}
-                                                        </span>
-                                                    </div>
-                                                </Popup>
-                                            </Marker>
-                                        )}
-
-                                        {/* Food item markers */}
-                                        {foodItems.map((item) => (
-                                            <Marker
-                                                key={item.id}
-                                                position={[parseFloat(item.latitude), parseFloat(item.longitude)]}
-                                                icon={foodIcon}
-                                                eventHandlers={{
-                                                    click: () => setSelectedFood(item)
-                                                }}
-                                            >
-                                                <Popup>
-                                                    <div className="min-w-64">
-                                                        <h4 className="font-medium text-gray-900 mb-2">{item.title}</h4>
-                                                        <p className="text-sm text-gray-600 mb-2">{item.description}</p>
-
-                                                        <div className="space-y-1 text-sm text-gray-500 mb-3">
-                                                            <div className="flex items-center">
-                                                                <Package size={12} className="mr-2" />
-                                                                <span>{item.quantity} {item.unit}</span>
-                                                            </div>
-                                                            <div className="flex items-center">
-                                                                <User size={12} className="mr-2" />
-                                                                <span>{item.donor_name}</span>
-                                                            </div>
+                                {/* Kept mounted while loading so panning does not reset the map */}
+                                <MapContainer
+                                    center={mapCenter}
+                                    zoom={13}
+                                    style={{ height: '500px', width: '100%' }}
+                                    className="rounded-lg"
+                                >
+                                    <MapController center={mapCenter} zoom={13} />
+                                    <ViewportWatcher onChange={fetchViewport} />
+                                    <TileLayer
+                                        attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+                                        url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
+                                    />
+
+                                    {/* User location marker */}
+                                    {userLocation && (
+                                        <Marker position={userLocation} icon={userIcon}>
+                                            <Popup>
+                                                <div className="text-center">
+                                                    <strong>Your Location</strong>
+                                                    <br />
+                                                    <span className="text-sm text-gray-600">
+                                                        {user?.name || 'You are here'}
+                                                    </span>
+                                                </div>
+                                            </Popup>
+                                        </Marker>
+                                    )}
+
+                                    {/* Cluster markers when zoomed out */}
+                                    {clusters.map((cluster) => (
+                                        <ClusterMarker key={`${cluster.latitude},${cluster.longitude}`} cluster={cluster} />
+                                    ))}
+
+                                    {/* Food item markers */}
+                                    {foodItems.map((item) => (
+                                        <Marker
+                                            key={item.id}
+                                            position={[parseFloat(item.latitude), parseFloat(item.longitude)]}
+                                            icon={foodIcon}
+                                            eventHandlers={{
+                                                click: () => setSelectedFood(item)
+                                            }}
+                                        >
+                                            <Popup>
+                                                <div className="min-w-64">
+                                                    <h4 className="font-medium text-gray-900 mb-2">{item.title}</h4>
+                                                    <p className="text-sm text-gray-600 mb-2">{item.description}</p>
+
+                                                    <div className="space-y-1 text-sm text-gray-500 mb-3">
+                                                        <div className="flex items-center">
+                                                            <Package size={12} className="mr-2" />
+                                                            <span>{item.quantity} {item.unit}</span>
+                                                        </div>
+                                                        <div className="flex items-center">
+                                                            <User size={12} className="mr-2" />
+                                                            <span>{item.donor_name}</span>
+                                                        </div>
+                                                        <div className="flex items-center">
+                                                            <Clock size={12} className="mr-2" />
+                                                            <span>{formatDateTime(item.pickup_start)}</span>
+                                                        </div>
+                                                        {item.distance && (
                                                             <div className="flex items-center">
-                                                                <Clock size={12} className="mr-2" />
-                                                                <span>{formatDateTime(item.pickup_start)}</span>
+                                                                <MapPin size={12} className="mr-2" />
+                                                                <span>{formatDistance(item.distance)} away</span>
                                                             </div>
-                                                            {item.distance && (
-                                                                <div className="flex items-center">
-                                                                    <MapPin size={12} className="mr-2" />
-                                                                    <span>{formatDistance(item.distance)} away</span>
-                                                                </div>
-                                                            )}
-                                                        </div>
+                                                        )}
+                                                    </div>
 
-                                                        <div className="flex items-center justify-between">
-                                                            <span className={`badge ${getStatusBadgeClass(item.status)}`}>
-                                                                {getStatusText(item.status)}
-                                                            </span>
-
-                                                            {user?.role === 'beneficiary' && item.status === 'available' && (
-                                                                <button
-                                                                    onClick={() => handleRequestPickup(item.id)}
-                                                                    className="btn-primary btn-sm"
-                                                                >
-                                                                    Request
-                                                                </button>
-                                                            )}
-                                                        </div>
+                                                    <div className="flex items-center justify-between">
+                                                        <span className={`badge ${getStatusBadgeClass(item.status)}`}>
+                                                            {getStatusText(item.status)}
+                                                        </span>
+
+                                                        {user?.role === 'beneficiary' && item.status === 'available' && (
+                                                            <button
+                                                                onClick={() => handleRequestPickup(item.id)}
+                                                                className="btn-primary btn-sm"
+                                                            >
+                                                                Request
+                                                            </button>
+                                                        )}
                                                     </div>
-                                                </Popup>
-                                            </Marker>
-                                        ))}
-                                    </MapContainer>
-                                )}
+                                                </div>
+                                            </Popup>
+                                        </Marker>
+                                    ))}
+                                </MapContainer>
                             </div>
                         </div>
                     </div>
@@ -281,12 +306,20 @@ const FoodMap = () => {
                                             <p className="text-gray-600 font-semibold">Loading items...</p>
                                         </div>
                                     </div>
+                                ) : clusters.length > 0 ? (
+                                    <div className="text-center py-12">
+                                        <MapPin className="mx-auto h-16 w-16 text-gray-400" />
+                                        <h3 className="mt-4 text-lg font-semibold text-gray-900">{total} items in view</h3>
+                                        <p className="mt-2 text-sm text-gray-600">
+                                            Zoom in or click a cluster to see individual listings.
+                                        </p>
+                                    </div>
                                 ) : foodItems.length === 0 ? (
                                     <div className="text-center py-12">
                                         <Package className="mx-auto h-16 w-16 text-gray-400" />
                                         <h3 className="mt-4 text-lg font-semibold text-gray-900">No food items</h3>
                                         <p className="mt-2 text-sm text-gray-600">
-                                            No food donations are available in your area right now.
+                                            No food donations are available in this area right now.
                                         </p>
                                     </div>
                                 ) : (
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react'
 import { Bell, Check, Trash2, Filter } from 'lucide-react'
 import { notificationAPI } from '../utils/api'
+import { useNotifications } from '../contexts/NotificationContext'
 import { formatTimeAgo } from '../utils/helpers'
 import toast from 'react-hot-toast'
 
@@ -9,11 +10,19 @@ const Notifications = () => {
     const [loading, setLoading] = useState(true)
     const [filter, setFilter] = useState('all') // all, unread, read
     const [selectedNotifications, setSelectedNotifications] = useState([])
+    const { subscribe, refreshUnreadCount } = useNotifications()
 
     useEffect(() => {
         fetchNotifications()
     }, [])
 
+    // New notifications arrive over the shared stream instead of by refetching
+    useEffect(() => subscribe(notification => {
+        setNotifications(prev =>
+            prev.some(n => n.id === notification.id) ? prev : [notification, ...prev]
+        )
+    }), [subscribe])
+
     const fetchNotifications = async () => {
         try {
             setLoading(true)
@@ -37,6 +46,7 @@ const Notifications = () => {
                         : notification
                 )
             )
+            refreshUnreadCount()
             toast.success('Notification marked as read')
         } catch (error) {
             console.error('Error marking notification as read:', error)
@@ -47,14 +57,16 @@ const Notifications = () => {
     const markAllAsRead = async () => {
         try {
             const unreadNotifications = notifications.filter(n => !n.is_read)
-            await Promise.all(
-                unreadNotifications.map(notification =>
-                    notificationAPI.markAsRead(notification.id)
-                )
-            )
+            if (unreadNotifications.length > 0) {
+                // One request marks everything up to the newest loaded notification
+                await notificationAPI.markManyAsRead({
+                    up_to_id: Math.max(...notifications.map(n => n.id))
+                })
+            }
             setNotifications(prev =>
                 prev.map(notification => ({ ...notification, is_read: true }))
             )
+            refreshUnreadCount()
             toast.success('All notifications marked as read')
         } catch (error) {
             console.error('Error marking all notifications as read:', error)
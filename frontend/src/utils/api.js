@@ -61,6 +61,7 @@ export const userAPI = {
 export const foodAPI = {
   create: (data) => api.post('/food', data),
   getAll: (params = {}) => api.get('/food', { params }),
+  getMap: (params) => api.get('/food/map', { params }),
   update: (id, data) => api.put(`/food/${id}`, data),
   delete: (id) => api.delete(`/food/${id}`),
 }
@@ -73,7 +74,23 @@ export const pickupAPI = {
 
 export const notificationAPI = {
   getAll: (params = {}) => api.get('/notifications', { params }),
+  getUnreadCount: () => api.get('/notifications/unread-count'),
   markAsRead: (id) => api.put(`/notifications/${id}/read`),
+  markAllAsRead: () => api.put('/notifications/read-all'),
+  markManyAsRead: (data) => api.put('/notifications/read', data),
+  // EventSource cannot send headers, so the stream is authenticated by a cookie set here
+  streamTicket: () => api.post('/notifications/stream-ticket'),
+  stream: (lastEventId) => new EventSource(
+    `${baseURL}/notifications/stream${lastEventId ? `?last_event_id=${lastEventId}` : ''}`
+  ),
+}
+
+export const uploadAPI = {
+  image: (file) => {
+    const formData = new FormData()
+    formData.append('file', file)
+    return api.post('/uploads', formData, { headers: { 'Content-Type': 'multipart/form-data' } })
+  },
 }
 
 export const adminAPI = {
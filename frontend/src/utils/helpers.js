@@ -1,10 +1,14 @@
 import { format, formatDistanceToNow, parseISO } from 'date-fns'
 
+// The API stores and returns naive UTC timestamps; without an offset parseISO would read them as local time
+export const parseServerDate = (dateString) =>
+  parseISO(/T[^Z+-]*$/.test(dateString) ? `${dateString}Z` : dateString)
+
 // Date formatting utilities
 export const formatDate = (dateString) => {
   if (!dateString) return 'N/A'
   try {
-    return format(parseISO(dateString), 'MMM dd, yyyy')
+    return format(parseServerDate(dateString), 'MMM dd, yyyy')
   } catch (error) {
     return 'Invalid date'
   }
@@ -13,8 +17,8 @@ export const formatDate = (dateString) => {
 export const formatDateTime = (dateString) => {
   if (!dateString) return 'N/A'
   try {
-    // Parse ISO string to Date object (which will be in local time)
-    const date = parseISO(dateString)
+    // Parse the UTC timestamp; format shows it in local time
+    const date = parseServerDate(dateString)
 
     // Format with clear local time indication
     return format(date, "MMM dd, yyyy HH:mm") + " (Your local time)"
@@ -29,7 +33,7 @@ export const formatUTCDateTime = (dateString) => {
   if (!dateString) return 'N/A'
   try {
     // Parse ISO string to Date object
-    const date = parseISO(dateString)
+    const date = parseServerDate(dateString)
 
     // Get UTC components without timezone conversion
     const year = date.getUTCFullYear()
@@ -55,7 +59,7 @@ export const formatTimeAgo = (dateString) => {
     // parseISO already correctly parses ISO timestamps with timezone information
     // The issue with formatDistanceToNow is that it might be affected by local timezone
     // Let's explicitly calculate the distance based on UTC timestamps
-    const date = parseISO(dateString)
+    const date = parseServerDate(dateString)
     // Adding proper addSuffix to get "X ago" format
     return formatDistanceToNow(date, { addSuffix: true })
   } catch (error) {
@@ -73,6 +77,7 @@ export const getStatusBadgeClass = (status) => {
     picked: 'badge-warning',
     completed: 'badge-success',
     cancelled: 'badge-danger',
+    expired: 'badge-danger',
     pending: 'badge-warning',
     approved: 'badge-success',
     rejected: 'badge-danger',
@@ -88,6 +93,7 @@ export const getStatusText = (status) => {
     picked: 'Picked Up',
     completed: 'Completed',
     cancelled: 'Cancelled',
+    expired: 'Expired',
     pending: 'Pending',
     approved: 'Approved',
     rejected: 'Rejected',
@@ -104,6 +110,12 @@ export const formatDistance = (distance) => {
   return `${distance.toFixed(1)}km`
 }
 
+// Thumbnail for images stored by POST /uploads; other URLs are returned unchanged
+export const getThumbnailUrl = (imageUrl, size = 320) => {
+  const match = imageUrl?.match(/^\/uploads\/([0-9a-f]{64})\.\w+$/)
+  return match ? `/uploads/thumbs/${match[1]}-${size}.webp` : imageUrl
+}
+
 // Role formatting
 export const getRoleDisplayName = (role) => {
   const roleNames = {
@@ -153,6 +153,18 @@ check_database() {
     fi
 }
 
+# Check the backend can serve requests (its /ready endpoint queries the database)
+check_backend_ready() {
+    if docker-compose -f docker-compose.prod.yml exec -T backend curl -f -s http://localhost:5000/ready &> /dev/null; then
+        print_status "Backend is ready"
+        return 0
+    else
+        print_error "Backend is not ready"
+        send_alert "Backend readiness check failed"
+        return 1
+    fi
+}
+
 # Main monitoring function
 main() {
     echo "$(date '+%Y-%m-%d %H:%M:%S') - Starting health check..."
@@ -166,6 +178,7 @@ main() {
     check_disk_space || ((failed_checks++))
     check_memory || ((failed_checks++))
     check_database || ((failed_checks++))
+    check_backend_ready || ((failed_checks++))
     
     echo ""
     if [ $failed_checks -eq 0 ]; then